@@ -4,21 +4,59 @@ Website Klasifikasi Jenis Pisang menggunakan Deep Learning
 """
 
 import streamlit as st
-import numpy as np
-import tensorflow as tf
 from PIL import Image
 import json
-import cv2
+import logging
 import os
+import sys
+import importlib
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 import base64
+import csv
+import io
+
+# TensorFlow (lewat modul inference) dan cv2 sengaja tidak di-import di sini:
+# keduanya baru dimuat saat halaman Klasifikasi/preload pertama kali butuh model
+from batching import MicroBatcher
+from backends import create_engine, explain_image, predict_batch, predict_fish
+from inference_client import InferenceClient
+from metrics import METRICS
+from model_registry import CLASS_INDICES_FILE, MODEL_FILES, ModelRegistry, list_versions
+from overlay import OverlayRenderer
+from preprocessing import DecodePool, prepare_image
+from result_cache import ResultCache
 
 # ====================================
 # KONFIGURASI
 # ====================================
-IMG_SIZE = (150, 150)
 MODEL_PATH = 'fish_classifier_model.keras'  # Akan diganti sesuai model pisang
 CLASS_INDICES_PATH = 'class_indices.json'
+# Backend prediksi: 'keras' (tf.function), 'tflite', 'onnx' atau 'mmap' (butuh hasil export di notebook)
+INFERENCE_BACKEND = os.environ.get('BANANA_BACKEND', 'keras')
+BACKEND_MODEL_PATHS = {
+    'tflite': os.environ.get('BANANA_TFLITE_MODEL', 'fish_classifier_model.tflite'),
+    'onnx': os.environ.get('BANANA_ONNX_MODEL', 'fish_classifier_model.onnx'),
+    'mmap': os.environ.get('BANANA_MMAP_MODEL', 'fish_classifier_model_weights'),
+}
+BACKEND_NUM_THREADS = int(os.environ.get('BANANA_BACKEND_THREADS', '0')) or None  # None = default backend
+MAX_BATCH_SIZE = 32  # Jumlah gambar maksimal per forward pass pada mode batch
+BATCH_BUCKETS = (1, 4, 8, 16, MAX_BATCH_SIZE)  # Ukuran batch yang di-trace oleh InferenceEngine
+RESULT_CACHE_MAX_ENTRIES = 256  # Jumlah hasil klasifikasi yang disimpan di cache
+RESULT_CACHE_MAX_BYTES = 16 * 1024 * 1024  # Batas memori cache hasil (16 MB)
+MICRO_BATCH_LATENCY_MS = 5.0  # Jendela waktu penggabungan request dari sesi yang berbeda
+DECODE_WORKERS = 4  # Thread decode/resize gambar pada mode batch
+# URL inference server (python server.py); kosong = model dijalankan di proses Streamlit
+INFERENCE_SERVER_URL = os.environ.get('BANANA_INFERENCE_URL', '')
+# Folder model registry berversi (model_registry.py); kosong = pakai MODEL_PATH tetap
+MODEL_REGISTRY_DIR = os.environ.get('BANANA_MODEL_REGISTRY', '')
+# Panel admin berisi metrics latency per tahap (BANANA_METRICS=0 mematikan pengumpulan metrics)
+ADMIN_PANEL = os.environ.get('BANANA_ADMIN_PANEL', '0') == '1'
+
+logger = logging.getLogger(__name__)
+LOG_LEVELS = {'error': logging.ERROR, 'warning': logging.WARNING, 'info': logging.INFO}
 
 # Page configuration
 st.set_page_config(
@@ -342,23 +380,170 @@ def load_css():
 # ====================================
 # LOAD MODEL & CLASS MAPPING
 # ====================================
-@st.cache_resource
+@st.cache_resource(show_spinner=False)
+def load_startup_timings():
+    """Catatan waktu startup per proses (detik): import, load model, warm-up"""
+    return {}
+
+def record_startup_timing(stage, seconds):
+    load_startup_timings()[stage] = seconds
+
+@st.cache_resource(show_spinner=False)
+def load_startup_notices():
+    """Pesan dari loader model per proses: list (level, teks)
+    
+    Loader bisa berjalan di thread preload yang tidak punya ScriptRunContext, sehingga
+    st.error/st.warning di sana hilang. Pesan dicatat di sini lalu ditampilkan oleh
+    show_startup_notices dari script thread halaman Klasifikasi.
+    """
+    return []
+
+def add_startup_notice(level, message):
+    """Catat pesan loader (level: 'error', 'warning', atau 'info') + tulis ke log"""
+    notices = load_startup_notices()
+    if (level, message) not in notices:
+        notices.append((level, message))
+        logger.log(LOG_LEVELS[level], message)
+
+def show_startup_notices():
+    for level, message in load_startup_notices():
+        getattr(st, level)(message)
+
+def import_inference():
+    """Import modul inference (beserta TensorFlow) saat pertama kali dibutuhkan"""
+    if 'inference' not in sys.modules:
+        start = time.perf_counter()
+        importlib.import_module('inference')
+        record_startup_timing('import', time.perf_counter() - start)
+    return sys.modules['inference']
+
+@st.cache_resource(show_spinner=False)  # Juga dipanggil dari thread preload
 def load_model():
     """Load model yang sudah dilatih"""
     if not os.path.exists(MODEL_PATH):
-        st.error(f"Model file tidak ditemukan: {MODEL_PATH}")
-        st.info("Jalankan notebook terlebih dahulu untuk melatih dan menyimpan model!")
+        add_startup_notice('error', f"Model file tidak ditemukan: {MODEL_PATH}")
+        add_startup_notice('info', "Jalankan notebook terlebih dahulu untuk melatih dan menyimpan model!")
         return None
-    model = tf.keras.models.load_model(MODEL_PATH)
+    inference = import_inference()
+    start = time.perf_counter()
+    model = inference.load_keras_model(MODEL_PATH)
+    record_startup_timing('load', time.perf_counter() - start)
     
     # Cek apakah model memiliki layer 'last_conv'
     layer_names = [layer.name for layer in model.layers]
     if 'last_conv' not in layer_names:
-        st.warning("⚠️ Model tidak memiliki layer 'last_conv'. Visualisasi Grad-CAM mungkin tidak tersedia.")
-        st.info(f"Available layers: {', '.join(layer_names)}")
+        add_startup_notice('warning', "⚠️ Model tidak memiliki layer 'last_conv'. "
+                                      "Visualisasi Grad-CAM mungkin tidak tersedia.")
+        add_startup_notice('info', f"Available layers: {', '.join(layer_names)}")
     
     return model
 
+@st.cache_resource(show_spinner=False)  # Juga dipanggil dari thread preload
+def load_inference_engine():
+    """Bungkus model dalam InferenceEngine (trace + warm-up sekali saat load)"""
+    if INFERENCE_BACKEND in BACKEND_MODEL_PATHS:
+        backend_path = BACKEND_MODEL_PATHS[INFERENCE_BACKEND]
+        if os.path.exists(backend_path):
+            start = time.perf_counter()
+            engine = create_engine(INFERENCE_BACKEND, backend_path, BACKEND_NUM_THREADS, BATCH_BUCKETS)
+            record_startup_timing('load', time.perf_counter() - start - engine.warmup_seconds)
+            record_startup_timing('warmup', engine.warmup_seconds)
+            return engine
+        add_startup_notice('warning', f"⚠️ Model {INFERENCE_BACKEND} tidak ditemukan: {backend_path}. "
+                                      "Menggunakan model Keras.")
+    
+    model = load_model()
+    if model is None:
+        return None
+    engine = import_inference().InferenceEngine(model, batch_buckets=BATCH_BUCKETS)
+    record_startup_timing('warmup', engine.warmup_seconds)
+    return engine
+
+@st.cache_resource
+def load_micro_batcher():
+    """Antrian bersama yang menggabungkan prediksi satu-gambar dari semua sesi"""
+    engine = load_inference_engine()
+    if engine is None:
+        return None
+    return MicroBatcher(engine.predict, MAX_BATCH_SIZE, MICRO_BATCH_LATENCY_MS)
+
+@st.cache_resource(show_spinner=False)  # Juga dipanggil dari thread preload
+def load_gradcam_explainer(_model, model_key, last_conv_layer_name='last_conv'):
+    """GradCAMExplainer dibangun sekali per model (key: identitas model + nama layer)"""
+    return import_inference().GradCAMExplainer(_model, last_conv_layer_name)
+
+class RegistryModel:
+    """Engine, micro-batcher, Grad-CAM dan class indices untuk satu versi di registry"""
+    
+    def __init__(self, version_dir, last_conv_layer_name='last_conv'):
+        inference = import_inference()
+        with open(os.path.join(version_dir, CLASS_INDICES_FILE), 'r') as f:
+            self.class_indices = json.load(f)
+        
+        keras_path = os.path.join(version_dir, MODEL_FILES['keras'])
+        keras_model = inference.load_keras_model(keras_path) if os.path.exists(keras_path) else None
+        if INFERENCE_BACKEND in BACKEND_MODEL_PATHS:
+            backend_path = os.path.join(version_dir, MODEL_FILES[INFERENCE_BACKEND])
+            self.engine = create_engine(INFERENCE_BACKEND, backend_path, BACKEND_NUM_THREADS, BATCH_BUCKETS)
+        else:
+            if keras_model is None:
+                raise FileNotFoundError(f"Model file tidak ditemukan: {keras_path}")
+            self.engine = inference.InferenceEngine(keras_model, batch_buckets=BATCH_BUCKETS)
+        self.batcher = MicroBatcher(self.engine.predict, MAX_BATCH_SIZE, MICRO_BATCH_LATENCY_MS)
+        
+        self.explainer = None
+        if keras_model is not None:
+            try:
+                self.explainer = inference.GradCAMExplainer(keras_model, last_conv_layer_name)
+            except ValueError:
+                # Model tanpa layer last_conv: Grad-CAM tidak tersedia, prediksi tetap jalan
+                pass
+    
+    def close(self):
+        self.batcher.close()
+
+@st.cache_resource(show_spinner=False)  # Juga dipanggil dari thread preload
+def load_model_registry():
+    """Registry model + watcher hot-swap, dipakai bersama oleh semua sesi"""
+    return ModelRegistry(MODEL_REGISTRY_DIR, lambda version_dir, metadata: RegistryModel(version_dir)).start()
+
+@contextmanager
+def acquire_registry_model():
+    """Pinjam versi aktif registry selama satu run halaman (None jika registry tidak dipakai)
+    
+    Versi yang sedang dipinjam tidak dilepas dari memori walaupun watcher sudah
+    menukarnya dengan versi baru.
+    """
+    if not MODEL_REGISTRY_DIR or INFERENCE_SERVER_URL:
+        yield None
+        return
+    registry = load_model_registry()
+    if registry.current is None:
+        yield None
+        return
+    with registry.acquire() as version:
+        yield version
+
+@st.cache_resource
+def load_inference_client():
+    """Client untuk inference server eksternal (jika INFERENCE_SERVER_URL diisi)"""
+    return InferenceClient(INFERENCE_SERVER_URL)
+
+@st.cache_resource
+def load_decode_pool():
+    """Thread pool decode + resize gambar, dipakai bersama oleh semua sesi"""
+    return DecodePool(DECODE_WORKERS)
+
+@st.cache_resource
+def load_result_cache():
+    """Cache hasil klasifikasi, dipakai bersama oleh semua sesi"""
+    return ResultCache(RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES, name='result')
+
+@st.cache_resource
+def load_overlay_renderer():
+    """Renderer overlay Grad-CAM + cache bytes JPEG/WebP, dipakai bersama oleh semua sesi"""
+    return OverlayRenderer()
+
 @st.cache_data
 def load_class_indices():
     """Load class indices mapping"""
@@ -371,95 +556,185 @@ def load_class_indices():
 # ====================================
 # FUNGSI PREDIKSI
 # ====================================
-def preprocess_image(image):
-    """Preprocess gambar untuk prediksi"""
-    # Resize image
-    img = image.resize(IMG_SIZE)
-    # Convert to array
-    img_array = np.array(img)
-    # Normalize
-    img_array = img_array.astype('float32') / 255.0
-    # Add batch dimension
-    img_array = np.expand_dims(img_array, axis=0)
-    return img_array
+class GradCAMUnavailable(RuntimeError):
+    """Model yang melayani prediksi tidak punya model Keras untuk Grad-CAM"""
+
+def explain_fish(image, engine, class_indices, last_conv_layer_name='last_conv', cache=None,
+                 explainer=None, keras_fallback=True):
+    """Prediksi + Grad-CAM untuk kelas teratas dalam satu pass model
+    
+    `image` boleh berupa PIL Image atau hasil prepare_image (uint8 150x150x3).
+    Jika cache diberikan, hasil disimpan dengan key hash piksel gambar (setelah
+    resize ke IMG_SIZE) + fingerprint engine dan explainer, sehingga gambar yang
+    sama tidak diproses ulang oleh TensorFlow.
+    `explainer` (GradCAMExplainer) dipakai jika diberikan, misalnya milik versi
+    registry yang aktif; jika tidak, explainer dibangun dari model engine/load_model().
+    Dengan keras_fallback=False (mode registry), backend tanpa model Keras tidak
+    memakai load_model() dari MODEL_PATH karena itu bisa model yang berbeda dari
+    yang membuat prediksi; GradCAMUnavailable di-raise sebagai gantinya.
+    
+    Return: (kelas, confidence, semua probabilitas, heatmap)
+    """
+    if explainer is None:
+        if engine.model is not None:
+            explainer = load_gradcam_explainer(engine.model, id(engine.model), last_conv_layer_name)
+        elif not keras_fallback:
+            raise GradCAMUnavailable("Versi model aktif tidak menyertakan model Keras, Grad-CAM dilewati")
+        else:
+            # Backend tanpa gradien (TFLite/ONNX): prediksi dari backend, Grad-CAM dari model Keras
+            model = load_model()
+            if model is None:
+                raise RuntimeError("Grad-CAM membutuhkan model Keras")
+            explainer = load_gradcam_explainer(model, id(model), last_conv_layer_name)
+    return explain_image(image, engine, class_indices, explainer, last_conv_layer_name, cache)
+
+# ====================================
+# PRELOAD & STARTUP TIMING
+# ====================================
+STARTUP_STAGES = (
+    ('first_render', "Render halaman pertama"),
+    ('import', "Import TensorFlow"),
+    ('load', "Load model"),
+    ('warmup', "Warm-up"),
+    ('gradcam_warmup', "Warm-up Grad-CAM"),
+)
 
-def predict_fish(image, model, class_indices):
-    """Melakukan prediksi klasifikasi pisang"""
-    # Preprocess
-    img_array = preprocess_image(image)
-    
-    # Predict
-    predictions = model.predict(img_array, verbose=0)
-    pred_class_idx = np.argmax(predictions[0])
-    confidence = predictions[0][pred_class_idx]
-    
-    # Get class name
-    idx_to_class = {v: k for k, v in class_indices.items()}
-    pred_class_name = idx_to_class[pred_class_idx]
-    
-    # Get all probabilities
-    all_probs = {}
-    for idx, prob in enumerate(predictions[0]):
-        class_name = idx_to_class[idx]
-        all_probs[class_name] = float(prob)
-    
-    return pred_class_name, confidence, all_probs
+@st.cache_resource(show_spinner=False)
+def load_ready_event():
+    """Di-set setelah engine (semua bucket) dan Grad-CAM selesai warm-up"""
+    return threading.Event()
 
-def make_gradcam_heatmap(img_array, model, last_conv_layer_name='last_conv', pred_index=None):
-    """Generate Grad-CAM heatmap untuk visualisasi model"""
-    # Create a model that maps input to the activations of the last conv layer and output predictions
-    last_conv_layer = model.get_layer(last_conv_layer_name)
-    # Use model.layers[-1].output instead of model.output to avoid list issue
-    output_layer = model.layers[-1].output
-    
-    grad_model = tf.keras.models.Model(
-        inputs=model.inputs,
-        outputs=[last_conv_layer.output, output_layer]
+@st.cache_resource(show_spinner=False)
+def load_preload_state():
+    """Hasil thread preload per proses: {'error': pesan atau None}, dibaca dari script thread"""
+    return {'error': None}
+
+def model_available():
+    """Ada file model untuk backend yang dipilih (atau model Keras sebagai fallback)"""
+    if MODEL_REGISTRY_DIR:
+        return bool(list_versions(MODEL_REGISTRY_DIR))
+    backend_path = BACKEND_MODEL_PATHS.get(INFERENCE_BACKEND)
+    return os.path.exists(MODEL_PATH) or (backend_path is not None and os.path.exists(backend_path))
+
+def format_startup_timings(timings):
+    return ", ".join(
+        f"{label}: {timings[stage]:.2f}s" for stage, label in STARTUP_STAGES if stage in timings
     )
-    
-    # Compute gradient of top predicted class with respect to the activations of the last conv layer
-    with tf.GradientTape() as tape:
-        conv_outputs, predictions = grad_model(img_array)
-        if pred_index is None:
-            pred_index = tf.argmax(predictions[0])
-        class_channel = predictions[:, pred_index]
-    
-    # Gradient of the predicted class with regard to the output feature map of the last conv layer
-    grads = tape.gradient(class_channel, conv_outputs)
-    
-    # Vector of mean intensity of the gradient over a specific feature map channel
-    pooled_grads = tf.reduce_mean(grads, axis=(0, 1, 2))
-    
-    # Multiply each channel by importance of the channel
-    conv_outputs = conv_outputs[0]
-    heatmap = conv_outputs @ pooled_grads[..., tf.newaxis]
-    heatmap = tf.squeeze(heatmap)
-    
-    # Normalize the heatmap
-    heatmap = tf.maximum(heatmap, 0)
-    max_val = tf.math.reduce_max(heatmap)
-    if max_val == 0:
-        return np.zeros(heatmap.shape)
-    heatmap = heatmap / max_val
-    return heatmap.numpy()
 
-def create_gradcam_overlay(image, heatmap, alpha=0.4):
-    """Create overlay of heatmap on original image"""
-    # Convert PIL image to numpy array
-    img_array = np.array(image.resize(IMG_SIZE))
-    
-    # Resize heatmap to match image size
-    heatmap_resized = cv2.resize(heatmap, (img_array.shape[1], img_array.shape[0]))
-    
-    # Convert heatmap to RGB
-    heatmap_uint8 = np.uint8(255 * heatmap_resized)
-    heatmap_colored = cv2.applyColorMap(heatmap_uint8, cv2.COLORMAP_JET)
-    heatmap_colored = cv2.cvtColor(heatmap_colored, cv2.COLOR_BGR2RGB)
-    
-    # Superimpose the heatmap on original image
-    superimposed = cv2.addWeighted(img_array, 1 - alpha, heatmap_colored, alpha, 0)
+def warm_up_gradcam(engine, last_conv_layer_name='last_conv'):
+    """Bangun + warm-up GradCAMExplainer yang nanti dipakai explain_fish"""
+    model = engine.model
+    if model is None and os.path.exists(MODEL_PATH):
+        model = load_model()
+    if model is None:
+        return
+    try:
+        explainer = load_gradcam_explainer(model, id(model), last_conv_layer_name)
+    except ValueError:
+        # Model tanpa layer last_conv: Grad-CAM tidak tersedia, prediksi tetap jalan
+        return
+    record_startup_timing('gradcam_warmup', explainer.warmup_seconds)
+
+def preload_model():
+    """Load + warm-up engine dan Grad-CAM di background agar halaman Klasifikasi langsung siap"""
+    try:
+        if MODEL_REGISTRY_DIR:
+            # Loader registry sudah warm-up engine + Grad-CAM sebelum versi diaktifkan
+            if load_model_registry().current is None:
+                return
+        else:
+            engine = load_inference_engine()
+            if engine is None:
+                return
+            warm_up_gradcam(engine)
+    except Exception as e:
+        # Halaman Klasifikasi menampilkan error ini dan memanggil loader yang sama lagi
+        load_preload_state()['error'] = f"{type(e).__name__}: {e}"
+        logger.exception("Preload model gagal")
+        return
+    load_preload_state()['error'] = None
+    load_ready_event().set()
+    logger.info("Startup model - %s", format_startup_timings(load_startup_timings()))
+
+@st.cache_resource(show_spinner=False)
+def start_model_preload():
+    """Jalankan preload sekali per proses (dipanggil setelah halaman pertama selesai dirender)"""
+    thread = threading.Thread(target=preload_model, name='model-preload', daemon=True)
+    thread.start()
+    return thread
+
+def show_model_status(engine):
+    """Status kesiapan model + laporan waktu startup (import, load, warm-up terpisah)"""
+    if not load_ready_event().is_set():
+        preload_error = load_preload_state()['error']
+        if preload_error:
+            st.warning(f"⚠️ Preload model di background gagal ({preload_error}); model di-load saat halaman ini dibuka.")
+        else:
+            st.info("⏳ Model sedang warm-up di background. Klasifikasi pertama mungkin sedikit lebih lama.")
     
-    return heatmap_colored, superimposed
+    timings = load_startup_timings()
+    stages = [(stage, label) for stage, label in STARTUP_STAGES if stage in timings]
+    if not stages:
+        return
+    with st.expander("⏱️ Waktu Startup Model"):
+        for col, (stage, label) in zip(st.columns(len(stages)), stages):
+            with col:
+                st.metric(label, f"{timings[stage]:.2f} s")
+        if engine.warmup_timings:
+            st.caption("Warm-up per ukuran batch: " + ", ".join(
+                f"{bucket} → {seconds * 1000:.0f} ms" for bucket, seconds in engine.warmup_timings.items()
+            ))
+
+# ====================================
+# ADMIN PANEL (METRICS)
+# ====================================
+STAGE_ORDER = ('decode', 'preprocess', 'predict', 'gradcam', 'overlay', 'encode', 'render')
+
+def show_admin_panel():
+    """Latency per tahap, counter, dan distribusi ukuran batch proses Streamlit ini"""
+    with st.expander("📈 Admin: Metrics"):
+        if not METRICS.enabled:
+            st.info("Metrics dimatikan (BANANA_METRICS=0).")
+            return
+        if INFERENCE_SERVER_URL:
+            st.caption(f"Inferensi berjalan di server: metrics model ada di {INFERENCE_SERVER_URL}/metrics")
+        
+        def ms(value):
+            return f"{value * 1000:.1f}" if value is not None else "-"
+        
+        stages = {row['stage']: row for row in METRICS.summary('stage_seconds')}
+        ordered = [stage for stage in STAGE_ORDER if stage in stages]
+        ordered += sorted(set(stages) - set(ordered))
+        st.markdown("**⏱️ Latency per Tahap (ms)**")
+        st.dataframe([
+            {"Tahap": stage, "Count": stages[stage]['count'], "Mean": ms(stages[stage]['mean']),
+             "p50": ms(stages[stage]['p50']), "p95": ms(stages[stage]['p95']),
+             "p99": ms(stages[stage]['p99'])}
+            for stage in ordered
+        ], use_container_width=True)
+        
+        st.markdown("**🔢 Counter**")
+        counters = []
+        for name in ('requests_total', 'errors_total', 'cache_hits_total', 'cache_misses_total'):
+            for labels, value in sorted(METRICS.counters(name).items()):
+                counters.append({"Metric": name, "Label": ", ".join(f"{k}={v}" for k, v in labels),
+                                 "Nilai": value})
+        st.dataframe(counters, use_container_width=True)
+        
+        st.markdown("**📦 Distribusi Ukuran Batch**")
+        for labels, histogram in sorted(METRICS.histograms('batch_size').items()):
+            buckets = [f"≤{bound}" for bound in histogram.bounds] + [f">{histogram.bounds[-1]}"]
+            st.caption(dict(labels).get('source', ''))
+            st.bar_chart({"Jumlah": dict(zip(buckets, histogram.counts))})
+        
+        col_a, col_b = st.columns(2)
+        with col_a:
+            st.download_button("📥 Prometheus (text)", METRICS.render_prometheus(),
+                               file_name="metrics.prom", mime="text/plain")
+        with col_b:
+            if st.button("🔄 Reset Metrics"):
+                METRICS.reset()
+                st.rerun()
 
 # ====================================
 # NAVBAR COMPONENT
@@ -983,17 +1258,29 @@ def show_about():
             st.session_state.page = "classify"
             st.rerun()
 
-def show_classify():
-    """Halaman Klasifikasi"""
+def show_classify(active=None):
+    """Halaman Klasifikasi
+    
+    `active` adalah versi registry yang dipinjam untuk run ini (None tanpa registry).
+    """
     st.title("🔍 Klasifikasi Jenis Pisang")
     st.markdown("Upload gambar pisang untuk mengetahui jenisnya dengan visualisasi AI")
     st.markdown("---")
     
-    # Load model
-    model = load_model()
-    class_indices = load_class_indices()
-    
-    if model is None or class_indices is None:
+    # Load model (atau pakai inference server / versi registry jika dikonfigurasi)
+    client = load_inference_client() if INFERENCE_SERVER_URL else None
+    explainer = None
+    if active is not None:
+        engine, class_indices = active.model.engine, active.model.class_indices
+        batcher, explainer = active.model.batcher, active.model.explainer
+    else:
+        uses_local_model = client is None and not MODEL_REGISTRY_DIR
+        engine = load_inference_engine() if uses_local_model else None
+        batcher = load_micro_batcher() if uses_local_model else None
+        class_indices = load_class_indices()
+    show_startup_notices()
+    
+    if (client is None and engine is None) or class_indices is None:
         st.error("⚠️ Model atau class indices tidak ditemukan!")
         st.warning("Pastikan Anda sudah menjalankan notebook dan menyimpan model.")
         st.info("📝 Langkah-langkah:")
@@ -1004,6 +1291,23 @@ def show_classify():
         """)
         return
     
+    if active is not None:
+        st.caption(f"🏷️ Model versi {active.name} (hash {active.hash[:12]})")
+    elif engine is not None:
+        show_model_status(engine)
+    elif not client.ready():
+        st.info("⏳ Inference server sedang warm-up. Request pertama bisa ditolak sementara (503).")
+    
+    # Pilih mode: satu gambar atau banyak gambar sekaligus
+    mode = st.radio(
+        "Mode Klasifikasi",
+        ["📷 Satu Gambar", "🗂️ Banyak Gambar (Batch)"],
+        horizontal=True
+    )
+    if mode.endswith("(Batch)"):
+        show_batch_classify(engine, class_indices, client)
+        return
+    
     # Main content
     col1, col2 = st.columns([1, 1])
     
@@ -1050,14 +1354,38 @@ def show_classify():
         if uploaded_file is not None:
             # Predict button
             if st.button("🔍 Mulai Klasifikasi", type="primary", use_container_width=True):
+                request_start = time.perf_counter()
+                METRICS.inc('requests_total', endpoint='classify')
                 with st.spinner("🔄 Memproses gambar..."):
                     try:
-                        # Predict
-                        pred_class, confidence, all_probs = predict_fish(
-                            image, model, class_indices
-                        )
+                        # Decode + resize sekali, dipakai bersama oleh prediksi dan overlay
+                        pixels = prepare_image(image)
+                        
+                        # Predict + Grad-CAM dalam satu forward/backward pass
+                        gradcam_error = None
+                        try:
+                            if client is not None:
+                                pred_class, confidence, all_probs, heatmap = client.explain(pixels)
+                            else:
+                                pred_class, confidence, all_probs, heatmap = explain_fish(
+                                    pixels, engine, class_indices, 'last_conv',
+                                    cache=load_result_cache(), explainer=explainer,
+                                    keras_fallback=not MODEL_REGISTRY_DIR
+                                )
+                        except Exception as e:
+                            # Model tanpa layer 'last_conv' / tanpa model Keras: tetap prediksi, Grad-CAM dilewati
+                            gradcam_error = e
+                            if not isinstance(e, GradCAMUnavailable):
+                                METRICS.inc('errors_total', endpoint='gradcam')
+                            if client is not None:
+                                pred_class, confidence, all_probs = client.predict(pixels)
+                            else:
+                                pred_class, confidence, all_probs = predict_fish(
+                                    pixels, batcher, class_indices
+                                )
                         
                         # Display result with animation
+                        render_start = time.perf_counter()
                         st.balloons()
                         st.success("✅ Prediksi berhasil!")
                         
@@ -1125,53 +1453,56 @@ def show_classify():
                         st.markdown("### 🔥 Visualisasi Grad-CAM")
                         st.info("💡 **Grad-CAM** menunjukkan bagian mana dari gambar yang paling berpengaruh dalam keputusan model.")
                         
-                        with st.spinner("🎨 Membuat visualisasi Grad-CAM..."):
-                            try:
-                                # Generate Grad-CAM
-                                img_array = preprocess_image(image)
-                                pred_idx = list(class_indices.values())[list(class_indices.keys()).index(pred_class)]
-                                
-                                # Debug info (optional - bisa di-comment jika sudah berhasil)
-                                st.write(f"🔍 Debug: Predicted class index = {pred_idx}")
-                                st.write(f"🔍 Debug: Image array shape = {img_array.shape}")
+                        if isinstance(gradcam_error, GradCAMUnavailable):
+                            st.info(f"ℹ️ {gradcam_error}. Export model Keras ke versi registry ini "
+                                    "untuk menampilkan visualisasi.")
+                        else:
+                            with st.spinner("🎨 Membuat visualisasi Grad-CAM..."):
+                                try:
+                                    # Heatmap sudah dihitung bersama prediksi
+                                    if gradcam_error is not None:
+                                        raise gradcam_error
+                                    pred_idx = class_indices[pred_class]
                                 
-                                # Make heatmap
-                                heatmap = make_gradcam_heatmap(img_array, model, 'last_conv', pred_idx)
+                                    # Debug info (optional - bisa di-comment jika sudah berhasil)
+                                    st.write(f"🔍 Debug: Predicted class index = {pred_idx}")
+                                    st.write(f"🔍 Debug: Heatmap shape = {heatmap.shape}")
                                 
-                                # Create overlay
-                                heatmap_colored, superimposed = create_gradcam_overlay(image, heatmap)
+                                    # Bytes JPEG/WebP (asli, heatmap, overlay) dari cache renderer;
+                                    # st.image mengirim bytes apa adanya tanpa encode ulang
+                                    visuals = load_overlay_renderer().encode(pixels, heatmap)
                                 
-                                # Display visualizations in columns
-                                viz_col1, viz_col2, viz_col3 = st.columns(3)
+                                    # Display visualizations in columns
+                                    viz_col1, viz_col2, viz_col3 = st.columns(3)
                                 
-                                with viz_col1:
-                                    st.markdown("**📷 Gambar Asli**")
-                                    st.image(image.resize(IMG_SIZE), use_column_width=True)
+                                    with viz_col1:
+                                        st.markdown("**📷 Gambar Asli**")
+                                        st.image(visuals['original'], use_column_width=True)
                                 
-                                with viz_col2:
-                                    st.markdown("**🔥 Heatmap**")
-                                    st.image(heatmap_colored, use_column_width=True, clamp=True)
+                                    with viz_col2:
+                                        st.markdown("**🔥 Heatmap**")
+                                        st.image(visuals['heatmap'], use_column_width=True)
                                 
-                                with viz_col3:
-                                    st.markdown("**✨ Overlay**")
-                                    st.image(superimposed, use_column_width=True, clamp=True)
+                                    with viz_col3:
+                                        st.markdown("**✨ Overlay**")
+                                        st.image(visuals['overlay'], use_column_width=True)
                                 
-                                st.markdown("""
-                                <div style='padding: 1rem; background: #f0f8ff; border-radius: 10px; margin-top: 1rem;'>
-                                    <p style='margin: 0; color: #555;'>
-                                    <strong>🔍 Interpretasi:</strong> Area berwarna <span style='color: red; font-weight: bold;'>merah/kuning</span> 
-                                    menunjukkan bagian yang <strong>paling penting</strong> untuk klasifikasi. 
-                                    Area <span style='color: blue; font-weight: bold;'>biru/ungu</span> kurang berpengaruh.
-                                    </p>
-                                </div>
-                                """, unsafe_allow_html=True)
+                                    st.markdown("""
+                                    <div style='padding: 1rem; background: #f0f8ff; border-radius: 10px; margin-top: 1rem;'>
+                                        <p style='margin: 0; color: #555;'>
+                                        <strong>🔍 Interpretasi:</strong> Area berwarna <span style='color: red; font-weight: bold;'>merah/kuning</span> 
+                                        menunjukkan bagian yang <strong>paling penting</strong> untuk klasifikasi. 
+                                        Area <span style='color: blue; font-weight: bold;'>biru/ungu</span> kurang berpengaruh.
+                                        </p>
+                                    </div>
+                                    """, unsafe_allow_html=True)
                                 
-                                st.success("✅ Visualisasi Grad-CAM berhasil dibuat!")
+                                    st.success("✅ Visualisasi Grad-CAM berhasil dibuat!")
                                 
-                            except Exception as e:
-                                st.error(f"❌ Error membuat visualisasi Grad-CAM:")
-                                st.exception(e)
-                                st.info("💡 Pastikan model memiliki layer 'last_conv'. Cek arsitektur model di notebook.")
+                                except Exception as e:
+                                    st.error(f"❌ Error membuat visualisasi Grad-CAM:")
+                                    st.exception(e)
+                                    st.info("💡 Pastikan model memiliki layer 'last_conv'. Cek arsitektur model di notebook.")
                         
                         # Download result button
                         st.markdown("---")
@@ -1192,8 +1523,13 @@ def show_classify():
                             file_name=f"hasil_klasifikasi_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
                             mime="text/plain"
                         )
+                        
+                        METRICS.observe('stage_seconds', time.perf_counter() - render_start, stage='render')
+                        METRICS.observe('request_seconds', time.perf_counter() - request_start,
+                                        endpoint='classify')
                     
                     except Exception as e:
+                        METRICS.inc('errors_total', endpoint='classify')
                         st.error(f"❌ Error saat prediksi: {str(e)}")
                         st.exception(e)
         else:
@@ -1225,6 +1561,85 @@ def show_classify():
             </div>
             """, unsafe_allow_html=True)
 
+def show_batch_classify(engine, class_indices, client=None):
+    """Klasifikasi banyak gambar sekaligus (mode batch)"""
+    st.header("🗂️ Klasifikasi Batch")
+    
+    uploaded_files = st.file_uploader(
+        "Pilih beberapa gambar pisang...",
+        type=['jpg', 'jpeg', 'png'],
+        accept_multiple_files=True,
+        help="Semua gambar diproses dalam satu atau beberapa batch sekaligus"
+    )
+    
+    with st.expander("⚙️ Pengaturan Batch"):
+        max_batch_size = st.slider(
+            "Ukuran batch maksimal",
+            min_value=1,
+            max_value=MAX_BATCH_SIZE,
+            value=MAX_BATCH_SIZE,
+            help="Jumlah gambar yang diproses dalam satu forward pass"
+        )
+    
+    if not uploaded_files:
+        st.info("👆 Upload beberapa gambar pisang untuk klasifikasi batch")
+        return
+    
+    st.write(f"📄 **{len(uploaded_files)}** gambar siap diklasifikasi")
+    
+    if st.button("🔍 Mulai Klasifikasi Batch", type="primary", use_container_width=True):
+        METRICS.inc('requests_total', endpoint='batch')
+        with st.spinner(f"🔄 Memproses {len(uploaded_files)} gambar..."):
+            try:
+                with METRICS.time('request_seconds', endpoint='batch'):
+                    # Decode + resize paralel (JPEG langsung di-decode di resolusi rendah)
+                    images = load_decode_pool().map([f.getvalue() for f in uploaded_files])
+                    if client is not None:
+                        results = client.predict_batch(images, max_batch_size)
+                    else:
+                        results = predict_batch(images, engine, class_indices, max_batch_size)
+            except Exception as e:
+                METRICS.inc('errors_total', endpoint='batch')
+                st.error(f"❌ Error saat prediksi batch: {str(e)}")
+                st.exception(e)
+                return
+        
+        st.success(f"✅ {len(results)} gambar berhasil diklasifikasi!")
+        
+        # Tabel hasil per gambar
+        rows = []
+        for uploaded_file, (pred_class, confidence, _) in zip(uploaded_files, results):
+            rows.append({
+                "File": uploaded_file.name,
+                "Jenis Pisang": pred_class,
+                "Confidence": f"{confidence:.1%}"
+            })
+        st.markdown("### 📋 Hasil per Gambar")
+        st.dataframe(rows, use_container_width=True)
+        
+        # Ringkasan jumlah per kelas
+        st.markdown("### 📊 Ringkasan")
+        counts = {}
+        for pred_class, _, _ in results:
+            counts[pred_class] = counts.get(pred_class, 0) + 1
+        cols = st.columns(max(len(counts), 1))
+        for col, (class_name, count) in zip(cols, sorted(counts.items(), key=lambda x: x[1], reverse=True)):
+            with col:
+                st.metric(f"🍌 {class_name}", count)
+        
+        # Download hasil dalam CSV
+        csv_buffer = io.StringIO()
+        writer = csv.writer(csv_buffer)
+        writer.writerow(["file", "jenis_pisang", "confidence"])
+        for uploaded_file, (pred_class, confidence, _) in zip(uploaded_files, results):
+            writer.writerow([uploaded_file.name, pred_class, f"{confidence:.4f}"])
+        st.download_button(
+            label="📥 Download Hasil (CSV)",
+            data=csv_buffer.getvalue(),
+            file_name=f"hasil_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            mime="text/csv"
+        )
+
 def show_contact():
     """Halaman Kontak"""
     st.title("📞 Hubungi Kami")
@@ -1290,6 +1705,8 @@ def show_contact():
 # MAIN APP WITH NAVIGATION
 # ====================================
 def main():
+    render_start = time.perf_counter()
+    
     # Load custom CSS
     load_css()
     
@@ -1304,14 +1721,26 @@ def main():
     if st.session_state.page == "home":
         show_home()
     elif st.session_state.page == "classify":
-        show_classify()
+        with acquire_registry_model() as active:
+            show_classify(active)
     elif st.session_state.page == "about":
         show_about()
     elif st.session_state.page == "contact":
         show_contact()
     
+    if ADMIN_PANEL:
+        show_admin_panel()
+    
     # Show Footer
     show_footer()
+    
+    # Setelah halaman pertama tampil, model di-load + warm-up di background
+    # (mode inference server tidak pernah memuat TensorFlow di proses ini)
+    timings = load_startup_timings()
+    if 'first_render' not in timings:
+        timings['first_render'] = time.perf_counter() - render_start
+    if not INFERENCE_SERVER_URL and model_available():
+        start_model_preload()
 
 if __name__ == "__main__":
     main()
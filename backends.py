@@ -0,0 +1,461 @@
+"""
+Inference Backends
+Backend inferensi yang bisa dipilih saat deploy (Keras/tf.function, TFLite, ONNX Runtime,
+NumPy dengan bobot memory-mapped)
+
+Modul ini tidak meng-import TensorFlow di level atas, sehingga backend ringan
+(TFLite via tflite_runtime, ONNX Runtime) tidak perlu memuat TensorFlow penuh.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from metrics import METRICS
+from preprocessing import IMG_SIZE, prepare_image, preprocess_batch, preprocess_image
+
+# ====================================
+# KONFIGURASI
+# ====================================
+BATCH_BUCKETS = (1, 4, 8, 16, 32)  # Ukuran batch yang disiapkan; batch lain di-padding ke atas
+BACKENDS = ('keras', 'tflite', 'onnx', 'mmap')
+TFLITE_MODEL_PATH = 'fish_classifier_model.tflite'
+ONNX_MODEL_PATH = 'fish_classifier_model.onnx'
+WEIGHTS_BUNDLE_PATH = 'fish_classifier_model_weights'  # Folder .npy + manifest.json
+
+
+def file_fingerprint(path):
+    """Hash SHA-1 isi file model, dipakai sebagai bagian key cache hasil"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def decode_prediction(probs, idx_to_class):
+    """Ubah vektor probabilitas satu gambar menjadi (kelas, confidence, semua probabilitas)"""
+    pred_class_idx = np.argmax(probs)
+    confidence = probs[pred_class_idx]
+    pred_class_name = idx_to_class[pred_class_idx]
+
+    # Get all probabilities
+    all_probs = {}
+    for idx, prob in enumerate(probs):
+        class_name = idx_to_class[idx]
+        all_probs[class_name] = float(prob)
+
+    return pred_class_name, confidence, all_probs
+
+
+# ====================================
+# PREDIKSI (dipakai web app, benchmark, dan load test)
+# ====================================
+def predict_fish(image, engine, class_indices):
+    """Melakukan prediksi klasifikasi pisang
+
+    `engine` boleh berupa engine backend mana pun atau MicroBatcher (punya predict).
+    """
+    img_array = preprocess_image(image)
+    predictions = engine.predict(img_array)
+    idx_to_class = {v: k for k, v in class_indices.items()}
+    return decode_prediction(predictions[0], idx_to_class)
+
+
+def predict_batch(images, engine, class_indices, max_batch_size=BATCH_BUCKETS[-1]):
+    """Prediksi banyak gambar sekaligus, satu forward pass per batch
+
+    Gambar di-stack menjadi tensor (N, 150, 150, 3) dengan N <= max_batch_size.
+    Hasil per gambar berbentuk sama dengan predict_fish: (kelas, confidence, semua probabilitas).
+    """
+    if max_batch_size < 1:
+        raise ValueError(f"max_batch_size harus >= 1, bukan {max_batch_size}")
+
+    idx_to_class = {v: k for k, v in class_indices.items()}
+    # Satu buffer float32 dipakai ulang untuk semua batch
+    buffer = np.empty((min(len(images), max_batch_size),) + IMG_SIZE + (3,), dtype=np.float32)
+    results = []
+    for start in range(0, len(images), max_batch_size):
+        chunk = images[start:start + max_batch_size]
+        batch = preprocess_batch(chunk, out=buffer[:len(chunk)])
+        predictions = engine.predict(batch)
+        results.extend(decode_prediction(probs, idx_to_class) for probs in predictions)
+    return results
+
+
+def explain_image(image, engine, class_indices, explainer, last_conv_layer_name='last_conv', cache=None):
+    """Prediksi + Grad-CAM untuk kelas teratas
+
+    `image` boleh berupa PIL Image atau hasil prepare_image (uint8 150x150x3).
+    Jika explainer (GradCAMExplainer) memakai model yang sama dengan engine,
+    prediksi dan heatmap dihitung dalam satu pass; jika tidak (backend
+    TFLite/ONNX/mmap), prediksi dari engine dan heatmap dari explainer.
+    Jika cache diberikan, hasil disimpan dengan key hash piksel gambar (setelah
+    resize ke IMG_SIZE) + fingerprint engine dan explainer, sehingga gambar yang
+    sama tidak diproses ulang dan heatmap dari model lain tidak terpakai.
+
+    Return: (kelas, confidence, semua probabilitas, heatmap)
+    """
+    pixels = prepare_image(image)
+
+    result = None
+    if cache is not None:
+        cache_key = cache.make_key(
+            pixels, f"{engine.fingerprint}:{explainer.fingerprint}:{last_conv_layer_name}"
+        )
+        result = cache.get(cache_key)
+
+    if result is None:
+        img_array = preprocess_image(pixels)
+        if explainer.model is engine.model:
+            predictions, heatmap = explainer.explain(img_array)
+            probs = predictions[0]
+        else:
+            probs = engine.predict(img_array)[0]
+            heatmap = explainer.heatmap(img_array, int(np.argmax(probs)))
+        result = (probs, heatmap)
+        if cache is not None:
+            cache.put(cache_key, result)
+
+    probs, heatmap = result
+    idx_to_class = {v: k for k, v in class_indices.items()}
+    pred_class, confidence, all_probs = decode_prediction(probs, idx_to_class)
+    return pred_class, confidence, all_probs, heatmap
+
+
+# ====================================
+# BASE ENGINE
+# ====================================
+class BucketedEngine:
+    """Logika bersama semua backend: validasi input, padding ke bucket, warm-up
+
+    Subclass cukup mengimplementasikan _run_padded(batch, bucket) untuk batch
+    yang ukurannya tepat sama dengan salah satu bucket.
+    """
+
+    model = None  # Model Keras (hanya backend keras; dibutuhkan untuk Grad-CAM)
+
+    def __init__(self, num_classes, batch_buckets=BATCH_BUCKETS):
+        self.batch_buckets = tuple(sorted(set(batch_buckets)))
+        self.max_batch_size = self.batch_buckets[-1]
+        self.input_shape = IMG_SIZE + (3,)
+        self.num_classes = num_classes
+        self.warmup_seconds = None  # Total waktu warm-up; None = belum warm-up
+        self.warmup_timings = {}  # Waktu warm-up per bucket (detik)
+
+    def _run_padded(self, batch, bucket):
+        raise NotImplementedError
+
+    def bucket_for(self, n):
+        """Bucket terkecil yang muat untuk n gambar"""
+        for bucket in self.batch_buckets:
+            if bucket >= n:
+                return bucket
+        return self.max_batch_size
+
+    def _run_bucket(self, chunk):
+        n = len(chunk)
+        bucket = self.bucket_for(n)
+        if bucket != n:
+            padded = np.zeros((bucket,) + self.input_shape, dtype=np.float32)
+            padded[:n] = chunk
+            chunk = padded
+        return self._run_padded(chunk, bucket)[:n]
+
+    def predict(self, batch):
+        """Prediksi batch (N, 150, 150, 3) -> probabilitas (N, num_classes)"""
+        batch = np.asarray(batch, dtype=np.float32)
+        if batch.shape[1:] != self.input_shape:
+            raise ValueError(
+                f"Input harus berbentuk (N, {', '.join(map(str, self.input_shape))}), "
+                f"bukan {batch.shape}"
+            )
+        if len(batch) == 0:
+            return np.zeros((0, self.num_classes), dtype=np.float32)
+
+        outputs = []
+        with METRICS.time('stage_seconds', stage='predict'):
+            for start in range(0, len(batch), self.max_batch_size):
+                chunk = batch[start:start + self.max_batch_size]
+                METRICS.observe('batch_size', len(chunk), source='engine')
+                outputs.append(self._run_bucket(chunk))
+        return np.concatenate(outputs, axis=0)
+
+    @property
+    def ready(self):
+        """True setelah semua bucket selesai warm-up"""
+        return self.warmup_seconds is not None
+
+    def warmup(self):
+        """Jalankan setiap bucket sekali dengan batch nol
+
+        Tracing graph, alokasi tensor dan pemilihan kernel terjadi di sini, bukan
+        pada request pertama untuk ukuran batch tersebut.
+        """
+        timings = {}
+        total_start = time.perf_counter()
+        for bucket in self.batch_buckets:
+            start = time.perf_counter()
+            self._run_padded(np.zeros((bucket,) + self.input_shape, dtype=np.float32), bucket)
+            timings[bucket] = time.perf_counter() - start
+        self.warmup_timings = timings
+        self.warmup_seconds = time.perf_counter() - total_start
+        return self.warmup_seconds
+
+
+# ====================================
+# TFLITE BACKEND
+# ====================================
+def load_tflite_interpreter_class():
+    """Pakai tflite_runtime jika terpasang (tanpa TensorFlow penuh), jika tidak tf.lite"""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteEngine(BucketedEngine):
+    """Backend TFLite interpreter
+
+    Satu interpreter per bucket (tensor input sudah di-resize dan di-allocate),
+    masing-masing dengan lock karena interpreter TFLite tidak thread-safe.
+    Delegate XNNPACK dipakai otomatis oleh op resolver bawaan untuk model float;
+    num_threads mengatur jumlah thread-nya. Model int8 penuh (input/output
+    terkuantisasi) ditangani dengan quantize/dequantize di sisi Python.
+    """
+
+    def __init__(self, model_path=TFLITE_MODEL_PATH, num_threads=None,
+                 batch_buckets=BATCH_BUCKETS, warmup=True):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model TFLite tidak ditemukan: {model_path}")
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self.fingerprint = file_fingerprint(model_path)
+        self._interpreter_cls = load_tflite_interpreter_class()
+        self._interpreters = {}
+        self._create_lock = threading.Lock()
+
+        probe = self._interpreter_cls(model_path=model_path)
+        num_classes = int(probe.get_output_details()[0]['shape'][-1])
+        super().__init__(num_classes, batch_buckets)
+
+        if warmup:
+            self.warmup()
+
+    def _get_interpreter(self, bucket):
+        entry = self._interpreters.get(bucket)
+        if entry is None:
+            with self._create_lock:
+                entry = self._interpreters.get(bucket)
+                if entry is None:
+                    interpreter = self._interpreter_cls(
+                        model_path=self.model_path, num_threads=self.num_threads
+                    )
+                    input_index = interpreter.get_input_details()[0]['index']
+                    interpreter.resize_tensor_input(input_index, (bucket,) + self.input_shape)
+                    interpreter.allocate_tensors()
+                    entry = (interpreter, threading.Lock())
+                    self._interpreters[bucket] = entry
+        return entry
+
+    @staticmethod
+    def _quantize(batch, details):
+        if details['dtype'] == np.float32:
+            return batch
+        scale, zero_point = details['quantization']
+        info = np.iinfo(details['dtype'])
+        quantized = np.round(batch / scale + zero_point)
+        return np.clip(quantized, info.min, info.max).astype(details['dtype'])
+
+    @staticmethod
+    def _dequantize(output, details):
+        if details['dtype'] == np.float32:
+            return output
+        scale, zero_point = details['quantization']
+        return (output.astype(np.float32) - zero_point) * scale
+
+    def _run_padded(self, batch, bucket):
+        interpreter, lock = self._get_interpreter(bucket)
+        input_details = interpreter.get_input_details()[0]
+        output_details = interpreter.get_output_details()[0]
+        with lock:
+            interpreter.set_tensor(input_details['index'], self._quantize(batch, input_details))
+            interpreter.invoke()
+            output = interpreter.get_tensor(output_details['index'])
+        return self._dequantize(output, output_details)
+
+
+# ====================================
+# ONNX RUNTIME BACKEND
+# ====================================
+class ONNXEngine(BucketedEngine):
+    """Backend ONNX Runtime (CPU), tanpa TensorFlow sama sekali
+
+    Graph optimization penuh (ORT_ENABLE_ALL) dan jumlah thread intra/inter-op
+    bisa diatur. InferenceSession.run thread-safe, jadi satu session cukup.
+    """
+
+    def __init__(self, model_path=ONNX_MODEL_PATH, intra_op_threads=None, inter_op_threads=None,
+                 batch_buckets=BATCH_BUCKETS, warmup=True):
+        import onnxruntime as ort
+
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model ONNX tidak ditemukan: {model_path}")
+        self.model_path = model_path
+        self.fingerprint = file_fingerprint(model_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads:
+            options.inter_op_num_threads = inter_op_threads
+        self._session = ort.InferenceSession(
+            model_path, sess_options=options, providers=['CPUExecutionProvider']
+        )
+        self._input_name = self._session.get_inputs()[0].name
+
+        super().__init__(int(self._session.get_outputs()[0].shape[-1]), batch_buckets)
+
+        if warmup:
+            self.warmup()
+
+    def _run_padded(self, batch, bucket):
+        return self._session.run(None, {self._input_name: batch})[0]
+
+
+# ====================================
+# NUMPY BACKEND (BOBOT MEMORY-MAPPED)
+# ====================================
+def conv2d_same(x, kernel, bias):
+    """Conv2D stride 1 padding 'same' (NHWC): satu matmul per posisi kernel, tanpa im2col penuh"""
+    n, h, w, _ = x.shape
+    kh, kw, _, cout = kernel.shape
+    top, left = (kh - 1) // 2, (kw - 1) // 2
+    padded = np.pad(x, ((0, 0), (top, kh - 1 - top), (left, kw - 1 - left), (0, 0)))
+    out = np.empty((n, h, w, cout), dtype=np.float32)
+    out[...] = bias
+    for i in range(kh):
+        for j in range(kw):
+            out += padded[:, i:i + h, j:j + w, :] @ kernel[i, j]
+    return out
+
+
+def max_pool(x, pool_size):
+    """MaxPooling2D dengan stride == pool_size dan padding 'valid'"""
+    ph, pw = pool_size
+    n, h, w, c = x.shape
+    h, w = h // ph, w // pw
+    return x[:, :h * ph, :w * pw].reshape(n, h, ph, w, pw, c).max(axis=(2, 4))
+
+
+def softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    'softmax': softmax,
+}
+
+
+class MMapEngine(BucketedEngine):
+    """Forward pass NumPy dengan bobot dari bundle .npy yang di-memory-map
+
+    Bundle dibuat oleh model_export.export_weight_bundle. np.load(mmap_mode='r')
+    memetakan file bobot langsung dari page cache (read-only), sehingga N worker
+    di satu mesin berbagi satu salinan bobot alih-alih N salinan privat seperti
+    setelah tf.keras.models.load_model. Arsitektur yang didukung: Conv2D 'same',
+    MaxPooling2D, Flatten, Dense (Dropout dilewati) - sesuai build_cnn di cnn_model.py.
+
+    Tidak ada graph yang perlu di-trace, jadi batch tidak di-padding ke bucket;
+    warm-up hanya menyentuh halaman bobot agar sudah ada di page cache.
+    """
+
+    def __init__(self, model_path=WEIGHTS_BUNDLE_PATH, batch_buckets=BATCH_BUCKETS, warmup=True):
+        manifest_path = os.path.join(model_path, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError(f"Bundle bobot tidak ditemukan: {model_path}")
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+
+        self.model_path = model_path
+        self.layers = []
+        digest = hashlib.sha1()
+        for spec in manifest['layers']:
+            layer = dict(spec)
+            for key in ('kernel', 'bias'):
+                if key in spec:
+                    path = os.path.join(model_path, spec[key])
+                    layer[key] = np.load(path, mmap_mode='r')
+                    digest.update(file_fingerprint(path).encode('ascii'))
+            self.layers.append(layer)
+        self.fingerprint = digest.hexdigest()
+
+        super().__init__(int(self.layers[-1]['kernel'].shape[-1]), batch_buckets)
+        if tuple(manifest['input_shape']) != self.input_shape:
+            raise ValueError(f"Bundle untuk input {manifest['input_shape']}, bukan {self.input_shape}")
+
+        if warmup:
+            self.warmup()
+
+    def _forward(self, x):
+        for layer in self.layers:
+            kind = layer['type']
+            if kind == 'conv2d':
+                x = ACTIVATIONS[layer['activation']](conv2d_same(x, layer['kernel'], layer['bias']))
+            elif kind == 'maxpool':
+                x = max_pool(x, layer['pool_size'])
+            elif kind == 'flatten':
+                x = x.reshape(len(x), -1)
+            elif kind == 'dense':
+                x = x @ layer['kernel']
+                if 'bias' in layer:
+                    x += layer['bias']
+                x = ACTIVATIONS[layer['activation']](x)
+        return x.astype(np.float32, copy=False)
+
+    def warmup(self):
+        """Satu forward pass batch 1 sudah cukup untuk memuat halaman bobot ke page cache"""
+        start = time.perf_counter()
+        self._forward(np.zeros((1,) + self.input_shape, dtype=np.float32))
+        self.warmup_seconds = time.perf_counter() - start
+        self.warmup_timings = {1: self.warmup_seconds}
+        return self.warmup_seconds
+
+    def _run_bucket(self, chunk):
+        return self._forward(chunk)
+
+    def _run_padded(self, batch, bucket):
+        return self._forward(batch)
+
+
+# ====================================
+# FACTORY
+# ====================================
+def create_engine(backend='keras', model_path=None, num_threads=None, batch_buckets=BATCH_BUCKETS):
+    """Buat engine sesuai backend yang dipilih saat deploy
+
+    num_threads dipakai sebagai jumlah thread interpreter (tflite) atau
+    intra-op threads (onnx); backend keras mengikuti konfigurasi TensorFlow dan
+    backend mmap mengikuti thread BLAS NumPy (mis. OMP_NUM_THREADS).
+    """
+    if backend == 'keras':
+        from inference import MODEL_PATH, InferenceEngine, load_keras_model
+        return InferenceEngine(load_keras_model(model_path or MODEL_PATH), batch_buckets=batch_buckets)
+    if backend == 'tflite':
+        return TFLiteEngine(model_path or TFLITE_MODEL_PATH, num_threads, batch_buckets)
+    if backend == 'onnx':
+        return ONNXEngine(model_path or ONNX_MODEL_PATH, num_threads, batch_buckets=batch_buckets)
+    if backend == 'mmap':
+        return MMapEngine(model_path or WEIGHTS_BUNDLE_PATH, batch_buckets)
+    raise ValueError(f"Backend tidak dikenal: {backend} (pilihan: {', '.join(BACKENDS)})")
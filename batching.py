@@ -0,0 +1,142 @@
+"""
+Micro-Batching Scheduler
+Gabungkan request satu-gambar dari banyak thread menjadi satu forward pass
+"""
+
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+
+from metrics import METRICS
+
+# ====================================
+# KONFIGURASI
+# ====================================
+MAX_BATCH_SIZE = 32
+MAX_LATENCY_MS = 5.0  # Waktu tunggu maksimal untuk mengumpulkan batch
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Antrian bersama di depan fungsi batch (mis. InferenceEngine.predict)
+
+    Setiap pemanggil mengirim satu sampel dan menerima Future. Thread dispatcher
+    mengambil request pertama, menunggu paling lama `max_latency_ms` untuk request
+    lain (hingga `max_batch_size`), menjalankan `batch_fn` sekali untuk seluruh
+    batch, lalu mengisi Future masing-masing pemanggil dengan barisnya.
+
+    `batch_fn` menerima satu atau lebih array yang di-stack pada axis 0 dan
+    mengembalikan array (atau tuple array) dengan baris yang sesuai urutan input.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=MAX_BATCH_SIZE, max_latency_ms=MAX_LATENCY_MS):
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size harus >= 1, bukan {max_batch_size}")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self.batch_sizes = Counter()  # Distribusi ukuran batch yang di-dispatch
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._close_lock = threading.Lock()  # Cek _closed + put ke antrian harus atomik
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    # ------------------------------------
+    # API pemanggil
+    # ------------------------------------
+    def submit(self, *sample):
+        """Kirim satu sampel (tanpa dimensi batch) -> Future berisi baris hasilnya"""
+        future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("MicroBatcher sudah ditutup")
+            self._queue.put((sample, future))
+        return future
+
+    def predict(self, batch, timeout=None):
+        """Drop-in untuk InferenceEngine.predict: (N, 150, 150, 3) -> (N, num_classes)
+
+        Setiap gambar dikirim sebagai request terpisah sehingga bisa digabung
+        dengan request dari sesi/thread lain. Batch kosong langsung diteruskan ke
+        batch_fn (InferenceEngine.predict mengembalikan array (0, num_classes)).
+        """
+        if len(batch) == 0:
+            return self.batch_fn(np.asarray(batch, dtype=np.float32))
+        futures = [self.submit(sample) for sample in batch]
+        return np.stack([future.result(timeout) for future in futures])
+
+    def close(self):
+        """Hentikan dispatcher setelah semua request di antrian selesai"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+        self._fail_pending()
+
+    def _fail_pending(self):
+        """Gagalkan request yang tertinggal di antrian setelah dispatcher berhenti"""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(RuntimeError("MicroBatcher sudah ditutup"))
+
+    # ------------------------------------
+    # Dispatcher
+    # ------------------------------------
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        # Lewati request yang sudah dibatalkan pemanggilnya
+        batch = [(sample, future) for sample, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        self.batch_sizes[len(batch)] += 1
+        METRICS.observe('batch_size', len(batch), source='micro_batcher')
+
+        try:
+            inputs = [np.stack(arrays) for arrays in zip(*(sample for sample, _ in batch))]
+            outputs = self.batch_fn(*inputs)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for i, (_, future) in enumerate(batch):
+            if isinstance(outputs, tuple):
+                future.set_result(tuple(output[i] for output in outputs))
+            else:
+                future.set_result(outputs[i])
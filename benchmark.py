@@ -0,0 +1,414 @@
+"""
+Benchmark Suite
+Ukur preprocess_image, predict_fish, Grad-CAM (GradCAMExplainer.heatmap), dan create_gradcam_overlay
+untuk berbagai ukuran foto, ukuran batch, dan jumlah thread
+
+Jalankan:
+    python benchmark.py --output benchmark_results.json
+    python benchmark.py --baseline benchmark_baseline.json          # bandingkan + tandai regresi
+    python benchmark.py --save-baseline benchmark_baseline.json     # simpan hasil sebagai baseline
+
+Setiap jumlah thread dijalankan di proses baru (spawn) karena thread pool
+TensorFlow tidak bisa diubah setelah runtime berjalan. Tanpa --threads, sweep
+default adalah 0 (default TensorFlow, semua core) lalu 1, 2, 4, 8 thread selama
+tidak melebihi jumlah core mesin.
+Fungsi yang diukur adalah fungsi yang sama dengan yang dipanggil app_streamlit.py,
+di-import dari modul non-UI (backends, overlay, preprocessing, inference) supaya
+Streamlit tidak ikut dimuat. Kasus Grad-CAM satu gambar tetap bernama
+make_gradcam_heatmap agar baseline lama tetap sebanding. Untuk batch > 1
+dipakai versi batch-nya (predict_batch, GradCAMExplainer.heatmaps, render_overlays).
+Jika fish_classifier_model.keras tidak ada, dipakai model sintetis dengan arsitektur
+build_cnn (bobot acak, seed tetap): latency-nya sama karena arsitekturnya sama.
+
+Gambar uji adalah foto JPEG sintetis (gradien halus + noise, rasio 4:3) dengan sisi
+terpanjang = ukuran yang diminta, dibuat deterministik dari seed yang sama.
+Regresi = p50 naik lebih dari --threshold dibanding baseline untuk kasus yang sama.
+"""
+
+import argparse
+import io
+import json
+import multiprocessing as mp
+import os
+import platform
+import queue
+import sys
+import time
+from datetime import datetime
+
+# ====================================
+# KONFIGURASI
+# ====================================
+MODEL_PATH = 'fish_classifier_model.keras'
+CLASS_INDICES_PATH = 'class_indices.json'
+RESULTS_PATH = 'benchmark_results.json'
+RESULTS_VERSION = 1
+IMAGE_SIZES = (150, 640, 1280, 2000, 4000)  # Sisi terpanjang foto (px)
+BATCH_SIZES = (1, 4, 16, 32)
+# 0 = default TensorFlow (semua core), lalu jumlah thread tetap yang muat di mesin ini
+THREAD_COUNTS = (0,) + tuple(n for n in (1, 2, 4, 8) if n <= (os.cpu_count() or 1))
+BENCHMARKS = ('preprocess', 'predict', 'gradcam', 'overlay')
+REPEATS = 20
+WARMUP_REPEATS = 3
+REGRESSION_THRESHOLD = 0.15  # p50 naik > 15% = regresi
+JPEG_QUALITY = 90
+SEED = 42
+WORKER_TIMEOUT = 1800  # Detik per jumlah thread
+
+
+# ====================================
+# INPUT SINTETIS
+# ====================================
+def synthetic_photo(size, seed=SEED):
+    """Foto RGB sintetis 4:3 dengan sisi terpanjang `size` -> bytes JPEG"""
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(seed + size)
+    width, height = size, max(1, size * 3 // 4)
+    # Gradien halus (grid kecil di-upscale) + noise, mirip foto dibanding noise murni
+    base = Image.fromarray(rng.integers(0, 256, (6, 8, 3), dtype=np.uint8)).resize(
+        (width, height), Image.BICUBIC
+    )
+    noise = rng.integers(-12, 13, (height, width, 3), dtype=np.int16)
+    pixels = np.clip(np.asarray(base, dtype=np.int16) + noise, 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG', quality=JPEG_QUALITY)
+    return buffer.getvalue()
+
+
+def load_benchmark_model(model_path=MODEL_PATH, num_classes=None):
+    """Model Keras terlatih jika ada, selain itu build_cnn dengan bobot acak
+
+    Return: (model, sumber model) dengan sumber = path model atau 'synthetic'
+    """
+    import tensorflow as tf
+
+    if model_path and os.path.exists(model_path):
+        return tf.keras.models.load_model(model_path), model_path
+
+    from cnn_model import build_cnn
+    tf.random.set_seed(SEED)
+    return build_cnn(num_classes=num_classes), 'synthetic'
+
+
+def load_benchmark_class_indices():
+    with open(CLASS_INDICES_PATH, 'r') as f:
+        return json.load(f)
+
+
+# ====================================
+# PENGUKURAN
+# ====================================
+def percentile(sorted_values, q):
+    """Persentil dengan interpolasi linear dari list yang sudah terurut"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def time_call(fn, repeats=REPEATS, warmup=WARMUP_REPEATS):
+    """Durasi `repeats` panggilan fn() dalam detik, setelah `warmup` panggilan yang tidak diukur"""
+    for _ in range(warmup):
+        fn()
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def summarize(name, durations, size=None, batch_size=1, threads=0):
+    """Satu baris hasil: statistik dalam milidetik + throughput gambar/detik"""
+    durations = sorted(durations)
+    p50 = percentile(durations, 0.50)
+    return {
+        'name': name,
+        'size': size,
+        'batch_size': batch_size,
+        'threads': threads,
+        'repeats': len(durations),
+        'mean_ms': sum(durations) / len(durations) * 1000,
+        'p50_ms': p50 * 1000,
+        'p95_ms': percentile(durations, 0.95) * 1000,
+        'min_ms': durations[0] * 1000,
+        'per_image_ms': p50 * 1000 / batch_size,
+        'images_per_sec': batch_size / p50 if p50 > 0 else None,
+    }
+
+
+def case_key(row):
+    """Identitas kasus untuk membandingkan dengan baseline"""
+    return row['name'], row['size'], row['batch_size'], row['threads']
+
+
+def describe_case(row):
+    parts = [row['name']]
+    if row['size'] is not None:
+        parts.append(f"{row['size']}px")
+    parts.append(f"batch {row['batch_size']}")
+    parts.append(f"threads {row['threads'] or 'auto'}")
+    return ', '.join(parts)
+
+
+def run_benchmarks(threads, sizes, batch_sizes, benchmarks, repeats, warmup, model_path):
+    """Jalankan semua kasus di proses ini -> (info lingkungan, list baris hasil)
+
+    Harus dipanggil sebelum operasi TensorFlow pertama di proses ini.
+    """
+    import tensorflow as tf
+
+    if threads:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    import numpy as np
+    from PIL import Image
+
+    from backends import predict_batch, predict_fish
+    from inference import GradCAMExplainer, InferenceEngine
+    from overlay import create_gradcam_overlay, render_overlays
+    from preprocessing import decode_to_array, prepare_image, preprocess_batch, preprocess_image
+
+    class_indices = load_benchmark_class_indices()
+    model, model_source = load_benchmark_model(model_path, len(class_indices))
+    engine = InferenceEngine(model)
+    explainer = GradCAMExplainer(model, 'last_conv')
+
+    photos = {size: synthetic_photo(size) for size in sizes}
+    # Input model: piksel uint8 150x150 hasil prepare_image, seperti di app
+    pixels = [prepare_image(photos[size]) for size in sizes]
+    pixels = [pixels[i % len(pixels)] for i in range(max(batch_sizes))]
+    heatmap = explainer.heatmap(preprocess_batch(pixels[:1]))
+
+    rows = []
+
+    def record(name, fn, size=None, batch_size=1):
+        row = summarize(name, time_call(fn, repeats, warmup), size, batch_size, threads)
+        print(f"   {describe_case(row):<48} p50 {row['p50_ms']:9.2f} ms", flush=True)
+        rows.append(row)
+
+    if 'preprocess' in benchmarks:
+        for size in sizes:
+            record('preprocess_image', lambda: preprocess_image(photos[size]), size)
+            # Jalur batch/server: JPEG di-decode langsung di resolusi rendah (draft)
+            record('decode_to_array_draft', lambda: decode_to_array(photos[size], draft=True), size)
+
+    if 'predict' in benchmarks:
+        record('predict_fish', lambda: predict_fish(pixels[0], engine, class_indices))
+        for batch_size in batch_sizes:
+            batch = pixels[:batch_size]
+            record('predict_batch',
+                   lambda: predict_batch(batch, engine, class_indices, batch_size),
+                   batch_size=batch_size)
+
+    if 'gradcam' in benchmarks:
+        img_array = preprocess_batch(pixels[:1])
+        # Nama kasus lama dipertahankan agar sebanding dengan baseline yang sudah ada
+        record('make_gradcam_heatmap', lambda: explainer.heatmap(img_array))
+        for batch_size in batch_sizes:
+            batch = preprocess_batch(pixels[:batch_size])
+            record('gradcam_heatmaps', lambda: explainer.heatmaps(batch), batch_size=batch_size)
+
+    if 'overlay' in benchmarks:
+        for size in sizes:
+            # Di app, overlay dibuat dari PIL Image hasil upload (resize ke IMG_SIZE termasuk)
+            image = Image.open(io.BytesIO(photos[size]))
+            image.load()
+            record('create_gradcam_overlay', lambda: create_gradcam_overlay(image, heatmap), size)
+        for batch_size in batch_sizes:
+            images = np.stack(pixels[:batch_size])
+            heatmaps = np.repeat(heatmap[np.newaxis], batch_size, axis=0)
+            record('render_overlays', lambda: render_overlays(images, heatmaps), batch_size=batch_size)
+
+    environment = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'tensorflow': tf.__version__,
+        'numpy': np.__version__,
+        'model': model_source,
+    }
+    return environment, rows
+
+
+def _benchmark_worker(threads, sizes, batch_sizes, benchmarks, repeats, warmup, model_path, results):
+    try:
+        results.put(run_benchmarks(threads, sizes, batch_sizes, benchmarks, repeats, warmup,
+                                   model_path) + (None,))
+    except Exception as e:
+        results.put((None, [], f"{type(e).__name__}: {e}"))
+
+
+def benchmark_threads(threads, sizes=IMAGE_SIZES, batch_sizes=BATCH_SIZES, benchmarks=BENCHMARKS,
+                      repeats=REPEATS, warmup=WARMUP_REPEATS, model_path=MODEL_PATH):
+    """Semua kasus untuk satu jumlah thread, di proses baru
+
+    Return: (info lingkungan, list baris hasil, error atau None)
+    """
+    ctx = mp.get_context('spawn')
+    results = ctx.Queue()
+    process = ctx.Process(
+        target=_benchmark_worker,
+        args=(threads, sizes, batch_sizes, benchmarks, repeats, warmup, model_path, results),
+        daemon=True,
+    )
+    process.start()
+    deadline = time.monotonic() + WORKER_TIMEOUT
+    try:
+        while True:
+            try:
+                return results.get(timeout=1.0)
+            except queue.Empty:
+                if not process.is_alive():
+                    return None, [], f"Proses benchmark berhenti (exit code {process.exitcode})"
+                if time.monotonic() > deadline:
+                    return None, [], f"Timeout {WORKER_TIMEOUT} s"
+    finally:
+        process.join(timeout=10)
+        if process.is_alive():
+            process.terminate()
+
+
+# ====================================
+# HASIL & BASELINE
+# ====================================
+def save_results(path, environment, rows, settings):
+    data = {
+        'version': RESULTS_VERSION,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment,
+        'settings': settings,
+        'results': rows,
+    }
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_results(path):
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if data.get('version') != RESULTS_VERSION:
+        raise ValueError(f"Versi file hasil {path} tidak didukung: {data.get('version')}")
+    return data
+
+
+def compare_results(baseline_rows, rows, threshold=REGRESSION_THRESHOLD):
+    """Bandingkan p50 per kasus -> list (baris, p50 baseline, rasio, regresi?)
+
+    Kasus yang tidak ada di baseline dilewati.
+    """
+    baseline = {case_key(row): row for row in baseline_rows}
+    comparisons = []
+    for row in rows:
+        reference = baseline.get(case_key(row))
+        if reference is None or not reference['p50_ms']:
+            continue
+        ratio = row['p50_ms'] / reference['p50_ms']
+        comparisons.append((row, reference['p50_ms'], ratio, ratio > 1 + threshold))
+    return comparisons
+
+
+def environment_differences(baseline_env, environment):
+    """Field lingkungan yang berbeda dari baseline (hasil mungkin tidak sebanding)"""
+    keys = ('cpus', 'tensorflow', 'numpy', 'model')
+    return [
+        f"{key}: {baseline_env.get(key)} -> {environment.get(key)}"
+        for key in keys if baseline_env.get(key) != environment.get(key)
+    ]
+
+
+def print_results(rows):
+    print("\n" + "="*84)
+    print("BENCHMARK")
+    print("="*84)
+    print(f"{'Kasus':<48} {'p50':>8} {'p95':>8} {'min':>8} {'/gambar':>8}  (ms)")
+    print("-"*84)
+    for row in rows:
+        print(f"{describe_case(row):<48} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+              f"{row['min_ms']:>8.2f} {row['per_image_ms']:>8.2f}")
+    print("="*84)
+
+
+def print_comparison(comparisons, threshold):
+    print("\n" + "="*84)
+    print(f"PERBANDINGAN DENGAN BASELINE (regresi jika p50 naik > {threshold:.0%})")
+    print("="*84)
+    print(f"{'Kasus':<48} {'baseline':>9} {'sekarang':>9} {'rasio':>7}")
+    print("-"*84)
+    for row, baseline_p50, ratio, regressed in comparisons:
+        flag = '  ❌ REGRESI' if regressed else ('  ✅ lebih cepat' if ratio < 1 - threshold else '')
+        print(f"{describe_case(row):<48} {baseline_p50:>9.2f} {row['p50_ms']:>9.2f} "
+              f"{ratio:>6.2f}x{flag}")
+    print("="*84)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark preprocessing, inferensi, dan Grad-CAM")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(IMAGE_SIZES),
+                        help="Sisi terpanjang foto uji (px)")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=list(BATCH_SIZES))
+    parser.add_argument('--threads', type=int, nargs='+', default=list(THREAD_COUNTS),
+                        help="Jumlah intra-op thread TensorFlow (0 = default), "
+                             f"default sweep: {' '.join(map(str, THREAD_COUNTS))}")
+    parser.add_argument('--benchmarks', nargs='+', default=list(BENCHMARKS), choices=BENCHMARKS)
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--warmup', type=int, default=WARMUP_REPEATS)
+    parser.add_argument('--model', default=MODEL_PATH,
+                        help="Model Keras; jika tidak ada dipakai build_cnn sintetis")
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--baseline', default=None, help="File hasil sebelumnya untuk dibandingkan")
+    parser.add_argument('--save-baseline', default=None, metavar='PATH',
+                        help="Simpan juga hasil run ini sebagai baseline")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.repeats < 1 or min(args.batch_sizes) < 1 or min(args.sizes) < 1:
+        parser.error("--repeats, --batch-sizes, dan --sizes harus >= 1")
+
+    print(f"\n⏱️ BENCHMARK SUITE ({os.cpu_count()} CPU)")
+    environment, rows = None, []
+    for threads in args.threads:
+        print(f"\n🧵 threads {threads or 'auto'} ...", flush=True)
+        env, thread_rows, error = benchmark_threads(
+            threads, args.sizes, args.batch_sizes, args.benchmarks, args.repeats, args.warmup,
+            args.model,
+        )
+        if error:
+            print(f"❌ threads {threads or 'auto'}: {error}")
+            continue
+        environment = environment or env
+        rows.extend(thread_rows)
+
+    if not rows:
+        sys.exit("❌ Tidak ada hasil benchmark")
+
+    print_results(rows)
+    settings = {key: getattr(args, key) for key in ('sizes', 'batch_sizes', 'threads', 'repeats', 'warmup')}
+    save_results(args.output, environment, rows, settings)
+    print(f"✅ Hasil disimpan ke {args.output} (model: {environment['model']})")
+    if args.save_baseline:
+        save_results(args.save_baseline, environment, rows, settings)
+        print(f"✅ Baseline disimpan ke {args.save_baseline}")
+
+    if args.baseline:
+        baseline = load_results(args.baseline)
+        for difference in environment_differences(baseline['environment'], environment):
+            print(f"⚠️ Lingkungan berbeda dari baseline ({difference})")
+        comparisons = compare_results(baseline['results'], rows, args.threshold)
+        print_comparison(comparisons, args.threshold)
+        regressions = [row for row, _, _, regressed in comparisons if regressed]
+        if regressions:
+            print(f"❌ {len(regressions)} kasus mengalami regresi")
+            sys.exit(1)
+        print("✅ Tidak ada regresi")
+
+
+if __name__ == "__main__":
+    main()
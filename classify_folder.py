@@ -0,0 +1,289 @@
+"""
+Bulk Classifier
+Klasifikasi seluruh gambar dalam folder (rekursif) ke file CSV / JSONL
+
+Jalankan: python classify_folder.py test/ --output hasil.csv
+          python classify_folder.py data/ --output hasil.jsonl --batch-size 64 --decode-workers 8
+          python classify_folder.py test/ --output hasil.csv --gradcam-dir heatmap/
+
+Dengan --gradcam-dir (backend keras), prediksi dan heatmap Grad-CAM seluruh batch
+dihitung dalam satu forward/backward pass, overlay-nya di-render per batch, lalu
+disimpan sebagai JPEG dengan struktur folder yang sama dengan input.
+
+Jika file output sudah ada, gambar yang sudah tercatat dilewati (resume). Gambar yang
+gagal di-decode dicatat sebagai baris error (kolom/field 'error') dan juga dilewati saat
+resume; hapus barisnya dari file output untuk mencoba lagi.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from backends import BACKENDS, BATCH_BUCKETS, create_engine, decode_prediction
+from overlay import encode_image, render_overlays
+from preprocessing import IMAGE_EXTENSIONS, IMG_SIZE, DecodePool, preprocess_batch
+
+# ====================================
+# KONFIGURASI
+# ====================================
+CLASS_INDICES_PATH = 'class_indices.json'
+BATCH_SIZE = 32
+DECODE_WORKERS = 4
+LAST_CONV_LAYER = 'last_conv'
+
+
+# ====================================
+# INPUT & OUTPUT
+# ====================================
+def iter_image_paths(root):
+    """Semua gambar di bawah root (urutan stabil), path relatif terhadap root"""
+    for dirpath, dirnames, files in os.walk(root):
+        dirnames.sort()
+        for file in sorted(files):
+            if file.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.relpath(os.path.join(dirpath, file), root)
+
+
+def output_format(output_path):
+    return 'jsonl' if output_path.lower().endswith(('.jsonl', '.json')) else 'csv'
+
+
+def load_done_paths(output_path):
+    """Path yang sudah ada di file output, termasuk yang tercatat error (untuk resume)"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, 'r', newline='') as f:
+        if output_format(output_path) == 'jsonl':
+            for line in f:
+                try:
+                    done.add(json.loads(line)['path'])
+                except (ValueError, KeyError):
+                    # Baris terakhir bisa terpotong jika proses sebelumnya dihentikan
+                    continue
+        else:
+            for row in csv.DictReader(f):
+                if row.get('path') and (row.get('class') or row.get('error')):
+                    done.add(row['path'])
+    return done
+
+
+def truncate_partial_line(output_path):
+    """Buang baris terakhir yang terpotong (proses sebelumnya dihentikan di tengah tulis)
+
+    Tanpa ini, record pertama hasil resume akan tersambung ke baris terpotong tersebut.
+    """
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return
+        # Cari newline terakhir dari belakang, per blok
+        position = size
+        while position > 0:
+            block_start = max(0, position - 65536)
+            f.seek(block_start)
+            index = f.read(position - block_start).rfind(b'\n')
+            if index >= 0:
+                f.truncate(block_start + index + 1)
+                return
+            position = block_start
+        f.truncate(0)
+
+
+class ResultWriter:
+    """Tulis hasil secara bertahap (append + flush per batch)"""
+
+    def __init__(self, output_path, class_names):
+        self.format = output_format(output_path)
+        self.class_names = class_names
+        truncate_partial_line(output_path)
+        is_new = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        self._file = open(output_path, 'a', newline='')
+        if self.format == 'csv':
+            self._writer = csv.writer(self._file)
+            if is_new:
+                self._writer.writerow(['path', 'class', 'confidence'] + class_names + ['error'])
+
+    def write(self, path, pred_class, confidence, all_probs):
+        if self.format == 'jsonl':
+            self._file.write(json.dumps({
+                'path': path,
+                'class': pred_class,
+                'confidence': round(float(confidence), 6),
+                'probabilities': {k: round(v, 6) for k, v in all_probs.items()},
+            }) + '\n')
+        else:
+            self._writer.writerow(
+                [path, pred_class, f"{confidence:.6f}"]
+                + [f"{all_probs[name]:.6f}" for name in self.class_names] + ['']
+            )
+
+    def write_error(self, path, error):
+        """Catat gambar yang gagal diproses agar terlihat di output dan tidak diulang saat resume"""
+        if self.format == 'jsonl':
+            self._file.write(json.dumps({'path': path, 'error': str(error)}) + '\n')
+        else:
+            self._writer.writerow([path, '', ''] + [''] * len(self.class_names) + [str(error)])
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def save_overlay(heatmap_dir, path, overlay):
+    """Overlay uint8 (H, W, 3) -> <heatmap_dir>/<path tanpa ekstensi>.jpg"""
+    target = os.path.join(heatmap_dir, os.path.splitext(path)[0] + '.jpg')
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(encode_image(overlay, 'JPEG'))
+
+
+# ====================================
+# PIPELINE
+# ====================================
+def classify_folder(root, output_path, engine, class_indices, batch_size=BATCH_SIZE,
+                    decode_workers=DECODE_WORKERS, decode_processes=False, draft=True,
+                    explainer=None, heatmap_dir=None):
+    """Decode paralel (DecodePool terbatas) -> inferensi batch -> tulis bertahap
+
+    Jika explainer (GradCAMExplainer) dan heatmap_dir diberikan, prediksi diambil
+    dari pass Grad-CAM batch yang sama dan overlay heatmap ditulis ke heatmap_dir.
+
+    Return: (jumlah gambar berhasil, jumlah gagal, detik)
+    """
+    idx_to_class = {v: k for k, v in class_indices.items()}
+    class_names = [idx_to_class[i] for i in sorted(idx_to_class)]
+
+    # Baris terpotong dibuang dulu: baris CSV yang terpotong setelah kolom class
+    # akan terbaca sebagai selesai, padahal ResultWriter menghapusnya
+    truncate_partial_line(output_path)
+    done = load_done_paths(output_path)
+    paths = [p for p in iter_image_paths(root) if p not in done]
+    if done:
+        print(f"⏭️ Resume: {len(done)} gambar sudah ada di {output_path}")
+    print(f"📂 {len(paths)} gambar akan diklasifikasi")
+
+    writer = ResultWriter(output_path, class_names)
+    buffer = np.empty((batch_size,) + IMG_SIZE + (3,), dtype=np.float32)
+    # Jumlah gambar yang sedang/selesai di-decode tapi belum diinferensi dibatasi
+    max_in_flight = batch_size * 2
+
+    processed = failed = 0
+    start = time.perf_counter()
+
+    def run_batch(batch_paths, batch_pixels):
+        batch = preprocess_batch(batch_pixels, out=buffer[:len(batch_pixels)])
+        if explainer is not None:
+            predictions, heatmaps = explainer.explain_batch(batch)
+            _, overlays = render_overlays(np.stack(batch_pixels), heatmaps)
+            for path, overlay in zip(batch_paths, overlays):
+                save_overlay(heatmap_dir, path, overlay)
+        else:
+            predictions = engine.predict(batch)
+        for path, probs in zip(batch_paths, predictions):
+            writer.write(path, *decode_prediction(probs, idx_to_class))
+        writer.flush()
+
+    try:
+        with DecodePool(decode_workers, use_processes=decode_processes, draft=draft) as pool:
+            sources = (os.path.join(root, path) for path in paths)
+            batch_paths, batch_pixels = [], []
+            for path, (_, pixels, error) in zip(paths, pool.imap(sources, max_in_flight)):
+                if error is not None:
+                    failed += 1
+                    print(f"\n⚠️ Gagal decode {path}: {error}", file=sys.stderr)
+                    writer.write_error(path, error)
+                    continue
+                batch_paths.append(path)
+                batch_pixels.append(pixels)
+                if len(batch_paths) < batch_size:
+                    continue
+
+                run_batch(batch_paths, batch_pixels)
+                processed += len(batch_paths)
+                batch_paths, batch_pixels = [], []
+                elapsed = time.perf_counter() - start
+                print(f"\r🔄 {processed}/{len(paths)} gambar - {processed / elapsed:.1f} img/s",
+                      end='', flush=True)
+
+            if batch_paths:
+                run_batch(batch_paths, batch_pixels)
+                processed += len(batch_paths)
+    finally:
+        writer.close()
+        print()
+
+    return processed, failed, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Klasifikasi semua gambar pisang dalam folder")
+    parser.add_argument('input_dir', help="Folder gambar (dibaca rekursif)")
+    parser.add_argument('--output', '-o', default='hasil_klasifikasi.csv',
+                        help="File output .csv atau .jsonl (di-append, mendukung resume)")
+    parser.add_argument('--backend', choices=BACKENDS, default='keras',
+                        help="Backend inferensi")
+    parser.add_argument('--model', default=None,
+                        help="File model (default sesuai backend: .keras, .tflite atau .onnx)")
+    parser.add_argument('--threads', type=int, default=None,
+                        help="Jumlah thread backend (tflite: interpreter, onnx: intra-op)")
+    parser.add_argument('--class-indices', default=CLASS_INDICES_PATH)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--decode-workers', type=int, default=DECODE_WORKERS,
+                        help="Jumlah worker decode/resize gambar")
+    parser.add_argument('--decode-processes', action='store_true',
+                        help="Pakai process pool untuk decode (default: thread pool)")
+    parser.add_argument('--no-draft', action='store_true',
+                        help="Decode JPEG di resolusi penuh (tanpa Image.draft)")
+    parser.add_argument('--gradcam-dir', default=None,
+                        help="Simpan overlay Grad-CAM per gambar ke folder ini (backend keras)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.input_dir):
+        parser.error(f"Folder tidak ditemukan: {args.input_dir}")
+    if args.batch_size < 1:
+        parser.error("--batch-size harus >= 1")
+    if args.gradcam_dir and args.backend != 'keras':
+        parser.error("--gradcam-dir butuh --backend keras (Grad-CAM memerlukan gradien)")
+
+    with open(args.class_indices, 'r') as f:
+        class_indices = json.load(f)
+    engine = create_engine(args.backend, args.model, args.threads,
+                           batch_buckets=BATCH_BUCKETS + (args.batch_size,))
+    explainer = None
+    if args.gradcam_dir:
+        from inference import GradCAMExplainer
+        explainer = GradCAMExplainer(engine.model, LAST_CONV_LAYER)
+
+    processed, failed, elapsed = classify_folder(
+        args.input_dir, args.output, engine, class_indices,
+        batch_size=args.batch_size, decode_workers=args.decode_workers,
+        decode_processes=args.decode_processes, draft=not args.no_draft,
+        explainer=explainer, heatmap_dir=args.gradcam_dir
+    )
+
+    print("=" * 60)
+    print(f"✅ Selesai: {processed} gambar, {failed} gagal, {elapsed:.1f} detik")
+    if processed:
+        print(f"⚡ Throughput: {processed / elapsed:.1f} img/s")
+    print(f"📄 Output: {args.output}")
+    if args.gradcam_dir:
+        print(f"🔥 Heatmap: {args.gradcam_dir}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
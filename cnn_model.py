@@ -0,0 +1,72 @@
+"""
+CNN Model
+Arsitektur build_cnn yang dipakai notebook, benchmark training, dan test
+"""
+
+import json
+
+import tensorflow as tf
+from tensorflow.keras import layers, models
+
+from preprocessing import IMG_SIZE
+
+CLASS_INDICES_PATH = 'class_indices.json'
+
+
+def load_num_classes(class_indices_path=CLASS_INDICES_PATH):
+    """Jumlah kelas dari class_indices.json (disimpan notebook bersama model)"""
+    with open(class_indices_path, 'r') as f:
+        return len(json.load(f))
+
+
+def build_cnn(input_shape=IMG_SIZE + (3,), num_classes=None):
+    """num_classes=None = jumlah kelas di class_indices.json"""
+    if num_classes is None:
+        num_classes = load_num_classes()
+    inputs = layers.Input(shape=input_shape)
+
+    # Convolutional Block 1
+    x = layers.Conv2D(32, (3, 3), activation='relu', padding='same')(inputs)
+    x = layers.MaxPooling2D(2)(x)
+
+    # Convolutional Block 2
+    x = layers.Conv2D(64, (3, 3), activation='relu', padding='same')(x)
+    x = layers.MaxPooling2D(2)(x)
+
+    # Convolutional Block 3
+    x = layers.Conv2D(128, (3, 3), activation='relu', padding='same', name='last_conv')(x)
+    x = layers.MaxPooling2D(2)(x)
+
+    # Fully Connected Layers
+    x = layers.Flatten()(x)
+    x = layers.Dense(256, activation='relu')(x)
+    x = layers.Dropout(0.5)(x)
+    # Output selalu float32: softmax + loss tetap stabil saat mixed precision (bfloat16)
+    outputs = layers.Dense(num_classes, activation='softmax', dtype='float32')(x)
+
+    model = models.Model(inputs, outputs)
+    return model
+
+
+def compile_cnn(model, jit_compile=False):
+    """Compile dengan optimizer/loss notebook; jit_compile=True mengompilasi train step dengan XLA"""
+    model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'],
+                  jit_compile=jit_compile)
+    return model
+
+
+def to_float32(model):
+    """Salinan model dengan policy float32 dan bobot yang sama
+
+    Model hasil training mixed precision menghitung dalam bfloat16; untuk
+    evaluasi, Grad-CAM, dan deployment (Keras/TFLite/ONNX/mmap) dipakai
+    salinan float32 agar output sama dengan model yang dilatih float32.
+    """
+    previous = tf.keras.mixed_precision.global_policy()
+    tf.keras.mixed_precision.set_global_policy('float32')
+    try:
+        copy = build_cnn(model.input_shape[1:], model.output_shape[-1])
+    finally:
+        tf.keras.mixed_precision.set_global_policy(previous)
+    copy.set_weights(model.get_weights())
+    return copy
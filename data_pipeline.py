@@ -0,0 +1,237 @@
+"""
+Training Input Pipeline
+Pipeline tf.data pengganti ImageDataGenerator.flow_from_directory
+
+Decode + resize berjalan paralel (map dengan AUTOTUNE), gambar uint8 di-cache
+setelah epoch pertama, dan augmentasi dijalankan per batch sebagai satu
+transformasi proyektif (ImageProjectiveTransformV3) di CPU, lalu prefetch.
+make_cached_dataset membaca shard uint8 dari dataset_cache.py, tanpa decode sama sekali.
+"""
+
+import math
+import time
+
+import tensorflow as tf
+
+from preprocessing import IMG_SIZE, list_labeled_images
+
+# ====================================
+# KONFIGURASI
+# ====================================
+AUTOTUNE = tf.data.AUTOTUNE
+BATCH_SIZE = 32
+SEED = 42
+# Sama dengan load_img (dipakai flow_from_directory) agar model lama tetap sebanding
+RESIZE_METHOD = 'nearest'
+
+# Augmentasi, sama dengan ImageDataGenerator di notebook
+ROTATION_RANGE = 15  # derajat
+WIDTH_SHIFT_RANGE = 0.12  # fraksi lebar
+HEIGHT_SHIFT_RANGE = 0.12  # fraksi tinggi
+SHEAR_RANGE = 0.12  # derajat (ImageDataGenerator mengartikan shear_range dalam derajat)
+ZOOM_RANGE = 0.12  # zoom x dan y diacak terpisah di [1 - z, 1 + z]
+HORIZONTAL_FLIP = True
+FILL_MODE = 'NEAREST'
+
+
+# ====================================
+# DECODE
+# ====================================
+def decode_and_resize(path):
+    """File gambar -> uint8 (150, 150, 3)"""
+    image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    image = tf.image.resize(image, IMG_SIZE, method=RESIZE_METHOD)
+    image.set_shape(IMG_SIZE + (3,))
+    return tf.cast(image, tf.uint8)
+
+
+def normalize(images):
+    return tf.cast(images, tf.float32) / 255.0
+
+
+# ====================================
+# AUGMENTASI TERVEKTORISASI
+# ====================================
+def random_affine_transforms(batch_size, height, width):
+    """Matriks affine acak per gambar dalam format ImageProjectiveTransformV3 (B, 8)
+
+    Parameter acak mengikuti ImageDataGenerator (Keras 2.15): tx = geser tinggi
+    (baris), ty = geser lebar (kolom).
+    """
+    def uniform(limit):
+        return tf.random.uniform((batch_size,), -limit, limit)
+
+    return affine_transforms(
+        theta=uniform(math.radians(ROTATION_RANGE)),
+        tx=uniform(HEIGHT_SHIFT_RANGE) * height,
+        ty=uniform(WIDTH_SHIFT_RANGE) * width,
+        shear=uniform(math.radians(SHEAR_RANGE)),
+        zx=tf.random.uniform((batch_size,), 1 - ZOOM_RANGE, 1 + ZOOM_RANGE),
+        zy=tf.random.uniform((batch_size,), 1 - ZOOM_RANGE, 1 + ZOOM_RANGE),
+        height=height,
+        width=width,
+    )
+
+
+def affine_transforms(theta, tx, ty, shear, zx, zy, height, width):
+    """Parameter affine per gambar (tensor (B,)) -> format ImageProjectiveTransformV3 (B, 8)
+
+    Komposisi mengikuti ImageDataGenerator.apply_affine_transform (Keras 2.15):
+    rotasi @ geser @ shear @ zoom di sekitar pusat gambar. Keras menyusun matriks
+    dalam koordinat (baris, kolom), sedangkan ImageProjectiveTransformV3 membaca
+    (x = kolom, y = baris); matriks ditukar sumbunya (P @ M @ P) sebelum dikembalikan.
+    Keduanya memetakan piksel output ke piksel input.
+    """
+    zeros, ones = tf.zeros_like(theta), tf.ones_like(theta)
+
+    def matrix(rows):
+        return tf.stack([tf.stack(row, axis=-1) for row in rows], axis=-2)
+
+    # Koordinat (baris, kolom), sama persis dengan Keras
+    rotation = matrix([[tf.cos(theta), -tf.sin(theta), zeros],
+                       [tf.sin(theta), tf.cos(theta), zeros],
+                       [zeros, zeros, ones]])
+    shift = matrix([[ones, zeros, tx],
+                    [zeros, ones, ty],
+                    [zeros, zeros, ones]])
+    shear_matrix = matrix([[ones, -tf.sin(shear), zeros],
+                           [zeros, tf.cos(shear), zeros],
+                           [zeros, zeros, ones]])
+    zoom = matrix([[zx, zeros, zeros],
+                   [zeros, zy, zeros],
+                   [zeros, zeros, ones]])
+    transform = rotation @ shift @ shear_matrix @ zoom
+
+    # Transformasi di sekitar pusat gambar
+    o_x, o_y = (height / 2 - 0.5) * ones, (width / 2 - 0.5) * ones
+    offset = matrix([[ones, zeros, o_x],
+                     [zeros, ones, o_y],
+                     [zeros, zeros, ones]])
+    reset = matrix([[ones, zeros, -o_x],
+                    [zeros, ones, -o_y],
+                    [zeros, zeros, ones]])
+    transform = offset @ transform @ reset
+
+    # (baris, kolom) -> (x = kolom, y = baris)
+    swap = tf.constant([[0.0, 1.0, 0.0],
+                        [1.0, 0.0, 0.0],
+                        [0.0, 0.0, 1.0]])
+    transform = swap @ transform @ swap
+
+    # Baris terakhir selalu [0, 0, 1]: cukup 8 elemen pertama
+    return tf.reshape(transform, (-1, 9))[:, :8]
+
+
+def augment_batch(images):
+    """Augmentasi satu batch float32 (B, H, W, 3) sekaligus"""
+    shape = tf.shape(images)
+    batch_size, height, width = shape[0], shape[1], shape[2]
+    transforms = random_affine_transforms(
+        batch_size, tf.cast(height, tf.float32), tf.cast(width, tf.float32)
+    )
+    images = tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=transforms,
+        output_shape=tf.stack([height, width]),
+        fill_value=0.0,
+        interpolation='BILINEAR',
+        fill_mode=FILL_MODE,
+    )
+    if HORIZONTAL_FLIP:
+        flip = tf.random.uniform((batch_size, 1, 1, 1)) < 0.5
+        images = tf.where(flip, tf.reverse(images, axis=[2]), images)
+    return images
+
+
+# ====================================
+# DATASET
+# ====================================
+def make_dataset(directory, class_indices, batch_size=BATCH_SIZE, training=False,
+                 cache=True, seed=SEED):
+    """tf.data.Dataset berisi (gambar float32 (B, 150, 150, 3), label one-hot)
+
+    cache=True menyimpan gambar uint8 hasil decode di memori setelah epoch
+    pertama; string path menyimpan cache di file tersebut.
+    """
+    items = list_labeled_images(directory, class_indices)
+    if not items:
+        raise ValueError(f"Tidak ada gambar di {directory}")
+    paths = [path for path, _ in items]
+    labels = tf.one_hot([label for _, label in items], len(class_indices))
+
+    ds = tf.data.Dataset.from_tensor_slices((paths, labels))
+    ds = ds.map(lambda path, label: (decode_and_resize(path), label), num_parallel_calls=AUTOTUNE)
+    if cache:
+        ds = ds.cache() if cache is True else ds.cache(cache)
+    if training:
+        ds = ds.shuffle(len(items), seed=seed, reshuffle_each_iteration=True)
+    return finish_batches(ds.batch(batch_size), training)
+
+
+def make_cached_dataset(cache, batch_size=BATCH_SIZE, training=False, seed=SEED):
+    """Seperti make_dataset, tetapi membaca gambar uint8 dari DatasetCache (tanpa decode)
+
+    Yang di-shuffle hanya indeks; setiap batch diambil langsung dari shard yang
+    di-mmap, jadi epoch pertama sama cepatnya dengan epoch berikutnya.
+    """
+    if len(cache) == 0:
+        raise ValueError(f"Cache dataset kosong: {cache.cache_dir}")
+    num_classes = len(cache.class_indices)
+
+    def gather(indices):
+        return cache.images(indices), cache.labels[indices]
+
+    def load_batch(indices):
+        images, labels = tf.numpy_function(gather, [indices], [tf.uint8, tf.int64])
+        images.set_shape((None,) + IMG_SIZE + (3,))
+        return images, tf.one_hot(labels, num_classes)
+
+    ds = tf.data.Dataset.range(len(cache))
+    if training:
+        ds = ds.shuffle(len(cache), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size).map(load_batch, num_parallel_calls=AUTOTUNE)
+    return finish_batches(ds, training)
+
+
+def finish_batches(ds, training):
+    """Batch uint8 -> normalisasi (+ augmentasi saat training) -> prefetch"""
+    if training:
+        ds = ds.map(lambda x, y: (augment_batch(normalize(x)), y), num_parallel_calls=AUTOTUNE)
+    else:
+        ds = ds.map(lambda x, y: (normalize(x), y), num_parallel_calls=AUTOTUNE)
+    return ds.prefetch(AUTOTUNE)
+
+
+# ====================================
+# PENGUKURAN
+# ====================================
+def time_input_epoch(data, steps=None):
+    """Waktu (detik) untuk mengambil satu epoch batch dari generator atau tf.data, tanpa model"""
+    steps = steps or len(data)
+    iterator = iter(data)
+    start = time.perf_counter()
+    for _ in range(steps):
+        next(iterator)
+    return time.perf_counter() - start
+
+
+def compare_input_pipelines(generator, dataset):
+    """Waktu satu epoch input: ImageDataGenerator vs tf.data (epoch pertama dan setelah cache)"""
+    return {
+        'ImageDataGenerator': time_input_epoch(generator),
+        'tf.data (epoch 1)': time_input_epoch(dataset),
+        'tf.data (cached)': time_input_epoch(dataset),
+    }
+
+
+class EpochTimer(tf.keras.callbacks.Callback):
+    """Catat durasi setiap epoch model.fit (detik)"""
+
+    def on_train_begin(self, logs=None):
+        self.epoch_times = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch_times.append(time.perf_counter() - self._start)
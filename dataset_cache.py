@@ -0,0 +1,276 @@
+"""
+Dataset Cache
+Konversi sekali folder gambar (train/, test/) menjadi shard uint8 .npy yang bisa di-mmap
+
+Jalankan: python dataset_cache.py train test --cache-dir dataset_cache
+
+Struktur cache per split:
+    dataset_cache/train/
+        manifest.json       -> class_indices, daftar shard, dan per gambar: path relatif,
+                               label, lokasi (shard, baris), ukuran + mtime file asal
+        shard_00000.npy     -> uint8 (n, 150, 150, 3)
+        ...
+
+Gambar di-decode dengan prepare_image (resize yang sama dengan web app/server).
+Saat dijalankan ulang, hanya gambar baru atau yang berubah yang di-decode dan
+ditulis ke shard baru; shard lama dipadatkan jika terlalu banyak baris mati.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from preprocessing import (
+    IMG_SIZE, DecodePool, class_indices_from_directory, list_labeled_images
+)
+
+# ====================================
+# KONFIGURASI
+# ====================================
+CACHE_DIR = 'dataset_cache'
+CLASS_INDICES_PATH = 'class_indices.json'
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_VERSION = 1
+SHARD_SIZE = 1024  # Gambar per shard (~66 MB uint8)
+DECODE_WORKERS = 4
+MAX_DEAD_FRACTION = 0.5  # Padatkan shard jika lebih dari separuh barisnya sudah tidak dipakai
+
+
+# ====================================
+# MANIFEST
+# ====================================
+def file_signature(path):
+    """Ukuran + mtime file asal, untuk mendeteksi gambar yang berubah"""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def load_manifest(cache_dir):
+    path = os.path.join(cache_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_manifest(cache_dir, manifest):
+    """Manifest ditulis terakhir dan secara atomik: reader selalu melihat cache yang lengkap"""
+    path = os.path.join(cache_dir, MANIFEST_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def empty_manifest(class_indices):
+    return {
+        'version': MANIFEST_VERSION,
+        'img_size': list(IMG_SIZE),
+        'class_indices': class_indices,
+        'shards': {},  # nama file -> jumlah baris
+        'next_shard': 0,
+        'items': [],
+    }
+
+
+# ====================================
+# BUILD / UPDATE
+# ====================================
+class ShardWriter:
+    """Kumpulkan gambar uint8 ke buffer, tulis satu shard .npy setiap SHARD_SIZE gambar"""
+
+    def __init__(self, cache_dir, manifest, shard_size=SHARD_SIZE):
+        self.cache_dir = cache_dir
+        self.manifest = manifest
+        self.shard_size = shard_size
+        self._buffer = np.empty((shard_size,) + IMG_SIZE + (3,), dtype=np.uint8)
+        self._pending = []  # item manifest yang barisnya masih di buffer
+
+    def add(self, item, pixels):
+        self._buffer[len(self._pending)] = pixels
+        self._pending.append(item)
+        if len(self._pending) == self.shard_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        name = f"shard_{self.manifest['next_shard']:05d}.npy"
+        self.manifest['next_shard'] += 1
+        path = os.path.join(self.cache_dir, name)
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, self._buffer[:len(self._pending)])
+        os.replace(path + '.tmp', path)
+
+        for row, item in enumerate(self._pending):
+            item['shard'], item['row'] = name, row
+        self.manifest['shards'][name] = len(self._pending)
+        self.manifest['items'].extend(self._pending)
+        self._pending = []
+
+
+def build_cache(image_dir, cache_dir, class_indices, shard_size=SHARD_SIZE,
+                decode_workers=DECODE_WORKERS, rebuild=False):
+    """Buat atau perbarui cache untuk satu folder (mis. train/)
+
+    Return: dict statistik {'reused', 'added', 'removed', 'failed', 'compacted', 'seconds'}
+    """
+    start = time.perf_counter()
+    os.makedirs(cache_dir, exist_ok=True)
+
+    old = None if rebuild else load_manifest(cache_dir)
+    if old is not None and (old.get('version') != MANIFEST_VERSION
+                            or old['class_indices'] != class_indices
+                            or old['img_size'] != list(IMG_SIZE)):
+        old = None  # class_indices / ukuran berubah: bangun ulang dari awal
+    old_items = {item['path']: item for item in (old or empty_manifest(class_indices))['items']}
+
+    manifest = empty_manifest(class_indices)
+    manifest['next_shard'] = old['next_shard'] if old else 0
+    kept, to_decode = [], []
+    for path, label in list_labeled_images(image_dir, class_indices):
+        rel_path = os.path.relpath(path, image_dir)
+        signature = file_signature(path)
+        item = old_items.get(rel_path)
+        if item is not None and item['label'] == label and item['signature'] == signature:
+            kept.append(item)
+        else:
+            to_decode.append({'path': rel_path, 'label': label, 'signature': signature})
+
+    # Shard lama yang masih dipakai; padatkan jika baris matinya terlalu banyak
+    live_rows = {}
+    for item in kept:
+        live_rows[item['shard']] = live_rows.get(item['shard'], 0) + 1
+    old_shards = old['shards'] if old else {}
+    total_rows = sum(old_shards[name] for name in live_rows)
+    compact = total_rows > 0 and 1 - len(kept) / total_rows > MAX_DEAD_FRACTION
+
+    writer = ShardWriter(cache_dir, manifest, shard_size)
+    if compact:
+        shards = {name: np.load(os.path.join(cache_dir, name), mmap_mode='r') for name in live_rows}
+        for item in kept:
+            writer.add(dict(item), shards[item['shard']][item['row']])
+        del shards
+    else:
+        manifest['items'].extend(kept)
+        manifest['shards'].update({name: old_shards[name] for name in live_rows})
+
+    failed = 0
+    with DecodePool(decode_workers, draft=False) as pool:
+        sources = (os.path.join(image_dir, item['path']) for item in to_decode)
+        for item, (_, pixels, error) in zip(to_decode, pool.imap(sources)):
+            if error is not None:
+                failed += 1
+                print(f"⚠️ Gagal decode {item['path']}: {error}", file=sys.stderr)
+                continue
+            writer.add(item, pixels)
+    writer.flush()
+
+    # Urutan stabil (label, path) seperti list_labeled_images
+    manifest['items'].sort(key=lambda item: (item['label'], item['path']))
+    write_manifest(cache_dir, manifest)
+
+    # Shard yang tidak lagi direferensikan manifest baru aman dihapus
+    # (termasuk sisa cache lama yang diabaikan karena rebuild)
+    for name in os.listdir(cache_dir):
+        if name.startswith('shard_') and name not in manifest['shards']:
+            os.remove(os.path.join(cache_dir, name))
+
+    return {
+        'reused': len(kept),
+        'added': len(to_decode) - failed,
+        'removed': len(old_items) - len(kept),
+        'failed': failed,
+        'compacted': compact,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+# ====================================
+# READER
+# ====================================
+class DatasetCache:
+    """Reader cache: shard di-mmap (read-only), gambar diambil per indeks tanpa decode"""
+
+    def __init__(self, cache_dir):
+        manifest = load_manifest(cache_dir)
+        if manifest is None:
+            raise FileNotFoundError(f"Cache dataset tidak ditemukan: {cache_dir}")
+        if manifest['img_size'] != list(IMG_SIZE):
+            raise ValueError(f"Cache untuk ukuran {manifest['img_size']}, bukan {list(IMG_SIZE)}")
+
+        self.cache_dir = cache_dir
+        self.class_indices = manifest['class_indices']
+        items = manifest['items']
+        self.paths = [item['path'] for item in items]
+        self.labels = np.array([item['label'] for item in items], dtype=np.int64)
+
+        names = sorted(manifest['shards'])
+        shard_ids = {name: i for i, name in enumerate(names)}
+        self._shards = [np.load(os.path.join(cache_dir, name), mmap_mode='r') for name in names]
+        self._shard_of = np.array([shard_ids[item['shard']] for item in items], dtype=np.int64)
+        self._row_of = np.array([item['row'] for item in items], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def class_names(self):
+        return [name for name, _ in sorted(self.class_indices.items(), key=lambda x: x[1])]
+
+    def images(self, indices):
+        """Gambar uint8 (k, 150, 150, 3) untuk indeks yang diminta (urutan dipertahankan)"""
+        indices = np.asarray(indices, dtype=np.int64)
+        out = np.empty((len(indices),) + IMG_SIZE + (3,), dtype=np.uint8)
+        shard_of, row_of = self._shard_of[indices], self._row_of[indices]
+        for shard_id in np.unique(shard_of):
+            mask = shard_of == shard_id
+            out[mask] = self._shards[shard_id][row_of[mask]]
+        return out
+
+    def batches(self, batch_size=32, shuffle=False, seed=None):
+        """Yield (gambar uint8 (B, 150, 150, 3), label (B,)) untuk satu epoch"""
+        order = np.arange(len(self))
+        if shuffle:
+            np.random.default_rng(seed).shuffle(order)
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            yield self.images(indices), self.labels[indices]
+
+    def arrays(self):
+        """Seluruh split sebagai (gambar uint8 (N, 150, 150, 3), label (N,))"""
+        return self.images(np.arange(len(self))), self.labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Buat/perbarui cache dataset uint8 ter-shard")
+    parser.add_argument('image_dirs', nargs='+', help="Folder split, mis. train test")
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--class-indices', default=CLASS_INDICES_PATH,
+                        help="Mapping kelas (default: dari nama subfolder jika file tidak ada)")
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE)
+    parser.add_argument('--decode-workers', type=int, default=DECODE_WORKERS)
+    parser.add_argument('--rebuild', action='store_true', help="Abaikan cache lama")
+    args = parser.parse_args()
+
+    if os.path.exists(args.class_indices):
+        with open(args.class_indices, 'r') as f:
+            class_indices = json.load(f)
+    else:
+        class_indices = class_indices_from_directory(args.image_dirs[0])
+
+    for image_dir in args.image_dirs:
+        cache_dir = os.path.join(args.cache_dir, os.path.basename(os.path.normpath(image_dir)))
+        stats = build_cache(image_dir, cache_dir, class_indices, args.shard_size,
+                            args.decode_workers, args.rebuild)
+        print(f"✅ {image_dir} -> {cache_dir}: {stats['reused']} dipakai ulang, "
+              f"{stats['added']} baru, {stats['removed']} dihapus, {stats['failed']} gagal"
+              f"{', dipadatkan' if stats['compacted'] else ''} ({stats['seconds']:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Inference Engine
+Mesin inferensi model klasifikasi pisang berbasis tf.function
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from backends import BATCH_BUCKETS, BucketedEngine
+from metrics import METRICS
+from preprocessing import IMG_SIZE
+
+# ====================================
+# KONFIGURASI
+# ====================================
+MODEL_PATH = 'fish_classifier_model.keras'
+
+
+# ====================================
+# LOAD MODEL
+# ====================================
+def load_keras_model(model_path=MODEL_PATH):
+    """Load model Keras yang sudah dilatih"""
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model file tidak ditemukan: {model_path}")
+    return tf.keras.models.load_model(model_path)
+
+
+# ====================================
+# INFERENCE ENGINE
+# ====================================
+def model_fingerprint(model):
+    """Hash SHA-1 dari seluruh bobot model, dipakai sebagai bagian key cache hasil"""
+    digest = hashlib.sha1()
+    for weight in model.get_weights():
+        digest.update(weight.tobytes())
+    return digest.hexdigest()
+
+
+class InferenceEngine(BucketedEngine):
+    """Wrapper model Keras dengan tf.function yang di-specialize per ukuran batch
+
+    Input selalu (N, 150, 150, 3) float32. N dibulatkan ke bucket terdekat di atasnya
+    (padding nol), sehingga setiap bucket hanya di-trace sekali dan tidak ada
+    overhead data adapter seperti pada model.predict.
+    """
+
+    def __init__(self, model, batch_buckets=BATCH_BUCKETS, warmup=True):
+        super().__init__(model.output_shape[-1], batch_buckets)
+        self.model = model
+        self.fingerprint = model_fingerprint(model)
+
+        self._forward = tf.function(self._call_model)
+        self._concrete = {}
+        self._trace_lock = threading.Lock()
+
+        if warmup:
+            self.warmup()
+
+    def _call_model(self, x):
+        return self.model(x, training=False)
+
+    def _get_concrete(self, bucket):
+        """Ambil concrete function untuk bucket (trace sekali saja)"""
+        fn = self._concrete.get(bucket)
+        if fn is None:
+            with self._trace_lock:
+                fn = self._concrete.get(bucket)
+                if fn is None:
+                    spec = tf.TensorSpec(shape=(bucket,) + self.input_shape, dtype=tf.float32)
+                    fn = self._forward.get_concrete_function(spec)
+                    self._concrete[bucket] = fn
+        return fn
+
+    def _run_padded(self, batch, bucket):
+        return self._get_concrete(bucket)(tf.constant(batch)).numpy()
+
+
+# ====================================
+# GRAD-CAM EXPLAINER
+# ====================================
+class GradCAMExplainer:
+    """Grad-CAM yang dibangun sekali per model
+
+    Sub-model (aktivasi last_conv + output softmax) dibuat sekali, dan perhitungan
+    gradien di-compile sebagai tf.function sehingga tidak di-trace ulang per request.
+    Satu batch (N, 150, 150, 3) dijelaskan dalam satu forward/backward pass; gambar
+    dalam batch tidak saling memengaruhi (gradien di-pool per sampel).
+    """
+
+    def __init__(self, model, last_conv_layer_name='last_conv', warmup=True):
+        self.model = model
+        self.last_conv_layer_name = last_conv_layer_name
+        # Bagian key cache Grad-CAM: heatmap bergantung pada model explainer, bukan model serving
+        self.fingerprint = model_fingerprint(model)
+        self.warmup_seconds = None
+
+        last_conv_layer = model.get_layer(last_conv_layer_name)
+        # Use model.layers[-1].output instead of model.output to avoid list issue
+        output_layer = model.layers[-1].output
+        self.grad_model = tf.keras.models.Model(
+            inputs=model.inputs,
+            outputs=[last_conv_layer.output, output_layer]
+        )
+
+        self._explain = tf.function(
+            self._compute,
+            input_signature=[
+                tf.TensorSpec(shape=(None,) + IMG_SIZE + (3,), dtype=tf.float32),
+                tf.TensorSpec(shape=(None,), dtype=tf.int32),
+            ]
+        )
+
+        if warmup:
+            self.warmup()
+
+    def warmup(self):
+        """Trace + jalankan forward/backward pass sekali dengan gambar nol"""
+        start = time.perf_counter()
+        self.explain(np.zeros((1,) + IMG_SIZE + (3,), dtype=np.float32))
+        self.warmup_seconds = time.perf_counter() - start
+        return self.warmup_seconds
+
+    def _compute(self, images, pred_indices):
+        # pred_indices < 0 berarti pakai kelas dengan probabilitas tertinggi
+        with tf.GradientTape() as tape:
+            conv_outputs, predictions = self.grad_model(images, training=False)
+            pred_indices = tf.where(
+                pred_indices < 0,
+                tf.argmax(predictions, axis=1, output_type=tf.int32),
+                pred_indices
+            )
+            # Skor kelas target per gambar (N,): gradien jumlahnya terhadap
+            # conv_outputs[i] hanya bergantung pada gambar i
+            class_scores = tf.gather(predictions, pred_indices, axis=1, batch_dims=1)
+
+        # Gradient of the target class with regard to the output feature map of the last conv layer
+        grads = tape.gradient(class_scores, conv_outputs)
+        pooled_grads = tf.reduce_mean(grads, axis=(1, 2))  # (N, channels)
+
+        # Multiply each channel by importance of the channel, then normalize per image
+        heatmaps = tf.einsum('nhwc,nc->nhw', conv_outputs, pooled_grads)
+        heatmaps = tf.maximum(heatmaps, 0)
+        heatmaps = tf.math.divide_no_nan(
+            heatmaps, tf.reduce_max(heatmaps, axis=(1, 2), keepdims=True)
+        )
+        return predictions, heatmaps
+
+    def explain_batch(self, images, pred_indices=None):
+        """Prediksi + heatmap untuk satu batch
+
+        pred_indices: kelas target per gambar (None atau -1 = kelas tertinggi)
+        Return: (probabilitas (N, num_classes), heatmap (N, h, w))
+        """
+        images = tf.constant(np.asarray(images, dtype=np.float32))
+        if pred_indices is None:
+            pred_indices = np.full(images.shape[0], -1)
+        pred_indices = tf.constant(np.asarray(pred_indices, dtype=np.int32).reshape(-1))
+        if pred_indices.shape[0] != images.shape[0]:
+            raise ValueError(f"{pred_indices.shape[0]} kelas target untuk {images.shape[0]} gambar")
+        METRICS.observe('batch_size', images.shape[0], source='gradcam')
+        with METRICS.time('stage_seconds', stage='gradcam'):
+            predictions, heatmaps = self._explain(images, pred_indices)
+            return predictions.numpy(), heatmaps.numpy()
+
+    def heatmaps(self, images, pred_indices=None):
+        """Heatmap Grad-CAM saja untuk satu batch -> (N, h, w)"""
+        return self.explain_batch(images, pred_indices)[1]
+
+    def explain(self, img_array, pred_index=None):
+        """Prediksi + heatmap dalam satu pass -> (probabilitas (1, num_classes), heatmap (h, w))"""
+        predictions, heatmaps = self.explain_batch(
+            img_array, [-1 if pred_index is None else int(pred_index)]
+        )
+        return predictions, heatmaps[0]
+
+    def heatmap(self, img_array, pred_index=None):
+        """Heatmap Grad-CAM saja"""
+        return self.explain(img_array, pred_index)[1]
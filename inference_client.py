@@ -0,0 +1,85 @@
+"""
+Inference Client
+Client HTTP untuk inference server (server.py), tanpa dependensi TensorFlow
+"""
+
+import base64
+import io
+import json
+import urllib.error
+import urllib.request
+
+import numpy as np
+from PIL import Image
+
+from preprocessing import prepare_image
+
+
+def encode_image(image):
+    """Resize di sisi client lalu encode PNG (lossless) agar upload tetap kecil"""
+    buffer = io.BytesIO()
+    Image.fromarray(prepare_image(image)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def parse_result(result):
+    """JSON hasil server -> (kelas, confidence, semua probabilitas), sama seperti predict_fish"""
+    return result['class'], result['confidence'], result['probabilities']
+
+
+class InferenceClient:
+    """Memanggil endpoint /predict dan /explain milik inference server"""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _request(self, path, body=None, content_type='application/octet-stream'):
+        request = urllib.request.Request(self.base_url + path, data=body)
+        if body is not None:
+            request.add_header('Content-Type', content_type)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get('error', e.reason)
+            except ValueError:
+                message = e.reason
+            raise RuntimeError(f"Inference server error {e.code}: {message}") from e
+        except (urllib.error.URLError, OSError) as e:
+            # Server mati, koneksi ditolak, timeout, atau DNS gagal
+            reason = getattr(e, 'reason', e)
+            raise RuntimeError(f"Inference server tidak bisa dihubungi ({self.base_url}): {reason}") from e
+
+    def health(self):
+        return self._request('/health')
+
+    def ready(self):
+        """True jika worker yang menjawab sudah selesai load + warm-up"""
+        try:
+            return self._request('/ready').get('ready', False)
+        except RuntimeError:
+            return False
+
+    def predict(self, image):
+        """Prediksi satu gambar -> (kelas, confidence, semua probabilitas)"""
+        return parse_result(self._request('/predict', encode_image(image), 'image/png'))
+
+    def predict_batch(self, images, max_batch_size=32):
+        """Prediksi banyak gambar, max_batch_size gambar per request"""
+        results = []
+        for start in range(0, len(images), max_batch_size):
+            chunk = images[start:start + max_batch_size]
+            payload = json.dumps({
+                'images': [base64.b64encode(encode_image(img)).decode('ascii') for img in chunk]
+            }).encode('utf-8')
+            response = self._request('/predict', payload, 'application/json')
+            results.extend(parse_result(result) for result in response['results'])
+        return results
+
+    def explain(self, image):
+        """Prediksi + Grad-CAM -> (kelas, confidence, semua probabilitas, heatmap)"""
+        result = self._request('/explain', encode_image(image), 'image/png')
+        heatmap = np.asarray(result['heatmap'], dtype=np.float32)
+        return parse_result(result) + (heatmap,)
@@ -0,0 +1,520 @@
+"""
+Load Test
+Simulasikan banyak sesi yang menekan "Mulai Klasifikasi" bersamaan untuk mencari titik saturasi
+
+Jalankan:
+    python load_test.py --users 20 40 60 80 100 --duration 30
+    python load_test.py --users 50 --rate 20 --mix 640:1,4000:3
+    python load_test.py --mode http --url http://localhost:8000 --pid <pid server> --users 20 60 100
+
+Setiap jumlah user adalah satu tahap. Mode in-process menjalankan jalur klik yang sama
+dengan app_streamlit.py (prepare_image -> explain_image -> encode overlay, atau
+predict_fish lewat micro-batcher dengan --path predict) di proses ini, memakai modul
+non-UI yang sama (backends, batching, overlay) tanpa memuat Streamlit; mode http
+memanggil inference server (server.py) lewat InferenceClient dan tetap me-render
+overlay di sini seperti yang dilakukan Streamlit.
+
+Tanpa --rate, setiap user menunggu hasil lalu "berpikir" selama --think-time detik
+(closed loop). Dengan --rate, request datang sebagai proses Poisson dengan laju itu
+(open loop) dan dilayani paling banyak --users sekaligus; latency dihitung dari waktu
+kedatangan, jadi waktu antre ikut terukur ketika sistem tidak mampu mengikuti laju.
+
+CPU dan RSS dibaca dari /proc (Linux) untuk proses ini (mode in-process) atau untuk
+--pid beserta child process-nya (mis. master server.py dengan --workers > 1).
+"""
+
+import argparse
+import io
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+
+from benchmark import (MODEL_PATH, load_benchmark_class_indices, load_benchmark_model, percentile,
+                       synthetic_photo)
+
+# ====================================
+# KONFIGURASI
+# ====================================
+USER_STAGES = (20,)
+DURATION = 30  # Detik per tahap
+REPORT_INTERVAL = 5.0  # Detik antar baris timeline
+THINK_TIME = 1.0  # Rata-rata jeda antar klik per user (closed loop)
+IMAGE_MIX = '640:1,1280:1,4000:2'  # Sisi terpanjang foto : bobot
+POOL_SIZE = 4  # Variasi foto per ukuran (gambar identik akan kena cache hasil)
+READY_TIMEOUT = 300  # Detik menunggu server selesai warm-up
+SATURATION_GAIN = 0.10  # Throughput naik < 10% saat user ditambah = saturasi
+SEED = 7
+
+
+# ====================================
+# IMAGE MIX
+# ====================================
+def parse_mix(spec):
+    """'640:1,4000:2' -> [(640, 1.0), (4000, 2.0)]"""
+    mix = []
+    for item in spec.split(','):
+        size, _, weight = item.partition(':')
+        mix.append((int(size), float(weight or 1)))
+    if not mix or any(size < 1 or weight <= 0 for size, weight in mix):
+        raise ValueError(f"Image mix tidak valid: {spec}")
+    return mix
+
+
+class ImageMix:
+    """Pool foto JPEG sintetis per ukuran, diambil acak sesuai bobot"""
+
+    def __init__(self, mix, pool_size=POOL_SIZE):
+        self.sizes = [size for size, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.photos = {
+            size: [synthetic_photo(size, seed=SEED + i * 10007) for i in range(pool_size)]
+            for size in self.sizes
+        }
+
+    def sample(self, rng):
+        size = rng.choices(self.sizes, self.weights)[0]
+        return size, rng.choice(self.photos[size])
+
+
+# ====================================
+# TARGET
+# ====================================
+class InProcessTarget:
+    """Jalur klik app_streamlit.py di proses ini, engine + explainer dipakai bersama semua user"""
+
+    def __init__(self, path='classify', model_path=MODEL_PATH, threads=0, use_cache=False):
+        # Thread pool TensorFlow harus diatur sebelum operasi pertama
+        import tensorflow as tf
+        if threads:
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+
+        from batching import MicroBatcher
+        from inference import GradCAMExplainer, InferenceEngine
+        from overlay import OverlayRenderer
+        from result_cache import ResultCache
+
+        self.path = path
+        self.class_indices = load_benchmark_class_indices()
+        model, self.model_source = load_benchmark_model(model_path, len(self.class_indices))
+        # Default BATCH_BUCKETS, MicroBatcher, dan ResultCache sama dengan konfigurasi app
+        self.engine = InferenceEngine(model)
+        self.batcher = MicroBatcher(self.engine.predict)
+        self.explainer = GradCAMExplainer(model, 'last_conv')
+        # Tanpa --cache setiap klik dihitung sebagai foto baru (ResultCache(0) tidak menyimpan apa pun)
+        self.cache = ResultCache() if use_cache else None
+        self.renderer = OverlayRenderer(cache=None if use_cache else ResultCache(0))
+        self.pids = [os.getpid()]
+
+    def describe(self):
+        return f"in-process {self.path} (model: {self.model_source})"
+
+    def __call__(self, photo):
+        from PIL import Image
+
+        from backends import explain_image, predict_fish
+        from preprocessing import prepare_image
+
+        pixels = prepare_image(Image.open(io.BytesIO(photo)))
+        if self.path == 'predict':
+            return predict_fish(pixels, self.batcher, self.class_indices)
+        _, _, _, heatmap = explain_image(
+            pixels, self.engine, self.class_indices, self.explainer, 'last_conv', cache=self.cache
+        )
+        return self.renderer.encode(pixels, heatmap)
+
+    def close(self):
+        self.batcher.close()
+
+
+class HttpTarget:
+    """Jalur klik mode BANANA_INFERENCE_URL: prediksi/Grad-CAM di server, overlay di sini"""
+
+    def __init__(self, url, path='classify', pids=()):
+        from inference_client import InferenceClient
+        from overlay import OverlayRenderer
+        from result_cache import ResultCache
+
+        self.client = InferenceClient(url)
+        self.url = url
+        self.path = path
+        self.renderer = OverlayRenderer(cache=ResultCache(0))
+        self.pids = list(pids)
+
+    def describe(self):
+        return f"http {self.path} ({self.url})"
+
+    def wait_ready(self, timeout=READY_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while not self.client.ready():
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Server {self.url} belum ready setelah {timeout} s")
+            time.sleep(1.0)
+
+    def __call__(self, photo):
+        from PIL import Image
+
+        from preprocessing import prepare_image
+        pixels = prepare_image(Image.open(io.BytesIO(photo)))
+        if self.path == 'predict':
+            return self.client.predict(pixels)
+        _, _, _, heatmap = self.client.explain(pixels)
+        return self.renderer.encode(pixels, heatmap)
+
+    def close(self):
+        pass
+
+
+# ====================================
+# CPU & RSS
+# ====================================
+def process_tree(pid):
+    """pid + semua turunannya (dari /proc/<pid>/task/*/children)"""
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        task_dir = f'/proc/{current}/task'
+        try:
+            tasks = os.listdir(task_dir)
+        except OSError:
+            continue
+        for task in tasks:
+            try:
+                with open(f'{task_dir}/{task}/children', 'r') as f:
+                    pending.extend(int(child) for child in f.read().split())
+            except OSError:
+                pass
+    return pids
+
+
+def read_process(pid):
+    """(detik CPU user+system, RSS MB) satu proses, None jika proses sudah tidak ada"""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            # Field setelah ')' agar nama proses berisi spasi tidak menggeser indeks
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open(f'/proc/{pid}/status', 'r') as f:
+            rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+    except (OSError, StopIteration):
+        return None
+    ticks = int(fields[11]) + int(fields[12])  # utime + stime
+    return ticks / os.sysconf('SC_CLK_TCK'), rss_kb / 1024
+
+
+class ResourceSampler:
+    """CPU% (100 = satu core penuh) dan total RSS untuk sekumpulan proses + turunannya"""
+
+    def __init__(self, pids):
+        self.pids = list(pids)
+        self.available = os.path.exists('/proc/self/stat')
+        self._last = self._read() if self.available else None
+
+    def _read(self):
+        cpu_seconds, rss_mb = {}, 0.0
+        for root in self.pids:
+            for pid in process_tree(root):
+                usage = read_process(pid)
+                if usage is not None:
+                    cpu_seconds[pid] = usage[0]
+                    rss_mb += usage[1]
+        return time.monotonic(), cpu_seconds, rss_mb
+
+    def sample(self):
+        """(CPU% sejak sampel sebelumnya, RSS MB sekarang); (None, None) tanpa /proc"""
+        if not self.available:
+            return None, None
+        now, cpu_seconds, rss_mb = self._read()
+        last_time, last_cpu, _ = self._last
+        self._last = now, cpu_seconds, rss_mb
+        # Proses yang baru muncul dihitung dari nol, yang sudah hilang diabaikan
+        used = sum(seconds - last_cpu.get(pid, 0.0) for pid, seconds in cpu_seconds.items())
+        elapsed = now - last_time
+        return (100.0 * used / elapsed if elapsed > 0 else 0.0), rss_mb
+
+
+# ====================================
+# TAHAP LOAD
+# ====================================
+class StageRecorder:
+    """Hasil request (waktu selesai, latency, ukuran foto, error) dari semua thread user"""
+
+    def __init__(self):
+        self.records = []
+        self.errors = {}
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finish(self, latency, size, error=None):
+        with self._lock:
+            self.in_flight -= 1
+            self.records.append((time.monotonic(), latency, size, error is None))
+            if error is not None:
+                message = f"{type(error).__name__}: {error}"
+                self.errors[message] = self.errors.get(message, 0) + 1
+
+    def since(self, index):
+        with self._lock:
+            return self.records[index:]
+
+
+def latency_summary(latencies):
+    latencies = sorted(latencies)
+    return {
+        'p50_ms': percentile(latencies, 0.50) * 1000 if latencies else None,
+        'p95_ms': percentile(latencies, 0.95) * 1000 if latencies else None,
+        'p99_ms': percentile(latencies, 0.99) * 1000 if latencies else None,
+        'mean_ms': sum(latencies) / len(latencies) * 1000 if latencies else None,
+    }
+
+
+def _fmt_ms(value):
+    return f"{value:8.1f}" if value is not None else f"{'-':>8}"
+
+
+def run_stage(target, images, users, duration=DURATION, rate=None, think_time=THINK_TIME,
+              interval=REPORT_INTERVAL, seed=SEED):
+    """Satu tahap load dengan `users` user bersamaan -> ringkasan + timeline"""
+    recorder = StageRecorder()
+    sampler = ResourceSampler(target.pids)
+    stop = threading.Event()
+    arrivals = queue.Queue()
+
+    def execute(rng, scheduled):
+        size, photo = images.sample(rng)
+        recorder.start()
+        try:
+            target(photo)
+        except Exception as e:
+            recorder.finish(time.monotonic() - scheduled, size, e)
+        else:
+            recorder.finish(time.monotonic() - scheduled, size)
+
+    def closed_loop_user(user_id):
+        rng = random.Random(seed * 1000 + user_id)
+        # Klik pertama disebar agar user tidak mulai serentak
+        if stop.wait(rng.uniform(0, think_time)):
+            return
+        while not stop.is_set():
+            execute(rng, time.monotonic())
+            if think_time and stop.wait(rng.expovariate(1.0 / think_time)):
+                return
+
+    def open_loop_user(user_id):
+        rng = random.Random(seed * 1000 + user_id)
+        while True:
+            scheduled = arrivals.get()
+            if scheduled is None:
+                return
+            execute(rng, scheduled)
+
+    def generate_arrivals():
+        rng = random.Random(seed)
+        next_arrival = time.monotonic()
+        while not stop.is_set():
+            next_arrival += rng.expovariate(rate)
+            if stop.wait(max(0.0, next_arrival - time.monotonic())):
+                break
+            arrivals.put(next_arrival)
+
+    worker = open_loop_user if rate else closed_loop_user
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(users)]
+    if rate:
+        threads.append(threading.Thread(target=generate_arrivals, daemon=True))
+
+    mode = f"open loop {rate:g} req/s" if rate else f"closed loop, think {think_time:g} s"
+    print(f"\n👥 {users} user ({mode}), {duration:g} s")
+    print(f"{'t (s)':>6} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5} "
+          f"{'aktif':>6} {'antre':>6} {'CPU%':>7} {'RSS MB':>8}")
+
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+
+    timeline, seen, last = [], 0, start
+    end = start + duration
+    while True:
+        now = time.monotonic()
+        if now >= end:
+            break
+        time.sleep(min(interval, end - now))
+        now = time.monotonic()
+        records = recorder.since(seen)
+        seen += len(records)
+        cpu, rss = sampler.sample()
+        point = {
+            't': round(now - start, 2),
+            'throughput': len(records) / (now - last),
+            'errors': sum(1 for *_, ok in records if not ok),
+            'in_flight': recorder.in_flight,
+            'queued': arrivals.qsize(),
+            'cpu_percent': cpu,
+            'rss_mb': rss,
+            **latency_summary([latency for _, latency, _, ok in records if ok]),
+        }
+        last = now
+        timeline.append(point)
+        print(f"{point['t']:>6.1f} {point['throughput']:>7.1f} {_fmt_ms(point['p50_ms'])} "
+              f"{_fmt_ms(point['p95_ms'])} {_fmt_ms(point['p99_ms'])} {point['errors']:>5} "
+              f"{point['in_flight']:>6} {point['queued']:>6} "
+              f"{cpu if cpu is not None else float('nan'):>7.0f} "
+              f"{rss if rss is not None else float('nan'):>8.0f}", flush=True)
+
+    # Hanya request yang selesai di dalam durasi tahap yang dihitung; request yang
+    # sedang berjalan dibiarkan selesai dan arrival yang masih antre dibuang
+    stop.set()
+    elapsed = time.monotonic() - start
+    records = [record for record in recorder.since(0) if record[0] <= start + elapsed]
+    if rate:
+        while True:
+            try:
+                arrivals.get_nowait()
+            except queue.Empty:
+                break
+        for _ in range(users):
+            arrivals.put(None)
+    for thread in threads:
+        thread.join()
+
+    ok_latencies = [latency for _, latency, _, ok in records if ok]
+    by_size = {}
+    for _, latency, size, ok in records:
+        if ok:
+            by_size.setdefault(size, []).append(latency)
+    cpu_values = [point['cpu_percent'] for point in timeline if point['cpu_percent'] is not None]
+    rss_values = [point['rss_mb'] for point in timeline if point['rss_mb'] is not None]
+    return {
+        'users': users,
+        'rate': rate,
+        'think_time': None if rate else think_time,
+        'duration_s': elapsed,
+        'requests': len(records),
+        'errors': sum(1 for *_, ok in records if not ok),
+        'error_messages': recorder.errors,
+        'throughput': len(ok_latencies) / elapsed,
+        **latency_summary(ok_latencies),
+        'by_size': {str(size): {'requests': len(values), **latency_summary(values)}
+                    for size, values in sorted(by_size.items())},
+        'cpu_percent_mean': sum(cpu_values) / len(cpu_values) if cpu_values else None,
+        'cpu_percent_max': max(cpu_values) if cpu_values else None,
+        'rss_mb_max': max(rss_values) if rss_values else None,
+        'timeline': timeline,
+    }
+
+
+def find_saturation(stages, min_gain=SATURATION_GAIN):
+    """(tahap sebelumnya, tahap pertama yang throughput-nya naik < min_gain), atau None"""
+    for previous, stage in zip(stages, stages[1:]):
+        if previous['throughput'] and stage['throughput'] < previous['throughput'] * (1 + min_gain):
+            return previous, stage
+    return None
+
+
+def print_summary(stages, cpus):
+    print("\n" + "="*86)
+    print(f"RINGKASAN LOAD TEST ({cpus} CPU)")
+    print("="*86)
+    print(f"{'user':>5} {'req':>7} {'err':>5} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{'CPU% avg':>9} {'CPU% max':>9} {'RSS max':>8}")
+    print("-"*86)
+    for stage in stages:
+        cpu_mean, cpu_max, rss = stage['cpu_percent_mean'], stage['cpu_percent_max'], stage['rss_mb_max']
+        print(f"{stage['users']:>5} {stage['requests']:>7} {stage['errors']:>5} {stage['throughput']:>7.1f} "
+              f"{_fmt_ms(stage['p50_ms'])} {_fmt_ms(stage['p95_ms'])} {_fmt_ms(stage['p99_ms'])} "
+              f"{cpu_mean if cpu_mean is not None else float('nan'):>9.0f} "
+              f"{cpu_max if cpu_max is not None else float('nan'):>9.0f} "
+              f"{rss if rss is not None else float('nan'):>8.0f}")
+    print("="*86)
+    for stage in stages:
+        for message, count in stage['error_messages'].items():
+            print(f"❌ {stage['users']} user: {count}x {message}")
+    saturation = find_saturation(stages)
+    if saturation:
+        previous, stage = saturation
+        print(f"⚠️ Saturasi sekitar {previous['users']}-{stage['users']} user: throughput "
+              f"{previous['throughput']:.1f} -> {stage['throughput']:.1f} req/s (naik < {SATURATION_GAIN:.0%}), "
+              f"p95 {_fmt_ms(previous['p95_ms']).strip()} -> {_fmt_ms(stage['p95_ms']).strip()} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test jalur klasifikasi (in-process atau HTTP)")
+    parser.add_argument('--mode', choices=('inprocess', 'http'), default='inprocess')
+    parser.add_argument('--url', default=os.environ.get('BANANA_INFERENCE_URL', 'http://localhost:8000'))
+    parser.add_argument('--pid', type=int, action='append', default=[],
+                        help="PID server yang CPU/RSS-nya diukur (mode http; child ikut dihitung)")
+    parser.add_argument('--path', choices=('classify', 'predict'), default='classify',
+                        help="classify = prediksi + Grad-CAM + overlay (tombol Mulai Klasifikasi)")
+    parser.add_argument('--users', type=int, nargs='+', default=list(USER_STAGES),
+                        help="Jumlah user bersamaan per tahap")
+    parser.add_argument('--rate', type=float, default=None,
+                        help="Laju kedatangan request/detik (open loop); default closed loop")
+    parser.add_argument('--think-time', type=float, default=THINK_TIME)
+    parser.add_argument('--duration', type=float, default=DURATION, help="Detik per tahap")
+    parser.add_argument('--interval', type=float, default=REPORT_INTERVAL)
+    parser.add_argument('--mix', default=IMAGE_MIX, help="Ukuran foto:bobot, mis. 640:1,4000:2")
+    parser.add_argument('--pool-size', type=int, default=POOL_SIZE)
+    parser.add_argument('--cache', action='store_true',
+                        help="Aktifkan cache hasil + overlay seperti app (mode in-process)")
+    parser.add_argument('--threads', type=int, default=0, help="Intra-op thread TensorFlow (in-process)")
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--output', default=None, help="Simpan ringkasan + timeline ke file JSON")
+    args = parser.parse_args()
+
+    if min(args.users) < 1 or args.duration <= 0 or (args.rate is not None and args.rate <= 0):
+        parser.error("--users, --duration, dan --rate harus > 0")
+    try:
+        images = ImageMix(parse_mix(args.mix), args.pool_size)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.mode == 'http':
+        target = HttpTarget(args.url, args.path, args.pid)
+        print(f"⏳ Menunggu {args.url} ready ...")
+        target.wait_ready()
+        if not args.pid:
+            print("⚠️ Tanpa --pid, CPU/RSS server tidak diukur")
+    else:
+        target = InProcessTarget(args.path, args.model, args.threads, args.cache)
+    if not os.path.exists('/proc/self/stat'):
+        print("⚠️ /proc tidak tersedia, CPU/RSS tidak diukur")
+
+    print(f"\n🚦 LOAD TEST: {target.describe()}, mix {args.mix}")
+    stages = []
+    try:
+        for users in args.users:
+            stages.append(run_stage(target, images, users, args.duration, args.rate,
+                                    args.think_time, args.interval))
+    except KeyboardInterrupt:
+        print("\n⏹️ Dihentikan")
+    finally:
+        target.close()
+
+    if not stages:
+        sys.exit("❌ Tidak ada tahap yang selesai")
+    print_summary(stages, os.cpu_count())
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'target': target.describe(),
+                'cpus': os.cpu_count(),
+                'settings': {key: getattr(args, key) for key in
+                             ('mode', 'path', 'rate', 'think_time', 'duration', 'mix', 'pool_size',
+                              'cache', 'threads')},
+                'stages': stages,
+            }, f, indent=2)
+        print(f"✅ Hasil disimpan ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Pengukuran Memori Worker
+Bandingkan RSS/PSS per worker untuk beberapa backend (mis. keras vs mmap)
+
+Jalankan: python measure_memory.py --backends keras mmap --workers 4
+
+Setiap worker adalah proses terpisah (spawn) yang me-load engine lalu menjalankan
+satu prediksi. "Sebelum" diukur setelah library backend di-import tetapi sebelum
+model di-load; "sesudah" diukur ketika semua worker sudah memuat model.
+PSS membagi halaman bersama (mis. file bobot yang di-mmap) dengan jumlah proses
+yang memakainya, jadi jumlah PSS semua worker = memori yang benar-benar terpakai.
+Hanya untuk Linux (/proc/<pid>/smaps_rollup).
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import sys
+
+# ====================================
+# KONFIGURASI
+# ====================================
+WORKERS = 4
+MEMORY_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Private_Clean', 'Private_Dirty')
+
+
+def read_memory(pid='self'):
+    """Field smaps_rollup dalam MB"""
+    memory = {}
+    with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+        for line in f:
+            parts = line.split()
+            key = parts[0].rstrip(':')
+            if key in MEMORY_FIELDS:
+                memory[key] = int(parts[1]) / 1024
+    return memory
+
+
+def import_backend(backend):
+    """Import library backend lebih dulu agar 'sebelum' tidak ikut menghitung bobot model"""
+    if backend == 'keras':
+        import inference  # noqa: F401  (TensorFlow)
+    elif backend == 'onnx':
+        import onnxruntime  # noqa: F401
+    elif backend == 'tflite':
+        from backends import load_tflite_interpreter_class
+        load_tflite_interpreter_class()
+
+
+def worker(backend, model_path, ready, stop, results):
+    import numpy as np
+
+    from backends import create_engine
+
+    import_backend(backend)
+    before = read_memory()
+    engine = create_engine(backend, model_path)
+    engine.predict(np.zeros((1,) + engine.input_shape, dtype=np.float32))
+    results.put((os.getpid(), before))
+    ready.release()
+    stop.wait()
+
+
+def measure(backend, model_path, workers):
+    """Jalankan `workers` proses untuk satu backend -> list (pid, sebelum, sesudah)"""
+    ctx = mp.get_context('spawn')
+    ready = ctx.Semaphore(0)
+    stop = ctx.Event()
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=worker, args=(backend, model_path, ready, stop, results), daemon=True)
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        for process in processes:
+            while not ready.acquire(timeout=1.0):
+                if not all(p.is_alive() for p in processes):
+                    raise RuntimeError(f"Worker {backend} berhenti sebelum model selesai di-load")
+        before = dict(results.get() for _ in processes)
+        return [(pid, before[pid], read_memory(pid)) for pid in sorted(before)]
+    finally:
+        stop.set()
+        for process in processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+
+def print_report(backend, rows):
+    print("\n" + "="*72)
+    print(f"BACKEND: {backend.upper()} ({len(rows)} worker)")
+    print("="*72)
+    print(f"{'PID':>8} {'RSS before':>11} {'RSS after':>10} {'Δ RSS':>8} "
+          f"{'PSS':>8} {'Shared':>8} {'Private':>8}  (MB)")
+    print("-"*72)
+    for pid, before, after in rows:
+        private = after['Private_Clean'] + after['Private_Dirty']
+        print(f"{pid:>8} {before['Rss']:>11.1f} {after['Rss']:>10.1f} "
+              f"{after['Rss'] - before['Rss']:>8.1f} {after['Pss']:>8.1f} "
+              f"{after['Shared_Clean']:>8.1f} {private:>8.1f}")
+    print("-"*72)
+    total_pss = sum(after['Pss'] for _, _, after in rows)
+    mean_delta = sum(after['Rss'] - before['Rss'] for _, before, after in rows) / len(rows)
+    print(f"📊 Total PSS semua worker : {total_pss:.1f} MB")
+    print(f"📊 Rata-rata Δ RSS / worker: {mean_delta:.1f} MB")
+    return total_pss
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ukur RSS/PSS per worker untuk tiap backend")
+    parser.add_argument('--backends', nargs='+', default=['keras', 'mmap'],
+                        help="Backend yang dibandingkan (keras, tflite, onnx, mmap)")
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--model', action='append', default=[], metavar='BACKEND=PATH',
+                        help="File model per backend, mis. --model mmap=models/v1/weights")
+    args = parser.parse_args()
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        sys.exit("❌ Butuh Linux dengan /proc/<pid>/smaps_rollup")
+    model_paths = dict(item.split('=', 1) for item in args.model)
+
+    print("\n🧠 MEMORY PER WORKER")
+    totals = {}
+    for backend in args.backends:
+        try:
+            rows = measure(backend, model_paths.get(backend), args.workers)
+        except Exception as e:
+            print(f"\n❌ {backend}: {e}")
+            continue
+        totals[backend] = print_report(backend, rows)
+
+    if len(totals) > 1:
+        print("\n" + "="*72)
+        print("📊 SUMMARY (total PSS)")
+        print("="*72)
+        for backend, total in totals.items():
+            print(f"{backend:<8}: {total:>8.1f} MB")
+        print("="*72)
+
+
+if __name__ == "__main__":
+    main()
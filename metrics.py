@@ -0,0 +1,211 @@
+"""
+Metrics
+Histogram latency per tahap, counter request/error/cache, dan distribusi ukuran batch
+
+Dipakai oleh server.py (endpoint GET /metrics, format teks Prometheus) dan
+panel admin Streamlit. Tanpa dependency tambahan (tidak butuh prometheus_client).
+
+    with METRICS.time('stage_seconds', stage='decode'):
+        pixels = decode_to_array(body)
+    METRICS.inc('requests_total', endpoint='/predict')
+
+Metrics aktif secara default; BANANA_METRICS=0 mematikannya. Saat mati, time()
+mengembalikan context manager kosong yang sama setiap kali dan inc()/observe()
+langsung return, jadi biaya per panggilan hanya satu pengecekan atribut.
+Nilai disimpan per proses: setiap worker server melaporkan metrics-nya sendiri.
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# ====================================
+# KONFIGURASI
+# ====================================
+ENABLED = os.environ.get('BANANA_METRICS', '1') != '0'
+PREFIX = 'banana_'
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+# nama -> (tipe, deskripsi, bucket histogram)
+METRIC_DEFS = {
+    'stage_seconds': ('histogram', "Latency per tahap klasifikasi (detik)", LATENCY_BUCKETS),
+    'request_seconds': ('histogram', "Latency request end-to-end (detik)", LATENCY_BUCKETS),
+    'batch_size': ('histogram', "Jumlah gambar per forward pass", BATCH_SIZE_BUCKETS),
+    'requests_total': ('counter', "Jumlah request", None),
+    'errors_total': ('counter', "Jumlah request yang gagal", None),
+    'cache_hits_total': ('counter', "Jumlah cache hit", None),
+    'cache_misses_total': ('counter', "Jumlah cache miss", None),
+}
+
+_NULL_TIMER = nullcontext()
+
+
+class Histogram:
+    """Histogram kumulatif dengan bucket tetap (seperti histogram Prometheus)"""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # Slot terakhir = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Perkiraan kuantil dengan interpolasi linear di dalam bucket (seperti histogram_quantile)"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count > 0:
+                if i == len(self.bounds):
+                    return self.bounds[-1]  # Di atas bucket terbesar
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.bounds[-1]
+
+
+class _Timer:
+    __slots__ = ('metrics', 'name', 'labels', 'start')
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """Kumpulan histogram + counter, key (nama, label) -> nilai"""
+
+    def __init__(self, enabled=ENABLED):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def time(self, name, **labels):
+        """Context manager yang mencatat durasi blok ke histogram `name`"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(METRIC_DEFS[name][2])
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self.started_at = time.time()
+
+    # ------------------------------------
+    # Laporan
+    # ------------------------------------
+    def histograms(self, name):
+        """{label dict sebagai tuple: Histogram} untuk satu nama metric (salinan)"""
+        with self._lock:
+            return {
+                labels: self._copy(histogram)
+                for (metric, labels), histogram in self._histograms.items() if metric == name
+            }
+
+    def counters(self, name):
+        with self._lock:
+            return {labels: value for (metric, labels), value in self._counters.items() if metric == name}
+
+    @staticmethod
+    def _copy(histogram):
+        copy = Histogram(histogram.bounds)
+        copy.counts, copy.sum, copy.count = list(histogram.counts), histogram.sum, histogram.count
+        return copy
+
+    def summary(self, name):
+        """Baris ringkasan per label: count, mean, p50, p95, p99 (untuk panel admin)"""
+        rows = []
+        for labels, histogram in sorted(self.histograms(name).items()):
+            rows.append({
+                **dict(labels),
+                'count': histogram.count,
+                'mean': histogram.sum / histogram.count if histogram.count else None,
+                'p50': histogram.quantile(0.50),
+                'p95': histogram.quantile(0.95),
+                'p99': histogram.quantile(0.99),
+            })
+        return rows
+
+    def render_prometheus(self):
+        """Semua metrics dalam format teks Prometheus (text/plain; version=0.0.4)"""
+        lines = [
+            f"# HELP {PREFIX}up Proses aktif dan metrics diaktifkan",
+            f"# TYPE {PREFIX}up gauge",
+            f'{PREFIX}up{{pid="{os.getpid()}"}} {1 if self.enabled else 0}',
+            f"# HELP {PREFIX}metrics_start_time_seconds Waktu mulai pengumpulan metrics (unix)",
+            f"# TYPE {PREFIX}metrics_start_time_seconds gauge",
+            f"{PREFIX}metrics_start_time_seconds {self.started_at:.3f}",
+        ]
+        for name, (kind, description, _) in METRIC_DEFS.items():
+            full_name = PREFIX + name
+            lines.append(f"# HELP {full_name} {description}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            if kind == 'counter':
+                for labels, value in sorted(self.counters(name).items()):
+                    lines.append(f"{full_name}{_format_labels(labels)} {value}")
+                continue
+            for labels, histogram in sorted(self.histograms(name).items()):
+                cumulative = 0
+                for bound, count in zip(histogram.bounds + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                    lines.append(f"{full_name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{full_name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{full_name}_count{_format_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+# Registry global per proses
+METRICS = MetricsRegistry()
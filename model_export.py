@@ -0,0 +1,266 @@
+"""
+Model Export
+Export model Keras ke format deployment (TFLite float32/float16/int8, ONNX, bundle .npy)
+"""
+
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from preprocessing import DecodePool, list_labeled_images, preprocess_batch, preprocess_image
+
+# ====================================
+# KONFIGURASI
+# ====================================
+MODEL_BASENAME = 'fish_classifier_model'
+TFLITE_VARIANTS = ('float32', 'float16', 'dynamic_int8', 'full_int8')
+EXPORT_VARIANTS = ('float32', 'float16', 'dynamic_int8')  # Tanpa data kalibrasi (lihat export_full_int8)
+CALIBRATION_SAMPLES = 200  # Jumlah gambar train/ untuk kalibrasi kuantisasi int8 penuh
+MAX_ACCURACY_DROP = 0.01  # Model int8 hanya disimpan jika akurasi turun <= 1 poin
+LATENCY_RUNS = 50
+ONNX_OPSET = 13
+
+
+# ====================================
+# TFLITE
+# ====================================
+def tflite_path(variant, basename=MODEL_BASENAME):
+    """Nama file per varian; float32 memakai nama default yang dibaca app/server"""
+    if variant == 'float32':
+        return f"{basename}.tflite"
+    return f"{basename}_{variant}.tflite"
+
+
+def convert_tflite(model, variant='float32', representative_data=None):
+    """Konversi model Keras ke flatbuffer TFLite
+
+    - float32      : tanpa kuantisasi
+    - float16      : bobot disimpan float16 (ukuran ~1/2)
+    - dynamic_int8 : bobot int8, aktivasi tetap float (ukuran ~1/4, tanpa data kalibrasi)
+    - full_int8    : bobot + aktivasi + input/output int8, butuh representative_data
+    """
+    if variant not in TFLITE_VARIANTS:
+        raise ValueError(f"Varian TFLite tidak dikenal: {variant} (pilihan: {', '.join(TFLITE_VARIANTS)})")
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if variant == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == 'dynamic_int8':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif variant == 'full_int8':
+        if representative_data is None:
+            raise ValueError("Varian full_int8 membutuhkan representative_data untuk kalibrasi")
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_data
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    return converter.convert()
+
+
+def export_tflite(model, variants=EXPORT_VARIANTS, output_dir='.', basename=MODEL_BASENAME):
+    """Export varian TFLite tanpa kalibrasi -> dict {varian: path}"""
+    paths = {}
+    for variant in variants:
+        path = os.path.join(output_dir, tflite_path(variant, basename))
+        with open(path, 'wb') as f:
+            f.write(convert_tflite(model, variant))
+        paths[variant] = path
+    return paths
+
+
+# ====================================
+# ONNX
+# ====================================
+def export_onnx(model, output_dir='.', basename=MODEL_BASENAME, opset=ONNX_OPSET):
+    """Konversi model Keras ke ONNX (butuh tf2onnx) -> path file .onnx"""
+    import tf2onnx
+
+    path = os.path.join(output_dir, f"{basename}.onnx")
+    input_signature = [tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32, name='input')]
+    tf2onnx.convert.from_keras(model, input_signature=input_signature, opset=opset, output_path=path)
+    return path
+
+
+# ====================================
+# BUNDLE BOBOT .NPY (MEMORY-MAPPED)
+# ====================================
+def layer_spec(layer):
+    """Deskripsi satu layer Keras untuk forward pass NumPy (None = dilewati saat inferensi)"""
+    config = layer.get_config()
+    if isinstance(layer, (tf.keras.layers.InputLayer, tf.keras.layers.Dropout)):
+        return None
+    if isinstance(layer, tf.keras.layers.Conv2D):
+        if config['padding'] != 'same' or tuple(config['strides']) != (1, 1) \
+                or tuple(config['dilation_rate']) != (1, 1):
+            raise ValueError(f"Conv2D {layer.name}: hanya padding='same', stride 1 yang didukung")
+        return {'type': 'conv2d', 'activation': config['activation']}
+    if isinstance(layer, tf.keras.layers.MaxPooling2D):
+        if config['padding'] != 'valid' or tuple(config['pool_size']) != tuple(config['strides']):
+            raise ValueError(f"MaxPooling2D {layer.name}: hanya pool == stride, padding='valid'")
+        return {'type': 'maxpool', 'pool_size': list(config['pool_size'])}
+    if isinstance(layer, tf.keras.layers.Flatten):
+        return {'type': 'flatten'}
+    if isinstance(layer, tf.keras.layers.Dense):
+        return {'type': 'dense', 'activation': config['activation']}
+    raise ValueError(f"Layer {layer.name} ({type(layer).__name__}) tidak didukung backend mmap")
+
+
+def export_weight_bundle(model, output_dir='.', basename=MODEL_BASENAME):
+    """Simpan bobot sebagai file .npy float32 + manifest.json -> path folder bundle
+
+    Bundle dibaca backend 'mmap' dengan np.load(mmap_mode='r'): bobot tidak
+    disalin ke memori proses, sehingga banyak worker berbagi page cache yang sama.
+    """
+    path = os.path.join(output_dir, f"{basename}_weights")
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    layers = []
+    for index, layer in enumerate(model.layers):
+        spec = layer_spec(layer)
+        if spec is None:
+            continue
+        spec['name'] = layer.name
+        for key, weight in zip(('kernel', 'bias'), layer.get_weights()):
+            spec[key] = f"{index:02d}_{layer.name}_{key}.npy"
+            np.save(os.path.join(tmp_path, spec[key]), np.ascontiguousarray(weight, dtype=np.float32))
+        layers.append(spec)
+
+    with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+        json.dump({'input_shape': list(model.input_shape[1:]), 'layers': layers}, f, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+# ====================================
+# INT8 PENUH + ACCURACY GATE
+# ====================================
+def representative_dataset(train_dir, class_indices, num_samples=CALIBRATION_SAMPLES, seed=42):
+    """Generator kalibrasi dari train/ dengan preprocessing yang sama (150x150, /255)"""
+    items = list_labeled_images(train_dir, class_indices)
+    if not items:
+        raise ValueError(f"Tidak ada gambar untuk kalibrasi di {train_dir}")
+    rng = np.random.default_rng(seed)
+    chosen = rng.choice(len(items), size=min(num_samples, len(items)), replace=False)
+
+    def generator():
+        for i in chosen:
+            yield [preprocess_image(items[i][0])]
+
+    return generator
+
+
+def load_eval_set(directory, class_indices, decode_workers=4):
+    """Seluruh gambar test/ sebagai (x float32 (N, 150, 150, 3), y label (N,))"""
+    items = list_labeled_images(directory, class_indices)
+    with DecodePool(decode_workers, draft=False) as pool:
+        pixels = pool.map([path for path, _ in items])
+    x = preprocess_batch(pixels)
+    y = np.array([label for _, label in items])
+    return x, y
+
+
+def measure_latency(engine, x, runs=LATENCY_RUNS):
+    """Latency rata-rata satu gambar (ms)"""
+    sample = x[:1]
+    engine.predict(sample)
+    start = time.perf_counter()
+    for _ in range(runs):
+        engine.predict(sample)
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def compare_models(reference, candidate, x, y, class_names):
+    """Bandingkan dua engine pada data yang sama: akurasi, agreement per kelas, latency"""
+    ref_pred = np.argmax(reference.predict(x), axis=1)
+    cand_pred = np.argmax(candidate.predict(x), axis=1)
+
+    per_class = {}
+    for i, cls_name in enumerate(class_names):
+        cls_mask = y == i
+        cls_total = int(np.sum(cls_mask))
+        per_class[cls_name] = {
+            'total': cls_total,
+            'reference_accuracy': float(np.mean(ref_pred[cls_mask] == i)) if cls_total else 0.0,
+            'candidate_accuracy': float(np.mean(cand_pred[cls_mask] == i)) if cls_total else 0.0,
+            'agreement': float(np.mean(ref_pred[cls_mask] == cand_pred[cls_mask])) if cls_total else 0.0,
+        }
+
+    reference_accuracy = float(np.mean(ref_pred == y))
+    candidate_accuracy = float(np.mean(cand_pred == y))
+    return {
+        'reference_accuracy': reference_accuracy,
+        'candidate_accuracy': candidate_accuracy,
+        'accuracy_drop': reference_accuracy - candidate_accuracy,
+        'agreement': float(np.mean(ref_pred == cand_pred)),
+        'per_class': per_class,
+        'reference_latency_ms': measure_latency(reference, x),
+        'candidate_latency_ms': measure_latency(candidate, x),
+    }
+
+
+def export_full_int8(model, train_dir, test_dir, class_indices,
+                     max_accuracy_drop=MAX_ACCURACY_DROP, output_dir='.', basename=MODEL_BASENAME):
+    """Kuantisasi int8 penuh + accuracy gate terhadap model float di test/
+
+    Model int8 hanya disimpan ke {basename}_full_int8.tflite jika penurunan
+    akurasi <= max_accuracy_drop; jika tidak, kandidat dihapus. Return: report dict.
+    """
+    from backends import TFLiteEngine
+    from inference import InferenceEngine
+
+    path = os.path.join(output_dir, tflite_path('full_int8', basename))
+    candidate_path = path + '.candidate'
+    with open(candidate_path, 'wb') as f:
+        f.write(convert_tflite(model, 'full_int8', representative_dataset(train_dir, class_indices)))
+
+    idx_to_class = {v: k for k, v in class_indices.items()}
+    class_names = [idx_to_class[i] for i in sorted(idx_to_class)]
+    x, y = load_eval_set(test_dir, class_indices)
+
+    report = compare_models(InferenceEngine(model), TFLiteEngine(candidate_path), x, y, class_names)
+    report['reference_size_bytes'] = int(sum(w.nbytes for w in model.get_weights()))
+    report['candidate_size_bytes'] = os.path.getsize(candidate_path)
+    report['max_accuracy_drop'] = max_accuracy_drop
+    report['passed'] = report['accuracy_drop'] <= max_accuracy_drop
+
+    if report['passed']:
+        os.replace(candidate_path, path)
+        report['path'] = path
+    else:
+        os.remove(candidate_path)
+        report['path'] = None
+    return report
+
+
+def print_quantization_report(report):
+    print("\n" + "="*60)
+    print("INT8 QUANTIZATION REPORT")
+    print("="*60)
+    print(f"Float Accuracy       : {report['reference_accuracy']:.4f}")
+    print(f"Int8 Accuracy        : {report['candidate_accuracy']:.4f}")
+    print(f"Accuracy Drop        : {report['accuracy_drop']:.4f} (batas {report['max_accuracy_drop']:.4f})")
+    print(f"Prediction Agreement : {report['agreement']:.4f}")
+    print(f"Float Latency        : {report['reference_latency_ms']:.2f} ms/gambar")
+    print(f"Int8 Latency         : {report['candidate_latency_ms']:.2f} ms/gambar")
+    print(f"Float Weights Size   : {report['reference_size_bytes']/1024/1024:.2f} MB")
+    print(f"Int8 Model Size      : {report['candidate_size_bytes']/1024/1024:.2f} MB")
+    print("-" * 60)
+    print(f"{'Class':<15} {'Float Acc':<12} {'Int8 Acc':<12} {'Agreement':<12} {'Total'}")
+    print("-" * 60)
+    for cls_name, stats in report['per_class'].items():
+        print(f"{cls_name:<15} {stats['reference_accuracy']:<12.4f} {stats['candidate_accuracy']:<12.4f} "
+              f"{stats['agreement']:<12.4f} {stats['total']}")
+    print("="*60)
+    if report['passed']:
+        print(f"LULUS - model int8 disimpan: {report['path']}")
+    else:
+        print("GAGAL - penurunan akurasi melebihi batas, model int8 tidak disimpan")
@@ -0,0 +1,298 @@
+"""
+Model Registry
+Model berversi yang bisa diganti (hot-swap) tanpa me-restart worker
+
+Struktur folder registry:
+    models/
+        CURRENT                          -> nama versi aktif (opsional, default: versi terbaru)
+        20261018-153000/
+            fish_classifier_model.keras  -> dan/atau .tflite / .onnx / folder bobot _weights
+            class_indices.json
+            metadata.json                -> versi, waktu publish, SHA-256 tiap file + hash gabungan
+
+Versi baru dibuat dengan publish_version() (cell "Publish ke Model Registry" di notebook), lalu
+watcher di setiap worker me-load + warm-up versi tersebut di background dan
+menukarnya secara atomik. Request yang sedang berjalan tetap selesai di versi
+lama; versi lama dilepas dari memori setelah request terakhirnya selesai.
+"""
+
+import gc
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+# ====================================
+# KONFIGURASI
+# ====================================
+REGISTRY_DIR = 'models'
+CURRENT_FILE = 'CURRENT'
+METADATA_FILE = 'metadata.json'
+CLASS_INDICES_FILE = 'class_indices.json'
+MODEL_FILES = {
+    'keras': 'fish_classifier_model.keras',
+    'tflite': 'fish_classifier_model.tflite',
+    'onnx': 'fish_classifier_model.onnx',
+    'mmap': 'fish_classifier_model_weights',  # Folder bundle .npy
+}
+POLL_INTERVAL = 5.0  # Detik antar pengecekan versi baru
+
+
+# ====================================
+# ARTEFAK VERSI
+# ====================================
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def combined_hash(file_hashes):
+    """Satu hash untuk seluruh isi versi (urutan nama file stabil)"""
+    digest = hashlib.sha256()
+    for name in sorted(file_hashes):
+        digest.update(f"{name}:{file_hashes[name]}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def write_current(registry_dir, version):
+    """Tulis pointer CURRENT secara atomik (tulis file sementara lalu os.replace)"""
+    path = os.path.join(registry_dir, CURRENT_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp_path, path)
+
+
+def publish_version(model_paths, class_indices_path, registry_dir=REGISTRY_DIR,
+                    version=None, activate=True):
+    """Salin model (file atau folder, mis. bundle bobot) + class_indices.json ke versi baru
+
+    Folder disiapkan dengan nama sementara lalu di-rename, sehingga watcher
+    tidak pernah melihat versi yang setengah tersalin.
+
+    Return: nama versi
+    """
+    if isinstance(model_paths, str):
+        model_paths = [model_paths]
+    version = version or datetime.now().strftime('%Y%m%d-%H%M%S')
+    version_dir = os.path.join(registry_dir, version)
+    if os.path.exists(version_dir):
+        raise FileExistsError(f"Versi sudah ada: {version_dir}")
+
+    tmp_dir = os.path.join(registry_dir, f".{version}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    sources = {os.path.basename(path): path for path in model_paths}
+    sources[CLASS_INDICES_FILE] = class_indices_path
+    file_hashes = {}
+    for name, path in sources.items():
+        target = os.path.join(tmp_dir, name)
+        if os.path.isdir(path):
+            shutil.copytree(path, target)
+            for file in sorted(os.listdir(target)):
+                file_hashes[f"{name}/{file}"] = sha256_file(os.path.join(target, file))
+        else:
+            shutil.copy2(path, target)
+            file_hashes[name] = sha256_file(target)
+
+    metadata = {
+        'version': version,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'files': file_hashes,
+        'hash': combined_hash(file_hashes),
+    }
+    with open(os.path.join(tmp_dir, METADATA_FILE), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    os.replace(tmp_dir, version_dir)
+    if activate:
+        write_current(registry_dir, version)
+    return version
+
+
+def read_metadata(version_dir):
+    with open(os.path.join(version_dir, METADATA_FILE), 'r') as f:
+        return json.load(f)
+
+
+def verify_version(version_dir):
+    """Cek SHA-256 setiap file terhadap metadata.json -> metadata (ValueError jika tidak cocok)"""
+    metadata = read_metadata(version_dir)
+    for name, expected in metadata['files'].items():
+        path = os.path.join(version_dir, *name.split('/'))
+        if not os.path.exists(path):
+            raise ValueError(f"File {name} tidak ada di {version_dir}")
+        if sha256_file(path) != expected:
+            raise ValueError(f"Hash {name} di {version_dir} tidak cocok dengan metadata")
+    return metadata
+
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    """Versi yang lengkap (punya metadata.json), urut dari yang terlama"""
+    if not os.path.isdir(registry_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(registry_dir)
+        if not name.startswith('.')
+        and os.path.exists(os.path.join(registry_dir, name, METADATA_FILE))
+    )
+
+
+def resolve_active_version(registry_dir=REGISTRY_DIR):
+    """Versi yang seharusnya aktif: isi CURRENT jika ada, selain itu versi terbaru"""
+    current_path = os.path.join(registry_dir, CURRENT_FILE)
+    if os.path.exists(current_path):
+        with open(current_path, 'r') as f:
+            version = f.read().strip()
+        if version:
+            return version
+    versions = list_versions(registry_dir)
+    return versions[-1] if versions else None
+
+
+# ====================================
+# REGISTRY DENGAN HOT-SWAP
+# ====================================
+class ModelVersion:
+    """Satu versi yang sudah di-load beserta jumlah request yang sedang memakainya"""
+
+    def __init__(self, name, path, metadata, model):
+        self.name = name
+        self.path = path
+        self.metadata = metadata
+        self.hash = metadata['hash']
+        self.model = model  # Objek hasil loader (engine, class indices, dst.)
+        self.in_flight = 0
+        self.retired = False
+
+    def file(self, name):
+        return os.path.join(self.path, name)
+
+
+class ModelRegistry:
+    """Memegang versi aktif dan menukarnya saat versi baru muncul di registry
+
+    `loader(version_dir, metadata)` membangun objek model siap pakai (sudah
+    warm-up). Jika objek tersebut punya method close(), method itu dipanggil
+    saat versinya dilepas dari memori.
+    """
+
+    def __init__(self, registry_dir, loader, poll_interval=POLL_INTERVAL):
+        self.registry_dir = registry_dir
+        self.loader = loader
+        self.poll_interval = poll_interval
+        self.last_error = None
+
+        self._current = None
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self._failed = set()  # (versi, hash) yang gagal di-load, tidak dicoba ulang
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def current(self):
+        return self._current
+
+    @contextmanager
+    def acquire(self):
+        """Pinjam versi aktif selama satu request; versi tidak dilepas sebelum dikembalikan"""
+        with self._lock:
+            version = self._current
+            if version is None:
+                raise RuntimeError(f"Belum ada versi model yang di-load dari {self.registry_dir}")
+            version.in_flight += 1
+        try:
+            yield version
+        finally:
+            with self._lock:
+                version.in_flight -= 1
+                evict = version.retired and version.in_flight == 0
+            if evict:
+                self._evict(version)
+
+    def check(self):
+        """Load + swap jika versi aktif di registry berbeda dengan yang sedang dipakai
+
+        Return: True jika terjadi swap
+        """
+        with self._check_lock:
+            name = resolve_active_version(self.registry_dir)
+            if name is None:
+                return False
+            current = self._current
+            path = os.path.join(self.registry_dir, name)
+            try:
+                metadata = read_metadata(path)
+            except (OSError, ValueError) as e:
+                self.last_error = f"Metadata versi {name} tidak bisa dibaca: {e}"
+                return False
+            if current is not None and current.hash == metadata['hash']:
+                return False
+            if (name, metadata['hash']) in self._failed:
+                return False
+
+            try:
+                metadata = verify_version(path)
+                model = self.loader(path, metadata)
+            except Exception as e:
+                self._failed.add((name, metadata['hash']))
+                self.last_error = f"Gagal load versi {name}: {e}"
+                print(f"❌ {self.last_error}", file=sys.stderr)
+                return False
+
+            self._swap(ModelVersion(name, path, metadata, model))
+            self.last_error = None
+            return True
+
+    def _swap(self, version):
+        with self._lock:
+            old, self._current = self._current, version
+            if old is not None:
+                old.retired = True
+            evict = old is not None and old.in_flight == 0
+        print(f"🔄 Model versi {version.name} aktif"
+              + (f" (menggantikan {old.name})" if old is not None else ""))
+        if evict:
+            self._evict(old)
+
+    def _evict(self, version):
+        close = getattr(version.model, 'close', None)
+        if close is not None:
+            close()
+        version.model = None
+        gc.collect()
+        print(f"♻️ Model versi {version.name} dilepas dari memori")
+
+    # ------------------------------------
+    # Watcher
+    # ------------------------------------
+    def start(self):
+        """Load versi aktif sekarang, lalu pantau registry di background thread"""
+        self.check()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name='model-registry', daemon=True)
+            self._thread.start()
+        return self
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"⚠️ Watcher registry: {e}", file=sys.stderr)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,177 @@
+"""
+Overlay Renderer
+Render heatmap Grad-CAM berwarna + overlay untuk banyak gambar sekaligus dengan NumPy
+
+Colormap JET disimpan sebagai lookup table RGB (256, 3) yang dihitung sekali,
+jadi tidak ada applyColorMap + konversi BGR->RGB per gambar. Resize heatmap dan
+blending dijalankan tervektorisasi untuk satu batch (N, h, w). Hasil encode
+JPEG/WebP (asli, heatmap, overlay) di-cache per hasil sehingga rerun Streamlit
+langsung mengirim bytes tanpa render/encode ulang.
+"""
+
+import hashlib
+import io
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, features
+
+from metrics import METRICS
+from preprocessing import prepare_image
+from result_cache import ResultCache
+
+# ====================================
+# KONFIGURASI
+# ====================================
+ALPHA = 0.4  # Bobot heatmap pada overlay
+ENCODE_QUALITY = 90
+ENCODED_CACHE_MAX_ENTRIES = 256
+ENCODED_CACHE_MAX_BYTES = 32 * 1024 * 1024
+VISUALS = ('original', 'heatmap', 'overlay')
+
+
+# ====================================
+# COLORMAP LUT
+# ====================================
+@lru_cache(maxsize=None)
+def jet_lut():
+    """Lookup table JET RGB uint8 (256, 3), sama dengan cv2.COLORMAP_JET jika cv2 tersedia"""
+    try:
+        import cv2
+        gray = np.arange(256, dtype=np.uint8).reshape(256, 1)
+        lut = cv2.applyColorMap(gray, cv2.COLORMAP_JET)[:, 0, ::-1]
+    except ImportError:
+        # Definisi JET klasik (piecewise linear) tanpa cv2
+        x = np.linspace(0.0, 1.0, 256)
+        lut = np.stack([np.clip(1.5 - np.abs(4 * x - c), 0, 1) for c in (3, 2, 1)], axis=1)
+        lut = np.round(lut * 255)
+    lut = np.ascontiguousarray(lut, dtype=np.uint8)
+    lut.setflags(write=False)
+    return lut
+
+
+def default_format():
+    """WebP jika Pillow mendukung (lebih kecil), selain itu JPEG"""
+    return 'WEBP' if features.check('webp') else 'JPEG'
+
+
+# ====================================
+# RENDER BATCH
+# ====================================
+@lru_cache(maxsize=16)
+def _resize_weights(src, dst):
+    """Indeks + bobot interpolasi bilinear 1 dimensi (pusat piksel, seperti cv2.INTER_LINEAR)"""
+    coords = (np.arange(dst, dtype=np.float32) + 0.5) * (src / dst) - 0.5
+    coords = np.clip(coords, 0, src - 1)
+    low = np.floor(coords).astype(np.intp)
+    high = np.minimum(low + 1, src - 1)
+    return low, high, (coords - low).astype(np.float32)
+
+
+def resize_heatmaps(heatmaps, size):
+    """Resize bilinear (N, h, w) -> (N, H, W) untuk seluruh batch sekaligus; size = (H, W)"""
+    heatmaps = np.asarray(heatmaps, dtype=np.float32)
+    _, h, w = heatmaps.shape
+    y0, y1, wy = _resize_weights(h, size[0])
+    x0, x1, wx = _resize_weights(w, size[1])
+    rows = heatmaps[:, y0] * (1 - wy)[:, None] + heatmaps[:, y1] * wy[:, None]
+    return rows[:, :, x0] * (1 - wx) + rows[:, :, x1] * wx
+
+
+def colorize(heatmaps):
+    """Heatmap [0, 1] (N, H, W) -> RGB uint8 (N, H, W, 3) lewat LUT"""
+    indices = np.uint8(255 * np.clip(heatmaps, 0, 1))
+    return jet_lut()[indices]
+
+
+def render_overlays(images, heatmaps, alpha=ALPHA):
+    """Heatmap berwarna + overlay untuk satu batch
+
+    images: uint8 (N, H, W, 3) RGB; heatmaps: (N, h, w) di [0, 1]
+    Return: (heatmap berwarna (N, H, W, 3), overlay (N, H, W, 3)), keduanya uint8
+    """
+    with METRICS.time('stage_seconds', stage='overlay'):
+        images = np.asarray(images, dtype=np.uint8)
+        colored = colorize(resize_heatmaps(heatmaps, images.shape[1:3]))
+        blended = images.astype(np.float32) * (1 - alpha) + colored.astype(np.float32) * alpha
+        overlays = np.clip(np.rint(blended), 0, 255).astype(np.uint8)
+    return colored, overlays
+
+
+def render_overlay(image, heatmap, alpha=ALPHA):
+    """Versi satu gambar: image uint8 (H, W, 3), heatmap (h, w)"""
+    colored, overlays = render_overlays(image[np.newaxis], heatmap[np.newaxis], alpha)
+    return colored[0], overlays[0]
+
+
+def create_gradcam_overlay(image, heatmap, alpha=ALPHA):
+    """Overlay heatmap pada gambar (PIL Image, path, bytes, atau uint8) -> (heatmap, overlay)"""
+    # Pakai ulang array uint8 hasil prepare_image (tidak resize ulang)
+    return render_overlay(prepare_image(image), heatmap, alpha)
+
+
+# ====================================
+# ENCODE + CACHE
+# ====================================
+def encode_image(array, image_format='JPEG', quality=ENCODE_QUALITY):
+    """Array uint8 RGB -> bytes JPEG/WebP/PNG"""
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, format=image_format, quality=quality)
+    return buffer.getvalue()
+
+
+class OverlayRenderer:
+    """Render + encode gambar asli, heatmap, dan overlay; bytes di-cache per hasil
+
+    Key cache dari piksel uint8 (sudah di-resize) + heatmap + parameter render,
+    sehingga hasil yang sama (rerun, upload ulang, sesi lain) langsung dilayani
+    dari cache.
+    """
+
+    def __init__(self, alpha=ALPHA, image_format=None, quality=ENCODE_QUALITY, cache=None):
+        self.alpha = alpha
+        self.image_format = image_format or default_format()
+        self.quality = quality
+        self.cache = cache if cache is not None else ResultCache(
+            ENCODED_CACHE_MAX_ENTRIES, ENCODED_CACHE_MAX_BYTES, name='overlay'
+        )
+
+    @property
+    def mime_type(self):
+        return f"image/{self.image_format.lower()}"
+
+    def make_key(self, pixels, heatmap):
+        digest = hashlib.sha256()
+        digest.update(f"{self.alpha}:{self.image_format}:{self.quality}".encode('utf-8'))
+        for array in (pixels, np.asarray(heatmap, dtype=np.float32)):
+            array = np.ascontiguousarray(array)
+            digest.update(str(array.shape).encode('utf-8'))
+            digest.update(array.tobytes())
+        return digest.hexdigest()
+
+    def encode_batch(self, images, heatmaps):
+        """Dict {'original', 'heatmap', 'overlay'} -> bytes untuk setiap gambar
+
+        Hanya gambar yang belum ada di cache yang di-render, dalam satu batch.
+        """
+        keys = [self.make_key(image, heatmap) for image, heatmap in zip(images, heatmaps)]
+        results = [self.cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            batch = np.stack([images[i] for i in missing])
+            colored, overlays = render_overlays(
+                batch, np.stack([heatmaps[i] for i in missing]), self.alpha
+            )
+            with METRICS.time('stage_seconds', stage='encode'):
+                for j, i in enumerate(missing):
+                    encoded = tuple(
+                        encode_image(array, self.image_format, self.quality)
+                        for array in (batch[j], colored[j], overlays[j])
+                    )
+                    self.cache.put(keys[i], encoded)
+                    results[i] = encoded
+        return [dict(zip(VISUALS, encoded)) for encoded in results]
+
+    def encode(self, pixels, heatmap):
+        """Versi satu gambar dari encode_batch"""
+        return self.encode_batch([pixels], [heatmap])[0]
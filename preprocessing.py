@@ -0,0 +1,198 @@
+"""
+Image Preprocessing
+Pipeline preprocessing gambar pisang: decode sekali, konversi mode, resize sekali
+"""
+
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from metrics import METRICS
+
+# ====================================
+# KONFIGURASI
+# ====================================
+IMG_SIZE = (150, 150)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+RESAMPLE_FILTER = Image.BICUBIC  # Sama dengan default Image.resize yang dipakai sebelumnya
+BACKGROUND_COLOR = (255, 255, 255)  # Warna latar untuk gambar transparan (PNG dengan alpha)
+USE_JPEG_DRAFT = True  # Decode JPEG langsung di resolusi rendah (skala 1/2, 1/4, 1/8)
+DECODE_WORKERS = 4
+
+
+# ====================================
+# DATASET DI DISK
+# ====================================
+def class_indices_from_directory(directory):
+    """Mapping kelas -> indeks dari nama subfolder (urutan sama dengan flow_from_directory)"""
+    classes = sorted(
+        name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name))
+    )
+    return {name: i for i, name in enumerate(classes)}
+
+
+def list_labeled_images(directory, class_indices):
+    """(path, label) untuk semua gambar di directory/<kelas>/, urut sesuai class_indices"""
+    items = []
+    for class_name, label in sorted(class_indices.items(), key=lambda x: x[1]):
+        for root, dirs, files in os.walk(os.path.join(directory, class_name)):
+            dirs.sort()
+            for file in sorted(files):
+                if file.lower().endswith(IMAGE_EXTENSIONS):
+                    items.append((os.path.join(root, file), label))
+    return items
+
+
+# ====================================
+# DECODE & KONVERSI
+# ====================================
+def load_image(source, draft=False):
+    """Decode gambar dari path, bytes, file-like, atau PIL Image
+
+    Dengan draft=True, JPEG di-decode langsung pada skala terkecil yang masih
+    >= IMG_SIZE (Image.draft), jauh lebih cepat untuk foto HP beresolusi besar.
+    """
+    if isinstance(source, Image.Image):
+        return source
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    image = Image.open(source)
+    if draft and image.format == 'JPEG':
+        image.draft('RGB', IMG_SIZE)
+    image.load()
+    return image
+
+
+def to_rgb(image):
+    """Konversi mode apa pun (RGBA, LA, P, L, CMYK, ...) ke RGB 3 channel
+
+    Gambar dengan transparansi ditempel di atas BACKGROUND_COLOR supaya area
+    transparan tidak menjadi hitam.
+    """
+    if image.mode == 'RGB':
+        return image
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+    if has_alpha:
+        rgba = image.convert('RGBA')
+        background = Image.new('RGBA', rgba.size, BACKGROUND_COLOR + (255,))
+        return Image.alpha_composite(background, rgba).convert('RGB')
+    return image.convert('RGB')
+
+
+def prepare_image(image, resample=RESAMPLE_FILTER, draft=False):
+    """Decode + konversi RGB + resize sekali -> array uint8 (150, 150, 3)
+
+    Array uint8 yang sudah berukuran IMG_SIZE dikembalikan apa adanya, sehingga
+    hasil ini bisa dipakai bersama oleh prediksi, cache hasil, dan overlay Grad-CAM.
+    """
+    if isinstance(image, np.ndarray):
+        if image.shape == IMG_SIZE + (3,) and image.dtype == np.uint8:
+            return image
+        image = Image.fromarray(image)
+    with METRICS.time('stage_seconds', stage='decode'):
+        image = to_rgb(load_image(image, draft))
+        if image.size != IMG_SIZE:
+            image = image.resize(IMG_SIZE, resample)
+        return np.asarray(image)
+
+
+# ====================================
+# BATCH BUFFER
+# ====================================
+def preprocess_batch(images, out=None, resample=RESAMPLE_FILTER):
+    """Preprocess banyak gambar langsung ke buffer float32 (N, 150, 150, 3)
+
+    `out` boleh berupa buffer yang sudah dialokasikan sebelumnya (mis. slice dari
+    buffer ukuran MAX_BATCH_SIZE) agar tidak ada alokasi per gambar.
+    """
+    shape = (len(images),) + IMG_SIZE + (3,)
+    if out is None:
+        out = np.empty(shape, dtype=np.float32)
+    elif out.shape != shape or out.dtype != np.float32:
+        raise ValueError(f"Buffer harus float32 berbentuk {shape}, bukan {out.dtype} {out.shape}")
+
+    with METRICS.time('stage_seconds', stage='preprocess'):
+        for i, image in enumerate(images):
+            # Cast uint8 -> float32 langsung ke slot buffer, tanpa array perantara
+            out[i] = prepare_image(image, resample)
+        # Normalize sekali untuk seluruh batch (in-place)
+        out /= np.float32(255.0)
+    return out
+
+
+def preprocess_image(image):
+    """Preprocess gambar untuk prediksi -> (1, 150, 150, 3) float32"""
+    return preprocess_batch([image])
+
+
+# ====================================
+# DECODE PARALEL
+# ====================================
+def decode_to_array(source, draft=USE_JPEG_DRAFT):
+    """Decode + resize satu gambar (path atau bytes) -> uint8 (150, 150, 3)
+
+    Fungsi level modul agar bisa dipakai oleh process pool (harus picklable).
+    """
+    return prepare_image(source, draft=draft)
+
+
+class DecodePool:
+    """Pool decode/resize gambar dengan thread atau proses
+
+    Thread sudah cukup untuk kebanyakan kasus karena decoder PIL melepas GIL;
+    proses berguna untuk foto sangat besar atau format yang decode-nya berat
+    (hasil uint8 150x150x3 kecil, jadi biaya pickle antar proses murah).
+    """
+
+    def __init__(self, workers=DECODE_WORKERS, use_processes=False, draft=USE_JPEG_DRAFT):
+        self.workers = workers
+        self.use_processes = use_processes
+        self.draft = draft
+        executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self._executor = executor_cls(max_workers=workers)
+
+    def submit(self, source):
+        """Decode satu gambar (path atau bytes) di pool -> Future berisi array uint8"""
+        return self._executor.submit(decode_to_array, source, self.draft)
+
+    def imap(self, sources, max_in_flight=None):
+        """Decode berurutan dengan jumlah pekerjaan in-flight terbatas
+
+        Yield (source, pixels, error) sesuai urutan input; error berisi exception
+        jika gambar gagal di-decode (pixels None).
+        """
+        max_in_flight = max_in_flight or self.workers * 4
+        pending = deque()
+        for source in sources:
+            pending.append((source, self.submit(source)))
+            if len(pending) >= max_in_flight:
+                yield self._pop(pending)
+        while pending:
+            yield self._pop(pending)
+
+    @staticmethod
+    def _pop(pending):
+        source, future = pending.popleft()
+        try:
+            return source, future.result(), None
+        except Exception as e:
+            return source, None, e
+
+    def map(self, sources):
+        """Decode semua gambar -> list array uint8 (exception diteruskan)"""
+        return [future.result() for future in [self.submit(source) for source in sources]]
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
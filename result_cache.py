@@ -0,0 +1,88 @@
+"""
+Result Cache
+Cache hasil klasifikasi berbasis hash konten gambar (LRU)
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import METRICS
+
+
+class ResultCache:
+    """Cache LRU thread-safe yang dibatasi jumlah entri dan total byte
+
+    Key dibuat dari piksel gambar yang sudah di-resize ke IMG_SIZE ditambah
+    fingerprint model, sehingga upload ulang gambar yang sama (atau rerun
+    Streamlit) tidak perlu menyentuh TensorFlow lagi. Jika `name` diisi, hit/miss
+    juga dicatat ke METRICS dengan label cache=name.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=16 * 1024 * 1024, name=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(pixels, fingerprint):
+        """Key dari buffer piksel (uint8, sudah di-resize) + fingerprint model"""
+        pixels = np.ascontiguousarray(pixels)
+        digest = hashlib.sha256()
+        digest.update(fingerprint.encode('utf-8'))
+        digest.update(str(pixels.shape).encode('utf-8'))
+        digest.update(pixels.tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _sizeof(value):
+        if isinstance(value, (tuple, list)):
+            return sum(ResultCache._sizeof(v) for v in value)
+        if isinstance(value, np.ndarray):
+            return value.nbytes
+        if isinstance(value, (bytes, bytearray)):
+            return len(value)
+        return 0
+
+    def get(self, key):
+        """Ambil hasil dari cache, None jika tidak ada"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if self.name is not None:
+            METRICS.inc('cache_misses_total' if entry is None else 'cache_hits_total', cache=self.name)
+        return None if entry is None else entry[0]
+
+    def put(self, key, value):
+        """Simpan hasil; entri paling lama dibuang jika melewati batas"""
+        nbytes = self._sizeof(value)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (value, nbytes)
+            self.current_bytes += nbytes
+            while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,384 @@
+"""
+Banana Inference Server
+HTTP JSON service untuk klasifikasi pisang, terpisah dari UI Streamlit
+
+Jalankan: python server.py --port 8000 --workers 2
+          python server.py --registry models/   (hot-swap versi model, lihat model_registry.py)
+
+Endpoint:
+    GET  /health   -> status worker (liveness, selalu 200 selama proses hidup)
+    GET  /ready    -> 200 setelah model selesai load + warm-up, 503 sebelumnya
+    GET  /metrics  -> metrics worker ini dalam format teks Prometheus (lihat metrics.py)
+    POST /predict  -> body: bytes gambar (JPG/PNG), atau JSON {"images": [base64, ...]}
+    POST /explain  -> body: bytes gambar; prediksi + heatmap Grad-CAM
+"""
+
+import argparse
+import base64
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from backends import BACKENDS, create_engine, decode_prediction
+from metrics import METRICS
+from model_registry import CLASS_INDICES_FILE, MODEL_FILES, POLL_INTERVAL, ModelRegistry
+from preprocessing import DecodePool, decode_to_array, preprocess_batch, preprocess_image
+
+# ====================================
+# KONFIGURASI
+# ====================================
+CLASS_INDICES_PATH = 'class_indices.json'
+LAST_CONV_LAYER = 'last_conv'
+MAX_BODY_BYTES = 20 * 1024 * 1024  # Batas ukuran upload (20 MB)
+MAX_BATCH_SIZE = 32
+MICRO_BATCH_LATENCY_MS = 5.0
+DECODE_WORKERS = 4
+
+# State per proses worker, diisi oleh init_worker().
+# TensorFlow sengaja baru di-import di sana, setelah fork.
+STATE = {}
+RETRY_AFTER_SECONDS = 5
+
+
+# ====================================
+# WORKER
+# ====================================
+class WorkerModel:
+    """Engine + micro-batcher + GradCAMExplainer (backend keras) untuk satu versi model
+
+    Engine di-warm-up untuk setiap bucket batch dan Grad-CAM sekali saat dibuat,
+    jadi objek ini baru dipakai melayani request setelah benar-benar siap.
+    """
+
+    def __init__(self, model_path, class_indices_path, backend='keras', num_threads=None,
+                 max_batch_size=MAX_BATCH_SIZE, batch_latency_ms=MICRO_BATCH_LATENCY_MS):
+        from batching import MicroBatcher
+
+        with open(class_indices_path, 'r') as f:
+            class_indices = json.load(f)
+
+        start = time.perf_counter()
+        self.engine = create_engine(backend, model_path, num_threads)
+        # Request /predict satu-gambar dari thread yang berbeda digabung jadi satu batch
+        self.batcher = MicroBatcher(self.engine.predict, max_batch_size, batch_latency_ms)
+        self.idx_to_class = {v: k for k, v in class_indices.items()}
+        self.explainer = None
+        if self.engine.model is not None:
+            from inference import GradCAMExplainer
+            try:
+                self.explainer = GradCAMExplainer(self.engine.model, LAST_CONV_LAYER)
+            except ValueError:
+                # Model tanpa layer 'last_conv': /explain tidak tersedia
+                pass
+
+        self.warmup = {
+            'total_seconds': round(time.perf_counter() - start, 4),
+            'engine_seconds': round(self.engine.warmup_seconds, 4),
+            'buckets': {str(b): round(t, 4) for b, t in self.engine.warmup_timings.items()},
+            'gradcam_seconds': (round(self.explainer.warmup_seconds, 4)
+                                if self.explainer is not None else None),
+        }
+
+    @property
+    def classes(self):
+        return [self.idx_to_class[i] for i in sorted(self.idx_to_class)]
+
+    def format_result(self, probs):
+        pred_class, confidence, all_probs = decode_prediction(probs, self.idx_to_class)
+        return {
+            'class': pred_class,
+            'confidence': float(confidence),
+            'probabilities': all_probs,
+        }
+
+    def close(self):
+        self.batcher.close()
+
+
+def init_worker(model_path, class_indices_path, registry_dir=None,
+                poll_interval=POLL_INTERVAL, **model_options):
+    """Load model sekali per proses worker
+
+    Dengan registry_dir, versi aktif di registry di-load lalu dipantau: versi
+    baru di-load + warm-up di background dan ditukar tanpa restart worker.
+    """
+    STATE['decode_pool'] = DecodePool(DECODE_WORKERS)
+
+    if registry_dir is None:
+        STATE['model'] = WorkerModel(model_path, class_indices_path, **model_options)
+        return
+
+    backend = model_options.get('backend', 'keras')
+
+    def load_version(version_dir, metadata):
+        return WorkerModel(os.path.join(version_dir, MODEL_FILES[backend]),
+                           os.path.join(version_dir, CLASS_INDICES_FILE), **model_options)
+
+    STATE['registry'] = ModelRegistry(registry_dir, load_version, poll_interval).start()
+
+
+def start_worker(model_path, class_indices_path, **worker_options):
+    """Jalankan init_worker di background agar /health dan /ready bisa dijawab selama warm-up"""
+    def run():
+        try:
+            init_worker(model_path, class_indices_path, **worker_options)
+            if is_ready():
+                with acquire_model() as (model, version):
+                    print(f"✅ Worker {os.getpid()} siap (versi {version or '-'}): {model.warmup}")
+        except Exception as e:
+            STATE['error'] = str(e)
+            print(f"❌ Worker {os.getpid()} gagal load model: {e}", file=sys.stderr)
+
+    thread = threading.Thread(target=run, name='worker-init', daemon=True)
+    thread.start()
+    return thread
+
+
+def is_ready():
+    """Worker siap jika ada model (versi registry) yang sudah selesai load + warm-up"""
+    registry = STATE.get('registry')
+    if registry is not None:
+        return registry.current is not None
+    return 'model' in STATE
+
+
+def startup_error():
+    registry = STATE.get('registry')
+    if registry is not None and registry.last_error:
+        return registry.last_error
+    return STATE.get('error')
+
+
+@contextmanager
+def acquire_model():
+    """Model untuk satu request -> (WorkerModel, nama versi atau None)
+
+    Versi registry dipinjam selama request berjalan, sehingga swap ke versi baru
+    tidak melepas model yang masih dipakai.
+    """
+    registry = STATE.get('registry')
+    if registry is None:
+        yield STATE['model'], None
+        return
+    with registry.acquire() as version:
+        yield version.model, version.name
+
+
+def handle_predict(model, body, content_type):
+    """Satu gambar (bytes) atau banyak gambar (JSON base64) dalam satu forward pass"""
+    if content_type.startswith('application/json'):
+        payload = json.loads(body)
+        # Dilaporkan sebagai 400 lewat ValueError, seperti input tidak valid lainnya
+        if not isinstance(payload, dict) or not isinstance(payload.get('images'), list):
+            raise ValueError("Body JSON harus berupa objek {\"images\": [base64, ...]}")
+        if not all(isinstance(item, str) for item in payload['images']):
+            raise ValueError("Setiap item 'images' harus berupa string base64")
+        images = STATE['decode_pool'].map([base64.b64decode(item) for item in payload['images']])
+        probs = model.engine.predict(preprocess_batch(images))
+        return 200, {'results': [model.format_result(p) for p in probs]}
+
+    probs = model.batcher.predict(preprocess_image(decode_to_array(body)))
+    return 200, model.format_result(probs[0])
+
+
+def handle_explain(model, body, content_type):
+    """Prediksi + Grad-CAM dalam satu forward/backward pass"""
+    if model.explainer is None:
+        return 501, {'error': "Grad-CAM membutuhkan backend keras dengan layer "
+                              f"'{LAST_CONV_LAYER}'"}
+
+    pixels = decode_to_array(body)
+    predictions, heatmap = model.explainer.explain(preprocess_image(pixels))
+    result = model.format_result(predictions[0])
+    result['heatmap'] = np.round(heatmap, 4).tolist()
+    return 200, result
+
+
+ROUTES = {
+    '/predict': handle_predict,
+    '/explain': handle_explain,
+}
+
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    server_version = 'BananaInference/1.0'
+
+    def _send_text(self, status, text, content_type, headers=None):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload, headers=None):
+        self._send_text(status, json.dumps(payload), 'application/json', headers)
+
+    def _send_not_ready(self):
+        self._send_json(503, {
+            'error': startup_error() or "Model sedang di-load / warm-up",
+            'ready': False,
+        }, {'Retry-After': str(RETRY_AFTER_SECONDS)})
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            # Selalu dijawab, juga selama warm-up
+            self._send_text(200, METRICS.render_prometheus(), 'text/plain; version=0.0.4; charset=utf-8')
+            return
+        if self.path not in ('/health', '/ready'):
+            self._send_json(404, {'error': f"Path tidak dikenal: {self.path}"})
+            return
+
+        if not is_ready():
+            if self.path == '/ready':
+                self._send_not_ready()
+            else:
+                self._send_json(200, {
+                    'status': 'error' if startup_error() else 'loading',
+                    'pid': os.getpid(),
+                    'ready': False,
+                })
+            return
+
+        with acquire_model() as (model, version):
+            payload = {'ready': True, 'pid': os.getpid(), 'version': version, 'warmup': model.warmup}
+            if self.path == '/health':
+                payload.update({
+                    'status': 'ok',
+                    'classes': model.classes,
+                    'gradcam': model.explainer is not None,
+                })
+        self._send_json(200, payload)
+
+    def do_POST(self):
+        handler = ROUTES.get(self.path)
+        if handler is None:
+            self._send_json(404, {'error': f"Path tidak dikenal: {self.path}"})
+            return
+        METRICS.inc('requests_total', endpoint=self.path)
+        if not is_ready():
+            METRICS.inc('errors_total', endpoint=self.path, status='503')
+            self._send_not_ready()
+            return
+
+        with METRICS.time('request_seconds', endpoint=self.path):
+            status, payload = self._handle_post(handler)
+            if status >= 400:
+                METRICS.inc('errors_total', endpoint=self.path, status=str(status))
+            self._send_json(status, payload)
+
+    def _handle_post(self, handler):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            return 400, {'error': "Header Content-Length tidak valid"}
+        if length < 0:
+            return 400, {'error': "Header Content-Length tidak valid"}
+        if length == 0:
+            return 400, {'error': "Body request kosong"}
+        if length > MAX_BODY_BYTES:
+            return 413, {'error': f"Body melebihi {MAX_BODY_BYTES} byte"}
+        body = self.rfile.read(length)
+
+        try:
+            with acquire_model() as (model, _):
+                return handler(model, body, self.headers.get('Content-Type', ''))
+        except (ValueError, KeyError, OSError) as e:
+            # Gambar tidak bisa di-decode / JSON tidak valid
+            return 400, {'error': str(e)}
+        except Exception as e:
+            return 500, {'error': str(e)}
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f"[worker {os.getpid()}] {self.address_string()} - {format % args}\n")
+
+
+# ====================================
+# MAIN
+# ====================================
+def serve(host, port, workers, model_path, class_indices_path, **worker_options):
+    """Bind sekali di proses induk, lalu fork worker yang berbagi socket yang sama"""
+    server = ThreadingHTTPServer((host, port), InferenceHandler)
+    print(f"🍌 Inference server di http://{host}:{port} ({workers} worker)")
+
+    if workers <= 1:
+        start_worker(model_path, class_indices_path, **worker_options)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                start_worker(model_path, class_indices_path, **worker_options)
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def stop_children(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop_children)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference server klasifikasi pisang")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Jumlah proses worker (masing-masing memuat model sendiri)")
+    parser.add_argument('--backend', choices=BACKENDS, default='keras',
+                        help="Backend inferensi (/explain hanya tersedia untuk keras)")
+    parser.add_argument('--model', default=None,
+                        help="File model (default sesuai backend: .keras, .tflite atau .onnx)")
+    parser.add_argument('--threads', type=int, default=None,
+                        help="Jumlah thread backend (tflite: interpreter, onnx: intra-op)")
+    parser.add_argument('--class-indices', default=CLASS_INDICES_PATH)
+    parser.add_argument('--registry', default=None,
+                        help="Folder model registry berversi (hot-swap); menggantikan --model "
+                             "dan --class-indices")
+    parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL,
+                        help="Detik antar pengecekan versi baru di registry")
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE,
+                        help="Ukuran batch maksimal micro-batching /predict")
+    parser.add_argument('--batch-latency-ms', type=float, default=MICRO_BATCH_LATENCY_MS,
+                        help="Jendela waktu penggabungan request /predict")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.workers, args.model, args.class_indices,
+          registry_dir=args.registry, poll_interval=args.poll_interval,
+          backend=args.backend, num_threads=args.threads,
+          max_batch_size=args.max_batch_size, batch_latency_ms=args.batch_latency_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Test Script untuk Backend Inferensi (parity TFLite / ONNX / mmap vs Keras)
+Jalankan: python test_backends.py
+"""
+
+import json
+import os
+import tempfile
+
+import numpy as np
+import tensorflow as tf
+
+from backends import ONNX_MODEL_PATH, TFLITE_MODEL_PATH, WEIGHTS_BUNDLE_PATH, create_engine
+from inference import InferenceEngine
+from model_export import export_weight_bundle
+from preprocessing import list_labeled_images, preprocess_batch
+
+# Configuration
+MODEL_PATH = 'fish_classifier_model.keras'
+CLASS_INDICES_PATH = 'class_indices.json'
+TEST_DIR = 'test'
+MAX_ABS_DIFF = 1e-4  # Toleransi selisih probabilitas untuk backend float32
+NUM_REAL_IMAGES = 32
+
+
+def load_parity_inputs():
+    """Gambar acak + (jika ada) gambar real dari folder test"""
+    rng = np.random.default_rng(42)
+    inputs = [rng.random((8, 150, 150, 3), dtype=np.float32)]
+
+    if os.path.exists(TEST_DIR) and os.path.exists(CLASS_INDICES_PATH):
+        with open(CLASS_INDICES_PATH, 'r') as f:
+            class_indices = json.load(f)
+        paths = [path for path, _ in list_labeled_images(TEST_DIR, class_indices)][:NUM_REAL_IMAGES]
+        if paths:
+            inputs.append(preprocess_batch(paths))
+
+    return np.concatenate(inputs, axis=0)
+
+
+def check_parity(backend, model_path, reference, inputs):
+    """Bandingkan output backend dengan engine Keras"""
+    print("\n" + "="*60)
+    print(f"PARITY: {backend.upper()} vs KERAS")
+    print("="*60)
+
+    if not os.path.exists(model_path):
+        print(f"⚠️ {model_path} tidak ditemukan, jalankan cell export di notebook")
+        return None
+
+    try:
+        engine = create_engine(backend, model_path)
+        expected = reference.predict(inputs)
+        actual = engine.predict(inputs)
+
+        max_diff = float(np.max(np.abs(expected - actual)))
+        agreement = float(np.mean(np.argmax(expected, axis=1) == np.argmax(actual, axis=1)))
+
+        print(f"📊 Jumlah gambar     : {len(inputs)}")
+        print(f"📊 Max abs diff      : {max_diff:.2e} (toleransi {MAX_ABS_DIFF:.0e})")
+        print(f"📊 Argmax agreement  : {agreement:.2%}")
+
+        passed = max_diff <= MAX_ABS_DIFF and agreement == 1.0
+        print("✅ Output sama dengan Keras!" if passed else "❌ Output berbeda dari Keras!")
+        return passed
+
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def status(result):
+    if result is None:
+        return '⏭️ SKIPPED'
+    return '✅ PASSED' if result else '❌ FAILED'
+
+
+if __name__ == "__main__":
+    print("\n🔬 BACKEND PARITY TEST SUITE")
+    print("="*60)
+
+    if not os.path.exists(MODEL_PATH):
+        print("❌ Model file tidak ditemukan!")
+    else:
+        reference = InferenceEngine(tf.keras.models.load_model(MODEL_PATH))
+        inputs = load_parity_inputs()
+
+        tflite_passed = check_parity('tflite', TFLITE_MODEL_PATH, reference, inputs)
+        onnx_passed = check_parity('onnx', ONNX_MODEL_PATH, reference, inputs)
+        # Forward pass NumPy (padding, pooling, flatten, aktivasi) dicek terhadap Keras;
+        # tanpa bundle hasil export, bundle dibuat dari model yang sama di folder sementara
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bundle_path = WEIGHTS_BUNDLE_PATH
+            if not os.path.exists(bundle_path):
+                bundle_path = export_weight_bundle(reference.model, tmp_dir)
+            mmap_passed = check_parity('mmap', bundle_path, reference, inputs)
+
+        print("\n" + "="*60)
+        print("📊 TEST SUMMARY")
+        print("="*60)
+        print(f"TFLite float32 : {status(tflite_passed)}")
+        print(f"ONNX Runtime   : {status(onnx_passed)}")
+        print(f"mmap (NumPy)   : {status(mmap_passed)}")
+
+        if False in (tflite_passed, onnx_passed, mmap_passed):
+            print("\n⚠️ Ada backend yang tidak sama dengan Keras. Jangan pakai backend tersebut untuk deploy.")
+        else:
+            print("\n🎉 Backend yang tersedia siap dipakai sebagai pengganti Keras!")
+
+    print("="*60)
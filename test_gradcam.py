@@ -8,10 +8,13 @@ import numpy as np
 from PIL import Image
 import cv2
 import os
+import time
+
+from inference import GradCAMExplainer, InferenceEngine
+from preprocessing import IMG_SIZE, preprocess_image
 
 # Configuration
 MODEL_PATH = 'fish_classifier_model.keras'
-IMG_SIZE = (150, 150)
 
 def test_model_layers():
     """Test 1: Cek layer model"""
@@ -53,43 +56,18 @@ def test_gradcam_generation():
     img_pil = Image.fromarray(dummy_img)
     
     # Preprocess
-    img_array = np.array(img_pil.resize(IMG_SIZE)).astype('float32') / 255.0
-    img_array = np.expand_dims(img_array, axis=0)
+    img_array = preprocess_image(img_pil)
     
     print(f"\n📊 Image shape: {img_array.shape}")
     
     try:
         # Create grad model
-        last_conv_layer = model.get_layer('last_conv')
-        # Use model.layers[-1].output instead of model.output to avoid list issue
-        output_layer = model.layers[-1].output
-        
-        grad_model = tf.keras.models.Model(
-            inputs=model.inputs,
-            outputs=[last_conv_layer.output, output_layer]
-        )
+        explainer = GradCAMExplainer(model, 'last_conv')
         
         print("✅ Grad model created successfully!")
         
         # Generate heatmap
-        with tf.GradientTape() as tape:
-            conv_outputs, predictions = grad_model(img_array)
-            pred_index = tf.argmax(predictions[0])
-            class_channel = predictions[:, pred_index]
-        
-        grads = tape.gradient(class_channel, conv_outputs)
-        pooled_grads = tf.reduce_mean(grads, axis=(0, 1, 2))
-        
-        conv_outputs = conv_outputs[0]
-        heatmap = conv_outputs @ pooled_grads[..., tf.newaxis]
-        heatmap = tf.squeeze(heatmap)
-        
-        heatmap = tf.maximum(heatmap, 0)
-        max_val = tf.math.reduce_max(heatmap)
-        if max_val != 0:
-            heatmap = heatmap / max_val
-        
-        heatmap_np = heatmap.numpy()
+        heatmap_np = explainer.heatmap(img_array)
         
         print(f"✅ Heatmap generated!")
         print(f"📊 Heatmap shape: {heatmap_np.shape}")
@@ -133,47 +111,28 @@ def test_with_real_image():
     
     try:
         model = tf.keras.models.load_model(MODEL_PATH)
+        engine = InferenceEngine(model)
+        print(f"⏱️ Warm-up engine: {engine.warmup_seconds * 1000:.1f} ms")
+        for bucket, seconds in engine.warmup_timings.items():
+            print(f"   - bucket {bucket:>2}: {seconds * 1000:.1f} ms")
         
         # Load and preprocess
-        img = Image.open(test_image_path).convert('RGB')
-        img_resized = img.resize(IMG_SIZE)
-        img_array = np.array(img_resized).astype('float32') / 255.0
-        img_array = np.expand_dims(img_array, axis=0)
+        img_array = preprocess_image(test_image_path)
         
         # Predict
-        predictions = model.predict(img_array, verbose=0)
+        start = time.perf_counter()
+        predictions = engine.predict(img_array)
+        latency_ms = (time.perf_counter() - start) * 1000
         pred_class_idx = np.argmax(predictions[0])
         confidence = predictions[0][pred_class_idx]
         
         print(f"✅ Prediction: Class {pred_class_idx} with confidence {confidence:.2%}")
+        print(f"⏱️ Latency prediksi: {latency_ms:.1f} ms")
         
         # Generate Grad-CAM
-        last_conv_layer = model.get_layer('last_conv')
-        # Use model.layers[-1].output instead of model.output to avoid list issue
-        output_layer = model.layers[-1].output
-        
-        grad_model = tf.keras.models.Model(
-            inputs=model.inputs,
-            outputs=[last_conv_layer.output, output_layer]
-        )
-        
-        with tf.GradientTape() as tape:
-            conv_outputs, predictions = grad_model(img_array)
-            class_channel = predictions[:, pred_class_idx]
-        
-        grads = tape.gradient(class_channel, conv_outputs)
-        pooled_grads = tf.reduce_mean(grads, axis=(0, 1, 2))
-        
-        conv_outputs = conv_outputs[0]
-        heatmap = conv_outputs @ pooled_grads[..., tf.newaxis]
-        heatmap = tf.squeeze(heatmap)
-        
-        heatmap = tf.maximum(heatmap, 0)
-        max_val = tf.math.reduce_max(heatmap)
-        if max_val != 0:
-            heatmap = heatmap / max_val
-        
-        heatmap_np = heatmap.numpy()
+        explainer = GradCAMExplainer(model, 'last_conv')
+        print(f"⏱️ Warm-up Grad-CAM: {explainer.warmup_seconds * 1000:.1f} ms")
+        heatmap_np = explainer.heatmap(img_array, pred_class_idx)
         
         # Create overlay
         heatmap_resized = cv2.resize(heatmap_np, IMG_SIZE)
@@ -191,6 +150,49 @@ def test_with_real_image():
         traceback.print_exc()
         return False
 
+def test_batched_gradcam():
+    """Test 4: Grad-CAM batch = Grad-CAM per gambar"""
+    print("\n" + "="*60)
+    print("TEST 4: Batched Grad-CAM")
+    print("="*60)
+    
+    try:
+        model = tf.keras.models.load_model(MODEL_PATH)
+        explainer = GradCAMExplainer(model, 'last_conv')
+        num_classes = model.output_shape[-1]
+        
+        rng = np.random.default_rng(42)
+        images = rng.random((8,) + IMG_SIZE + (3,), dtype=np.float32)
+        # Campuran kelas target eksplisit dan -1 (kelas tertinggi)
+        targets = np.array([i % num_classes if i % 3 else -1 for i in range(len(images))])
+        
+        start = time.perf_counter()
+        predictions, heatmaps = explainer.explain_batch(images, targets)
+        batch_ms = (time.perf_counter() - start) * 1000
+        
+        start = time.perf_counter()
+        single = [explainer.explain(images[i:i + 1], None if t < 0 else t) for i, t in enumerate(targets)]
+        single_ms = (time.perf_counter() - start) * 1000
+        
+        max_pred_diff = max(float(np.max(np.abs(predictions[i] - p[0]))) for i, (p, _) in enumerate(single))
+        max_heatmap_diff = max(float(np.max(np.abs(heatmaps[i] - h))) for i, (_, h) in enumerate(single))
+        
+        print(f"📊 Heatmap batch shape : {heatmaps.shape}")
+        print(f"📊 Max diff prediksi   : {max_pred_diff:.2e}")
+        print(f"📊 Max diff heatmap    : {max_heatmap_diff:.2e}")
+        print(f"⏱️ 1 pass batch        : {batch_ms:.1f} ms")
+        print(f"⏱️ {len(images)} pass per gambar  : {single_ms:.1f} ms")
+        
+        passed = heatmaps.shape[0] == len(images) and max_pred_diff < 1e-5 and max_heatmap_diff < 1e-4
+        print("✅ Hasil batch sama dengan per gambar!" if passed else "❌ Hasil batch berbeda!")
+        return passed
+        
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
 if __name__ == "__main__":
     print("\n🔬 GRAD-CAM TEST SUITE")
     print("="*60)
@@ -201,6 +203,7 @@ if __name__ == "__main__":
     if test1_passed:
         test2_passed = test_gradcam_generation()
         test3_passed = test_with_real_image()
+        test4_passed = test_batched_gradcam()
         
         print("\n" + "="*60)
         print("📊 TEST SUMMARY")
@@ -208,8 +211,9 @@ if __name__ == "__main__":
         print(f"Test 1 (Model Layers): {'✅ PASSED' if test1_passed else '❌ FAILED'}")
         print(f"Test 2 (Grad-CAM Gen): {'✅ PASSED' if test2_passed else '❌ FAILED'}")
         print(f"Test 3 (Real Image):   {'✅ PASSED' if test3_passed else '❌ FAILED'}")
+        print(f"Test 4 (Batched):      {'✅ PASSED' if test4_passed else '❌ FAILED'}")
         
-        if test1_passed and test2_passed and test3_passed:
+        if test1_passed and test2_passed and test3_passed and test4_passed:
             print("\n🎉 ALL TESTS PASSED! Grad-CAM siap digunakan di Streamlit!")
         else:
             print("\n⚠️ Ada test yang gagal. Perbaiki issue di atas sebelum menjalankan Streamlit.")
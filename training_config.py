@@ -0,0 +1,269 @@
+"""
+Training Config
+Konfigurasi CPU untuk training build_cnn: thread pool, oneDNN, bfloat16 mixed precision, XLA
+
+Jalankan: python training_config.py --cache-dir dataset_cache/train
+
+Benchmark menjalankan setiap kandidat konfigurasi di proses terpisah (thread
+pool dan oneDNN hanya bisa diatur sebelum TensorFlow diinisialisasi), mengukur
+samples/detik train step, lalu menyimpan konfigurasi tercepat ke
+training_config.json. Notebook membaca file tersebut di cell pertama, jadi
+setiap host memakai konfigurasi tercepatnya sendiri.
+
+Modul ini sengaja tidak meng-import TensorFlow di level modul: apply_environment()
+harus dipanggil sebelum `import tensorflow`.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+
+# ====================================
+# KONFIGURASI
+# ====================================
+TRAINING_CONFIG_PATH = 'training_config.json'
+DEFAULT_CONFIG = {
+    'intra_op_threads': 0,  # 0 = default TensorFlow (semua core)
+    'inter_op_threads': 0,
+    'onednn': True,  # TF_ENABLE_ONEDNN_OPTS
+    'mixed_precision': False,  # mixed_bfloat16, hanya di CPU dengan instruksi bfloat16
+    'jit_compile': False,  # XLA untuk train step
+}
+BF16_CPU_FLAGS = ('avx512_bf16', 'amx_bf16')
+BENCHMARK_BATCH_SIZE = 32
+BENCHMARK_STEPS = 30
+BENCHMARK_WARMUP_STEPS = 5  # Termasuk tracing/kompilasi XLA, tidak ikut diukur
+BENCHMARK_TIMEOUT = 600  # Detik per konfigurasi
+
+
+# ====================================
+# DETEKSI CPU
+# ====================================
+def available_cpus():
+    """Jumlah CPU yang boleh dipakai proses ini (menghormati cgroup/taskset)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def cpu_flags():
+    """Flag instruksi CPU dari /proc/cpuinfo (kosong di luar Linux)"""
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            for line in f:
+                if line.startswith('flags'):
+                    return set(line.split(':', 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+
+def bfloat16_supported():
+    """bfloat16 hanya lebih cepat jika CPU punya instruksi native (AVX512-BF16 / AMX)"""
+    return any(flag in cpu_flags() for flag in BF16_CPU_FLAGS)
+
+
+# ====================================
+# TERAPKAN KONFIGURASI
+# ====================================
+def load_training_config(path=TRAINING_CONFIG_PATH):
+    """Konfigurasi tersimpan untuk host ini (default jika belum ada)"""
+    config = dict(DEFAULT_CONFIG)
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            saved = json.load(f)
+        config.update({key: saved[key] for key in DEFAULT_CONFIG if key in saved})
+    return config
+
+
+def save_training_config(config, path=TRAINING_CONFIG_PATH, samples_per_sec=None):
+    data = {key: config[key] for key in DEFAULT_CONFIG}
+    if samples_per_sec is not None:
+        data['samples_per_sec'] = round(samples_per_sec, 1)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def apply_environment(config):
+    """Environment variable yang dibaca TensorFlow saat di-import
+
+    Harus dipanggil sebelum `import tensorflow`; setelah itu perubahan oneDNN
+    tidak berpengaruh sampai kernel/proses di-restart.
+    """
+    if 'tensorflow' in sys.modules:
+        print("⚠️ TensorFlow sudah di-import: setting oneDNN berlaku setelah restart", file=sys.stderr)
+    os.environ['TF_ENABLE_ONEDNN_OPTS'] = '1' if config['onednn'] else '0'
+
+
+def apply_training_config(config):
+    """Terapkan seluruh konfigurasi -> konfigurasi yang benar-benar berlaku
+
+    Panggil sebelum operasi TensorFlow pertama (thread pool tidak bisa diubah
+    setelah runtime berjalan). Mixed precision dimatikan otomatis di CPU tanpa
+    instruksi bfloat16 karena di sana justru lebih lambat dari float32.
+    """
+    config = dict(config)
+    if 'tensorflow' not in sys.modules:
+        apply_environment(config)
+    import tensorflow as tf
+
+    try:
+        if config['intra_op_threads']:
+            tf.config.threading.set_intra_op_parallelism_threads(config['intra_op_threads'])
+        if config['inter_op_threads']:
+            tf.config.threading.set_inter_op_parallelism_threads(config['inter_op_threads'])
+    except RuntimeError as e:
+        print(f"⚠️ Thread pool tidak bisa diubah ({e}), restart kernel untuk menerapkan", file=sys.stderr)
+    config['intra_op_threads'] = tf.config.threading.get_intra_op_parallelism_threads()
+    config['inter_op_threads'] = tf.config.threading.get_inter_op_parallelism_threads()
+
+    if config['mixed_precision'] and not bfloat16_supported():
+        print("⚠️ CPU tidak mendukung bfloat16, training tetap float32", file=sys.stderr)
+        config['mixed_precision'] = False
+    tf.keras.mixed_precision.set_global_policy(
+        'mixed_bfloat16' if config['mixed_precision'] else 'float32'
+    )
+    return config
+
+
+def describe_config(config):
+    """Label singkat untuk tabel benchmark"""
+    threads = f"{config['intra_op_threads'] or 'auto'}/{config['inter_op_threads'] or 'auto'}"
+    parts = [f"threads {threads}", 'oneDNN' if config['onednn'] else 'no-oneDNN']
+    if config['mixed_precision']:
+        parts.append('bf16')
+    if config['jit_compile']:
+        parts.append('XLA')
+    return ', '.join(parts)
+
+
+# ====================================
+# BENCHMARK
+# ====================================
+def candidate_configs():
+    """Kandidat yang dibandingkan: default, variasi thread pool, tanpa oneDNN, XLA, bf16"""
+    cpus = available_cpus()
+    configs = [
+        dict(DEFAULT_CONFIG),
+        dict(DEFAULT_CONFIG, intra_op_threads=cpus, inter_op_threads=1),
+        dict(DEFAULT_CONFIG, intra_op_threads=max(1, cpus // 2), inter_op_threads=2),
+        dict(DEFAULT_CONFIG, onednn=False),
+        dict(DEFAULT_CONFIG, jit_compile=True),
+    ]
+    if bfloat16_supported():
+        configs.append(dict(DEFAULT_CONFIG, mixed_precision=True))
+        configs.append(dict(DEFAULT_CONFIG, mixed_precision=True, jit_compile=True))
+    return configs
+
+
+def _benchmark_worker(config, batch_size, steps, warmup_steps, num_classes, cache_dir, results):
+    try:
+        config = apply_training_config(config)
+        import tensorflow as tf
+
+        from cnn_model import build_cnn, compile_cnn, load_num_classes
+        from preprocessing import IMG_SIZE
+
+        if cache_dir:
+            from data_pipeline import make_cached_dataset
+            from dataset_cache import DatasetCache
+            cache = DatasetCache(cache_dir)
+            num_classes = len(cache.class_indices)
+            dataset = make_cached_dataset(cache, batch_size, training=True).repeat()
+        else:
+            num_classes = num_classes or load_num_classes()
+            images = tf.random.uniform((batch_size,) + IMG_SIZE + (3,))
+            labels = tf.one_hot(tf.range(batch_size) % num_classes, num_classes)
+            dataset = tf.data.Dataset.from_tensors((images, labels)).repeat()
+
+        model = compile_cnn(build_cnn(IMG_SIZE + (3,), num_classes), config['jit_compile'])
+        model.fit(dataset, steps_per_epoch=warmup_steps, epochs=1, verbose=0)
+        start = time.perf_counter()
+        model.fit(dataset, steps_per_epoch=steps, epochs=1, verbose=0)
+        seconds = time.perf_counter() - start
+        results.put((config, steps * batch_size / seconds, None))
+    except Exception as e:
+        results.put((config, None, f"{type(e).__name__}: {e}"))
+
+
+def benchmark_config(config, batch_size=BENCHMARK_BATCH_SIZE, steps=BENCHMARK_STEPS,
+                     warmup_steps=BENCHMARK_WARMUP_STEPS, num_classes=None, cache_dir=None):
+    """samples/detik train step untuk satu konfigurasi, di proses baru
+
+    Tanpa cache_dir dipakai batch sintetis (hanya train step yang diukur) dengan
+    num_classes kelas (default: jumlah kelas di class_indices.json);
+    dengan cache_dir, batch datang dari make_cached_dataset termasuk augmentasi.
+
+    Return: (konfigurasi yang berlaku, samples/detik atau None, error atau None)
+    """
+    ctx = mp.get_context('spawn')
+    results = ctx.Queue()
+    process = ctx.Process(
+        target=_benchmark_worker,
+        args=(config, batch_size, steps, warmup_steps, num_classes, cache_dir, results),
+        daemon=True,
+    )
+    process.start()
+    deadline = time.monotonic() + BENCHMARK_TIMEOUT
+    try:
+        while True:
+            try:
+                return results.get(timeout=1.0)
+            except queue.Empty:
+                if not process.is_alive():
+                    return config, None, f"Proses benchmark berhenti (exit code {process.exitcode})"
+                if time.monotonic() > deadline:
+                    return config, None, f"Timeout {BENCHMARK_TIMEOUT} s"
+    finally:
+        process.join(timeout=10)
+        if process.is_alive():
+            process.terminate()
+
+
+def benchmark_configs(configs=None, **kwargs):
+    """Benchmark semua kandidat -> list (konfigurasi, samples/detik, error), urut tercepat"""
+    results = []
+    for config in configs or candidate_configs():
+        print(f"⏱️ {describe_config(config)} ...", flush=True)
+        results.append(benchmark_config(config, **kwargs))
+    return sorted(results, key=lambda result: -(result[1] or 0))
+
+
+def print_benchmark(results):
+    print("\n" + "="*60)
+    print("TRAINING BENCHMARK (samples/detik)")
+    print("="*60)
+    for config, samples_per_sec, error in results:
+        value = f"{samples_per_sec:8.1f}" if samples_per_sec else f"{'-':>8}"
+        print(f"{describe_config(config):<40} {value}" + (f"  ❌ {error}" if error else ''))
+    print("="*60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cari konfigurasi training CPU tercepat")
+    parser.add_argument('--batch-size', type=int, default=BENCHMARK_BATCH_SIZE)
+    parser.add_argument('--steps', type=int, default=BENCHMARK_STEPS)
+    parser.add_argument('--warmup-steps', type=int, default=BENCHMARK_WARMUP_STEPS)
+    parser.add_argument('--cache-dir', default=None,
+                        help="Cache dataset train (dataset_cache.py); default batch sintetis")
+    parser.add_argument('--output', default=TRAINING_CONFIG_PATH)
+    args = parser.parse_args()
+
+    print(f"\n🧪 TRAINING CONFIG BENCHMARK ({available_cpus()} CPU, "
+          f"bfloat16 {'didukung' if bfloat16_supported() else 'tidak didukung'})")
+    results = benchmark_configs(batch_size=args.batch_size, steps=args.steps,
+                                warmup_steps=args.warmup_steps, cache_dir=args.cache_dir)
+    print_benchmark(results)
+
+    best, samples_per_sec, error = results[0]
+    if error is None:
+        save_training_config(best, args.output, samples_per_sec)
+        print(f"✅ Konfigurasi tercepat disimpan ke {args.output}: {describe_config(best)}")
+
+
+if __name__ == "__main__":
+    main()